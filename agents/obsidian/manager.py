@@ -10,19 +10,138 @@ from __future__ import annotations
 
 import os
 import io
+import sys
+import copy
 import json
 import shutil
 import tempfile
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple, Union
 
 try:
     import zipfile
 except Exception:
     zipfile = None  # type: ignore
 
+try:
+    import orjson  # type: ignore
+except Exception:  # optional: faster C JSON codec, falls back to stdlib json
+    orjson = None  # type: ignore
+
+try:
+    import fcntl  # POSIX only
+except Exception:
+    fcntl = None  # type: ignore
+
+# ioctl FICLONE (linux/fs.h): copy-on-write clone on btrfs/XFS, no data copied
+_FICLONE = 0x40049409 if (fcntl is not None and sys.platform.startswith("linux")) else None
+
+
+def _clone_file(src: str, dst: str, hardlink: bool = False) -> None:
+    """Clone one file: hardlink (opt-in), then reflink, then a regular copy2."""
+    if hardlink:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    if _FICLONE is not None:
+        try:
+            with open(src, "rb") as fs, open(dst, "wb") as fd:
+                fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())  # type: ignore[union-attr]
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def _zip_member_path(base: Path, info: Any) -> Optional[Path]:
+    """Target path of a zip member, sanitized like ZipFile.extract (drops drive, '..', '.')."""
+    arc = info.filename.replace("/", os.sep)
+    if os.altsep:
+        arc = arc.replace(os.altsep, os.sep)
+    arc = os.path.splitdrive(arc)[1]
+    parts = [x for x in arc.split(os.sep) if x not in ("", os.curdir, os.pardir)]
+    if not parts:
+        return None
+    return base.joinpath(*parts)
+
+
+def _fast_extract(zf: Any, info: Any, target: Path, lock: Optional[Any] = None) -> None:
+    """Write one zip member to target with a single copy loop (no extra BufferedIO layers
+    as in ZipFile.extract). Empty members become empty files; on Linux the destination
+    is preallocated to its final size.
+    If several threads share zf, pass a lock: ZipFile.open() and closing the member update
+    the shared handle's reference count without ZipFile's own lock."""
+    if info.file_size == 0:
+        open(target, "wb").close()
+        return
+    if lock is None:
+        src = zf.open(info, "r")
+    else:
+        with lock:
+            src = zf.open(info, "r")
+    try:
+        with open(target, "wb", buffering=0) as dst:
+            if hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(dst.fileno(), 0, info.file_size)
+                except OSError:
+                    pass
+            shutil.copyfileobj(src, dst, min(info.file_size, 1 << 20))
+    finally:
+        if lock is None:
+            src.close()
+        else:
+            with lock:
+                src.close()
+
+
+def _remove_path(p: Path) -> None:
+    if p.is_dir() and not p.is_symlink():
+        shutil.rmtree(p)
+    else:
+        p.unlink()
+
+
+def _clone_tree(src: Path, dst: Path, hardlink: bool = False) -> None:
+    """Mirror src into dst. Files whose inode or (mtime, size) already match are skipped,
+    entries missing from src are removed from dst."""
+    dst.mkdir(parents=True, exist_ok=True)
+    seen = set()
+    with os.scandir(src) as it:
+        for entry in it:
+            seen.add(entry.name)
+            target = dst / entry.name
+            if entry.is_dir():
+                if target.exists() and not target.is_dir():
+                    _remove_path(target)
+                _clone_tree(Path(entry.path), target, hardlink=hardlink)
+                continue
+            if not entry.is_file():
+                continue
+            st = entry.stat()
+            try:
+                dt = os.stat(target, follow_symlinks=False)
+            except FileNotFoundError:
+                dt = None
+            if dt is not None:
+                same_inode = dt.st_ino == st.st_ino and dt.st_dev == st.st_dev
+                unchanged = dt.st_mtime_ns == st.st_mtime_ns and dt.st_size == st.st_size
+                if same_inode or unchanged:
+                    continue
+                # never write through an old hardlink: that would modify the source inode
+                _remove_path(target)
+            _clone_file(entry.path, str(target), hardlink=hardlink)
+    for name in os.listdir(dst):
+        if name not in seen:
+            _remove_path(dst / name)
+
 @dataclass
 class ObsidianPaths:
     vault: Path
@@ -32,7 +151,10 @@ class ObsidianPaths:
 
 
 class ObsidianManager:
-    def __init__(self, vault_path: str) -> None:
+    def __init__(self, vault_path: str, durable: Optional[bool] = None) -> None:
+        """durable=True fsyncs every settings/snippet/note write (and its directory) before
+        returning, so it survives a crash or power loss; slower, off by default.
+        None reads AI_STACK_OBSIDIAN_DURABLE=1 from the environment."""
         base = Path(vault_path).expanduser()
         dot = base / ".obsidian"
         self.paths = ObsidianPaths(
@@ -46,6 +168,11 @@ class ObsidianManager:
         self.paths.dot.mkdir(parents=True, exist_ok=True)
         self.paths.plugins.mkdir(parents=True, exist_ok=True)
         self.paths.snippets.mkdir(parents=True, exist_ok=True)
+        if durable is None:
+            durable = os.environ.get("AI_STACK_OBSIDIAN_DURABLE", "0") == "1"
+        self.durable = durable
+        # parsed JSON settings keyed by path -> (st_mtime_ns, st_size, obj)
+        self._json_cache: Dict[Path, Tuple[int, int, Any]] = {}
 
     # -------- utils --------
     def _safe_rel(self, rel: str) -> Path:
@@ -58,29 +185,91 @@ class ObsidianManager:
         return p
 
     @staticmethod
-    def _atomic_write(path: Path, data: str) -> None:
+    def _fsync_dir(path: Path) -> None:
+        """Persist a rename by fsyncing the directory entry (POSIX only)."""
+        fd = os.open(str(path), os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _atomic_write_via(path: Path, mode: str, write_fn: Callable[[IO[Any]], None], durable: bool = False) -> None:
+        """Open a temp file next to `path`, let write_fn stream into it, then rename over `path`.
+        durable=True also fsyncs the data and the parent dir, so the new content survives
+        a crash (skipped on Windows)."""
+        sync = durable and os.name != "nt"
         path.parent.mkdir(parents=True, exist_ok=True)
-        with tempfile.NamedTemporaryFile("w", delete=False, dir=str(path.parent), encoding="utf-8") as tf:
-            tf.write(data)
+        kwargs: Dict[str, Any] = {} if "b" in mode else {"encoding": "utf-8"}
+        with tempfile.NamedTemporaryFile(mode, delete=False, dir=str(path.parent), **kwargs) as tf:
+            write_fn(tf)
+            if sync:
+                tf.flush()
+                os.fsync(tf.fileno())
             tmp = Path(tf.name)
         os.replace(tmp, path)  # atomic rename on POSIX
+        if sync:
+            ObsidianManager._fsync_dir(path.parent)
 
     @staticmethod
-    def _read_json(path: Path, default: Any) -> Any:
+    def _atomic_write(path: Path, data: Union[str, Callable[[IO[str]], None]], durable: bool = False) -> None:
+        write_fn = data if callable(data) else (lambda f: f.write(data))
+        ObsidianManager._atomic_write_via(path, "w", write_fn, durable=durable)
+
+    @staticmethod
+    def _atomic_write_bytes(path: Path, data: Union[bytes, Callable[[IO[bytes]], None]], durable: bool = False) -> None:
+        write_fn = data if callable(data) else (lambda f: f.write(data))
+        ObsidianManager._atomic_write_via(path, "wb", write_fn, durable=durable)
+
+    def _read_json(self, path: Path, default: Any) -> Any:
+        """Read JSON settings, reusing the parsed object while (mtime, size) is unchanged.
+        Callers mutate the result, so a deep copy is returned instead of the cached object.
+        """
         try:
-            if not path.exists():
-                return default
-            return json.loads(path.read_text(encoding="utf-8"))
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._json_cache.pop(path, None)
+            return default
         except Exception:
             return default
-
-    @staticmethod
-    def _write_json(path: Path, obj: Any) -> None:
-        s = json.dumps(obj, ensure_ascii=False, indent=2)
-        ObsidianManager._atomic_write(path, s)
+        cached = self._json_cache.get(path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return copy.deepcopy(cached[2])
+        try:
+            if orjson is not None:
+                obj = orjson.loads(path.read_bytes())
+            else:
+                obj = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            self._json_cache.pop(path, None)
+            return default
+        self._json_cache[path] = (st.st_mtime_ns, st.st_size, obj)
+        return copy.deepcopy(obj)
+
+    def _write_json(self, path: Path, obj: Any, durable: Optional[bool] = None) -> None:
+        if durable is None:
+            durable = self.durable
+        if orjson is not None:
+            # orjson emits UTF-8 bytes directly (same as ensure_ascii=False)
+            data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            self._atomic_write_bytes(path, data, durable=durable)
+        else:
+            # stream chunks straight into the temp file instead of building one big str
+            self._atomic_write(path, lambda f: json.dump(obj, f, ensure_ascii=False, indent=2), durable=durable)
+        # remember what we just wrote so the next read skips disk
+        try:
+            st = os.stat(path)
+            self._json_cache[path] = (st.st_mtime_ns, st.st_size, copy.deepcopy(obj))
+        except OSError:
+            self._json_cache.pop(path, None)
 
     # -------- backups --------
-    def backup_settings(self, backup_dir: Optional[str] = None) -> Path:
+    def backup_settings(self, backup_dir: Optional[str] = None, hardlink: bool = False) -> Path:
+        """Snapshot key settings plus plugins/ and snippets/.
+        Directories are mirrored incrementally via reflink (CoW) when available, else copied.
+        hardlink=True shares inodes instead: fastest, but in-place edits of plugin files
+        would then show up in the backup as well.
+        """
         out_dir = Path(backup_dir).expanduser() if backup_dir else (self.paths.vault / "Backups/.obsidian")
         out_dir.mkdir(parents=True, exist_ok=True)
         # copy important files
@@ -97,17 +286,11 @@ class ObsidianManager:
                 dst = out_dir / name
                 dst.parent.mkdir(parents=True, exist_ok=True)
                 shutil.copy2(src, dst)
-        # copy directories: plugins manifests and snippets
+        # mirror directories: plugins manifests and snippets
         if self.paths.plugins.exists():
-            dst_plugins = out_dir / "plugins"
-            if dst_plugins.exists():
-                shutil.rmtree(dst_plugins)
-            shutil.copytree(self.paths.plugins, dst_plugins)
+            _clone_tree(self.paths.plugins, out_dir / "plugins", hardlink=hardlink)
         if self.paths.snippets.exists():
-            dst_snip = out_dir / "snippets"
-            if dst_snip.exists():
-                shutil.rmtree(dst_snip)
-            shutil.copytree(self.paths.snippets, dst_snip)
+            _clone_tree(self.paths.snippets, out_dir / "snippets", hardlink=hardlink)
         return out_dir
 
     # -------- community plugins --------
@@ -152,22 +335,81 @@ class ObsidianManager:
         core = [p for p in core if p != plugin_id]
         self._write_json(self.paths.dot / "core-plugins.json", core)
 
-    def install_plugin_from_zip(self, zip_path: str, plugin_dir_name: Optional[str] = None) -> str:
+    def install_plugin_from_zip(
+        self,
+        zip_path: Union[str, "os.PathLike[str]", IO[bytes]],
+        plugin_dir_name: Optional[str] = None,
+        default_name: Optional[str] = None,
+    ) -> str:
+        """Install a plugin from a zip path or an open binary file object.
+        default_name is used when the archive has no top-level folder (defaults to the zip stem).
+        """
         if zipfile is None:
             raise RuntimeError("zipfile module unavailable")
-        zpath = Path(zip_path)
-        if not zpath.exists():
-            raise FileNotFoundError(zpath)
+        if hasattr(zip_path, "read"):
+            source: Any = zip_path
+            stem = default_name or Path(str(getattr(zip_path, "name", None) or "plugin")).stem
+        else:
+            zpath = Path(zip_path)  # type: ignore[arg-type]
+            if not zpath.exists():
+                raise FileNotFoundError(zpath)
+            source = str(zpath)
+            stem = default_name or zpath.stem
         target_base = self.paths.plugins
-        with zipfile.ZipFile(str(zpath), "r") as zf:
+        with zipfile.ZipFile(source, "r") as zf:
             # Determine top-level folder or use provided dir name
             top_dirs = {p.split("/")[0] for p in zf.namelist() if "/" in p}
-            out_dir_name = plugin_dir_name or (next(iter(top_dirs)) if top_dirs else zpath.stem)
+            out_dir_name = plugin_dir_name or (next(iter(top_dirs)) if top_dirs else stem)
             out_dir = target_base / out_dir_name
             if out_dir.exists():
                 shutil.rmtree(out_dir)
             out_dir.mkdir(parents=True, exist_ok=True)
-            zf.extractall(str(out_dir))
+            files = []
+            dirs = set()
+            for info in zf.infolist():
+                target = _zip_member_path(out_dir, info)
+                if target is None:
+                    continue
+                if info.is_dir():
+                    dirs.add(str(target))
+                else:
+                    dirs.add(str(target.parent))
+                    files.append((info, target))
+            # create the whole tree once, up-front: one makedirs per unique dir instead of
+            # per member, and workers never race on directory creation
+            for d in sorted(dirs):
+                os.makedirs(d, exist_ok=True)
+            workers = min(len(files), os.cpu_count() or 1)
+            if workers <= 1:
+                for info, target in files:
+                    _fast_extract(zf, info, target)
+            else:
+                # Members are inflated (zlib releases the GIL) and written from several threads.
+                # A path source gets one ZipFile per worker; a file object can't be reopened,
+                # so its open()/close() go through a lock (raw reads are serialized by ZipFile).
+                opened: List[Any] = []
+                if isinstance(source, str):
+                    local = threading.local()
+
+                    def extract(info: Any, target: Path) -> None:
+                        wzf = getattr(local, "zf", None)
+                        if wzf is None:
+                            wzf = local.zf = zipfile.ZipFile(source, "r")
+                            opened.append(wzf)
+                        _fast_extract(wzf, info, target)
+                else:
+                    lock = threading.Lock()
+
+                    def extract(info: Any, target: Path) -> None:
+                        _fast_extract(zf, info, target, lock)
+                try:
+                    with ThreadPoolExecutor(max_workers=workers) as ex:
+                        futures = [ex.submit(extract, info, target) for info, target in files]
+                        for fut in as_completed(futures):
+                            fut.result()
+                finally:
+                    for wzf in opened:
+                        wzf.close()
         # Try to detect plugin id from manifest
         manifest = out_dir / "manifest.json"
         plugin_id = out_dir_name
@@ -183,18 +425,17 @@ class ObsidianManager:
 
     def install_plugin_from_url(self, url: str, plugin_dir_name: Optional[str] = None) -> str:
         import requests  # lazy import
-        resp = requests.get(url, timeout=15)
-        resp.raise_for_status()
-        with tempfile.NamedTemporaryFile("wb", delete=False) as tf:
-            tf.write(resp.content)
-            tmp = tf.name
-        try:
-            return self.install_plugin_from_zip(tmp, plugin_dir_name=plugin_dir_name)
-        finally:
-            try:
-                os.remove(tmp)
-            except Exception:
-                pass
+        from urllib.parse import urlparse
+        # stream into a spooled buffer: stays in RAM for typical plugin zips, spills to disk if large
+        with requests.get(url, timeout=15, stream=True) as resp, \
+                tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as spool:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(chunk_size=1 << 16):
+                if chunk:
+                    spool.write(chunk)
+            spool.seek(0)
+            url_stem = Path(urlparse(url).path).stem or None
+            return self.install_plugin_from_zip(spool, plugin_dir_name=plugin_dir_name, default_name=url_stem)
 
     # -------- appearance / theme / snippets --------
     def set_theme(self, theme_name: str) -> None:
@@ -204,13 +445,16 @@ class ObsidianManager:
         ap["cssTheme"] = theme_name
         self._write_json(self.paths.dot / "appearance.json", ap)
 
-    def enable_snippet(self, snippet_css_filename: str) -> None:
+    def enable_snippet(self, snippet_css_filename: str, sort: bool = False) -> None:
         # appearance.json: {"enabledCssSnippets": ["my-snippet"]}; filenames without .css
         ap = self._read_json(self.paths.dot / "appearance.json", default={})
-        enabled = set(ap.get("enabledCssSnippets") or [])
+        enabled = ap.get("enabledCssSnippets") or []
         base = Path(snippet_css_filename).stem
-        enabled.add(base)
-        ap["enabledCssSnippets"] = sorted(enabled)
+        if base not in enabled:
+            enabled.append(base)
+        if sort:
+            enabled.sort()
+        ap["enabledCssSnippets"] = enabled
         self._write_json(self.paths.dot / "appearance.json", ap)
 
     def disable_snippet(self, snippet_css_filename: str) -> None:
@@ -220,13 +464,9 @@ class ObsidianManager:
         self._write_json(self.paths.dot / "appearance.json", ap)
 
     # -------- generic settings --------
-    def set_setting(self, settings_file: str, json_path: str, value: Any) -> None:
-        """Generic: mutate a JSON file under .obsidian by dot-path.
-        Example: set_setting("app.json", "promptDelete", False)
-        """
-        p = self.paths.dot / settings_file
-        data = self._read_json(p, default={})
-        # navigate dot path
+    @staticmethod
+    def _apply_path(data: Any, json_path: str, value: Any) -> None:
+        """Assign value into nested dict `data` by dot-path, creating intermediate dicts."""
         cur = data
         parts = [k for k in json_path.split(".") if k]
         for key in parts[:-1]:
@@ -240,6 +480,21 @@ class ObsidianManager:
             raise ValueError("Empty json_path")
         # assign
         cur[last] = value
+
+    def set_setting(self, settings_file: str, json_path: str, value: Any) -> None:
+        """Generic: mutate a JSON file under .obsidian by dot-path.
+        Example: set_setting("app.json", "promptDelete", False)
+        """
+        self.set_settings(settings_file, {json_path: value})
+
+    def set_settings(self, settings_file: str, updates: Dict[str, Any]) -> None:
+        """Apply several dot-path mutations with a single read and a single atomic write.
+        Example: set_settings("app.json", {"promptDelete": False, "editor.spellcheck": True})
+        """
+        p = self.paths.dot / settings_file
+        data = self._read_json(p, default={})
+        for json_path, value in updates.items():
+            self._apply_path(data, json_path, value)
         self._write_json(p, data)
 
     # convenience
@@ -251,7 +506,7 @@ class ObsidianManager:
 
     def ensure_snippet_file(self, name: str, content: str) -> Path:
         p = self.paths.snippets / (name if name.endswith('.css') else f"{name}.css")
-        self._atomic_write(p, content)
+        self._atomic_write(p, content, durable=self.durable)
         return p
 
     def ensure_theme_css(self, name: str, content: str) -> Path:
@@ -296,7 +551,7 @@ class ObsidianManager:
         p = self._safe_rel(rel_path)
         if ensure_parents:
             p.parent.mkdir(parents=True, exist_ok=True)
-        self._atomic_write(p, content)
+        self._atomic_write(p, content, durable=self.durable)
         return str(p)
 
     def append_note(self, rel_path: str, content: str, header: Optional[str] = None) -> str:
@@ -304,7 +559,7 @@ class ObsidianManager:
         p.parent.mkdir(parents=True, exist_ok=True)
         existing = p.read_text(encoding="utf-8") if p.exists() else ""
         add = content if not header else f"\n\n## {header}\n\n{content}\n"
-        self._atomic_write(p, (existing.rstrip() + add))
+        self._atomic_write(p, (existing.rstrip() + add), durable=self.durable)
         return str(p)
 
     def search_in_notes(self, query: str, subdir: Optional[str] = None, regex: bool = False, case_sensitive: bool = False, limit: int = 100, exclude_dirs: Optional[List[str]] = None) -> List[Dict[str, Any]]:
@@ -9,19 +9,67 @@
 Рекомендуется использовать WorkingWebAgent из agents.web_research.
 """
 
+import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from datetime import datetime
 import re
+import heapq
+import math
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import quote_plus
-from bs4 import BeautifulSoup
+
+try:
+    import orjson  # type: ignore
+except Exception:  # optional: быстрый C-парсер JSON
+    orjson = None  # type: ignore
+
+try:
+    import requests_cache  # type: ignore
+except Exception:  # optional
+    requests_cache = None
+
+# Слова, которые нужно исключить из ключевых
+_STOP_WORDS = frozenset({
+    'найди', 'найти', 'поиск', 'информация', 'информацию',
+    'про', 'о', 'и', 'с', 'когда', 'как', 'что', 'там',
+    'reddit', 'find', 'search', 'information', 'about', 'on', 'with'
+})
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
+def _score(item):
+    return item['score']
+
+
+def _parse_json(response):
+    """Разбор JSON-ответа: orjson прямо из bytes (без декодирования в str), иначе requests"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
 
 class WebResearchAgent:
     def __init__(self):
-        self.session = requests.Session()
+        # Кеш ответов (опционально, как в WorkingWebAgent): повторные запросы берутся из sqlite,
+        # а устаревшие записи перепроверяются через If-None-Match/If-Modified-Since
+        if requests_cache is not None and os.environ.get("AI_STACK_HTTP_CACHE", "0") == "1":
+            self.session = requests_cache.CachedSession(
+                cache_name=".reddit_cache",
+                backend="sqlite",
+                expire_after=int(os.environ.get("AI_STACK_HTTP_CACHE_TTL", "300")),
+                allowable_codes=(200,),
+            )
+        else:
+            self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         })
+        # Пул соединений под параллельные запросы: keep-alive к reddit.com переиспользуется
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=1)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
     def search_reddit(self, query):
         """Поиск на Reddit"""
@@ -44,13 +92,14 @@ class WebResearchAgent:
             if response.status_code != 200:
                 return [{'error': f'HTTP {response.status_code}: {response.text}'}]
             
-            data = response.json()
+            data = _parse_json(response)
             
             results = []
             for post in data.get('data', {}).get('children', []):
                 post_data = post.get('data', {})
                 title = post_data.get('title', '')
-                selftext = post_data.get('selftext', '')
+                # pop: длинный selftext не переживёт итерацию вместе с post_data
+                selftext = post_data.pop('selftext', None) or ''
                 
                 # Фильтруем результаты по релевантности
                 if self.is_relevant(title + ' ' + selftext, keywords):
@@ -60,37 +109,31 @@ class WebResearchAgent:
                         'score': post_data.get('score', 0),
                         'url': f"https://reddit.com{post_data.get('permalink', '')}",
                         'author': post_data.get('author', ''),
-                        'text': selftext[:300] if selftext else '',
+                        'text': selftext[:300],
                         'created': post_data.get('created_utc', 0)
                     })
             
-            # Сортируем по релевантности и популярности
-            results.sort(key=lambda x: x['score'], reverse=True)
-            return results[:5]  # Возвращаем топ-5
+            # Топ-5 по популярности без полной сортировки
+            return heapq.nlargest(5, results, key=_score)
             
         except Exception as e:
             return [{'error': f'Ошибка поиска Reddit: {str(e)}'}]
     
-    def extract_keywords(self, query):
-        """Извлечение ключевых слов из запроса"""
-        # Слова, которые нужно исключить
-        stop_words = {
-            'найди', 'найти', 'поиск', 'информация', 'информацию',
-            'про', 'о', 'и', 'с', 'когда', 'как', 'что', 'там',
-            'reddit', 'find', 'search', 'information', 'about', 'on', 'with'
-        }
-        
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def extract_keywords(query):
+        """Извлечение ключевых слов из запроса (кешируется: execute зовёт дважды с тем же task)"""
         # Очищаем и разбиваем на слова
-        words = re.findall(r'\b\w+\b', query.lower())
+        words = _WORD_RE.findall(query.lower())
         
         # Оставляем только значимые слова
-        keywords = [word for word in words if len(word) > 2 and word not in stop_words]
+        keywords = [word for word in words if len(word) > 2 and word not in _STOP_WORDS]
         
         # Если не осталось ключевых слов, берем все
         if not keywords:
             keywords = [word for word in words if len(word) > 1]
         
-        return keywords[:5]  # Максимум 5 ключевых слов
+        return tuple(keywords[:5])  # Максимум 5 ключевых слов; tuple — неизменяемый для кеша
     
     def is_relevant(self, text, keywords):
         """Проверка релевантности текста"""
@@ -98,10 +141,58 @@ class WebResearchAgent:
             return True
         
         text_lower = text.lower()
-        matches = sum(1 for keyword in keywords if keyword in text_lower)
+        # Считаем релевантным, если найдено хотя бы 30% ключевых слов;
+        # выходим сразу, как только порог достигнут
+        need = max(1, math.ceil(len(keywords) * 0.3))
+        hits = 0
+        for keyword in keywords:
+            if keyword in text_lower:
+                hits += 1
+                if hits >= need:
+                    return True
+        return False
+    
+    def _fetch_subreddit(self, subreddit, search_query):
+        """Поиск в одном субреддите"""
+        print(f"🔍 Поиск в r/{subreddit}...")
+        url = f"https://www.reddit.com/r/{subreddit}/search.json"
+        params = {
+            'q': search_query,
+            'restrict_sr': 'true',
+            'limit': 5,
+            'sort': 'new',
+            't': 'month'
+        }
         
-        # Считаем релевантным, если найдено хотя бы 30% ключевых слов
-        return matches >= max(1, len(keywords) * 0.3)
+        results = []
+        try:
+            response = self.session.get(url, params=params, timeout=10)
+            if response.status_code == 200:
+                data = _parse_json(response)
+                posts = data.get('data', {}).get('children', [])
+                print(f"  ℹ️ Найдено {len(posts)} постов в r/{subreddit}")
+                
+                for post in posts:
+                    post_data = post.get('data', {})
+                    title = post_data.get('title', '')
+                    # сразу обрезаем и убираем полный selftext из post_data — он больше не нужен
+                    selftext = (post_data.pop('selftext', None) or '')[:300]
+                    
+                    # Упростим проверку релевантности
+                    results.append({
+                        'title': title,
+                        'subreddit': post_data.get('subreddit', ''),
+                        'score': post_data.get('score', 0),
+                        'url': f"https://reddit.com{post_data.get('permalink', '')}",
+                        'author': post_data.get('author', ''),
+                        'text': selftext,
+                        'created': post_data.get('created_utc', 0)
+                    })
+            else:
+                print(f"  ❌ Ошибка {response.status_code} для r/{subreddit}")
+        except Exception as e:
+            print(f"  ❌ Исключение для r/{subreddit}: {e}")
+        return results
     
     def search_general(self, query):
         """Общий поиск по разным субреддитам"""
@@ -110,56 +201,21 @@ class WebResearchAgent:
             search_query = ' '.join(keywords) if keywords else query
             
             print(f"🌐 Общий поиск: '{search_query}'")
-            print(f"🔑 Ключевые слова: {keywords}")
+            print(f"🔑 Ключевые слова: {list(keywords)}")
             
-            # Поиск в популярных субреддитах
+            # Поиск в популярных субреддитах — параллельно, задержка ≈ самый медленный запрос
             subreddits = ['OpenAI', 'MachineLearning', 'artificial', 'technology', 'singularity']
             all_results = []
-            
-            for subreddit in subreddits:
-                print(f"🔍 Поиск в r/{subreddit}...")
-                url = f"https://www.reddit.com/r/{subreddit}/search.json"
-                params = {
-                    'q': search_query,
-                    'restrict_sr': 'true',
-                    'limit': 5,
-                    'sort': 'new',
-                    't': 'month'
-                }
-                
-                try:
-                    response = self.session.get(url, params=params, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        posts = data.get('data', {}).get('children', [])
-                        print(f"  ℹ️ Найдено {len(posts)} постов в r/{subreddit}")
-                        
-                        for post in posts:
-                            post_data = post.get('data', {})
-                            title = post_data.get('title', '')
-                            selftext = post_data.get('selftext', '')
-                            
-                            # Упростим проверку релевантности
-                            all_results.append({
-                                'title': title,
-                                'subreddit': post_data.get('subreddit', ''),
-                                'score': post_data.get('score', 0),
-                                'url': f"https://reddit.com{post_data.get('permalink', '')}",
-                                'author': post_data.get('author', ''),
-                                'text': selftext[:300] if selftext else '',
-                                'created': post_data.get('created_utc', 0)
-                            })
-                    else:
-                        print(f"  ❌ Ошибка {response.status_code} для r/{subreddit}")
-                except Exception as e:
-                    print(f"  ❌ Исключение для r/{subreddit}: {e}")
-                    continue
+
+            with ThreadPoolExecutor(max_workers=len(subreddits)) as ex:
+                futures = {ex.submit(self._fetch_subreddit, sr, search_query): sr for sr in subreddits}
+                for fut in as_completed(futures):
+                    all_results.extend(fut.result() or [])
             
             print(f"📊 Всего найдено: {len(all_results)} результатов")
             
-            # Сортируем по популярности
-            all_results.sort(key=lambda x: x['score'], reverse=True)
-            return all_results[:5]
+            # Топ-5 по популярности без полной сортировки
+            return heapq.nlargest(5, all_results, key=_score)
             
         except Exception as e:
             return [{'error': f'Ошибка общего поиска: {str(e)}'}]
@@ -177,19 +233,12 @@ class WebResearchAgent:
         """Выполнить поиск"""
         print(f"🔍 Выполняю поиск: {task}")
         
-        results = []
-        
-        # Поиск в Reddit
-        reddit_results = self.search_reddit(task)
-        results.extend(reddit_results)
-
-        # Общий поиск
-        general_results = self.search_general(task)
-        results.extend(general_results)
-
-        # Поиск в Google
-        google_results = self.search_google(task)
-        results.extend(google_results)
+        # Reddit, общий поиск и Google — параллельно (сессия потокобезопасна для GET)
+        with ThreadPoolExecutor(max_workers=3) as ex:
+            reddit_f = ex.submit(self.search_reddit, task)
+            general_f = ex.submit(self.search_general, task)
+            google_f = ex.submit(self.search_google, task)
+            results = reddit_f.result() + general_f.result() + google_f.result()
         
         return {
             'agent': 'Web Research Agent',
@@ -4,25 +4,48 @@
 """
 
 import os
+import io
 import requests
 import json
 from datetime import datetime
 import time
 import re
+import random
+import threading
+import functools
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
 from urllib.parse import quote_plus
-from bs4 import BeautifulSoup
 import logging
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
 try:
     import requests_cache  # type: ignore
 except Exception:  # optional
     requests_cache = None
 
+try:
+    import orjson  # type: ignore
+except Exception:  # optional: быстрый C-парсер JSON
+    orjson = None  # type: ignore
+
+try:
+    from lxml import etree as lxml_etree, html as lxml_html  # type: ignore
+except Exception:  # optional: C parsers; otherwise BeautifulSoup (imported lazily)
+    lxml_etree = None  # type: ignore
+    lxml_html = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
+# vqd-токен DDG: оба формата одной скомпилированной альтернацией — один проход по HTML
+_VQD_RE = re.compile(r'vqd=([0-9-]+)|"vqd":"([^"]+)"')
+# Обёртка JSONP ответа d.js: `DDG.pageLayout.load(<json>);`
+_DDG_PREFIX = b'DDG.pageLayout.load('
+_DDG_SUFFIX_LEN = 2
+
 def _normalize_result(title: str, url: str, snippet: str = "", source: str = "Unknown", metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     return {
         "title": title or "Без названия",
@@ -32,23 +55,241 @@ def _normalize_result(title: str, url: str, snippet: str = "", source: str = "Un
         "metadata": metadata or {}
     }
 
+def _parse_json(resp: requests.Response) -> Any:
+    """JSON-тело ответа: orjson прямо из bytes (без декодирования в str), иначе requests."""
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return resp.json()
+
+def _read_capped(resp: requests.Response, limit: int, chunk_size: int = 65536) -> bytes:
+    """Дочитать stream=True ответ в память, но не больше `limit` байт (IOError при превышении)."""
+    declared = resp.headers.get('Content-Length')
+    if declared and declared.isdigit() and int(declared) > limit:
+        resp.close()
+        raise IOError(f"response too large: Content-Length {declared} > {limit}")
+    buf = bytearray()
+    for chunk in resp.iter_content(chunk_size):
+        buf += chunk
+        if len(buf) > limit:
+            resp.close()
+            raise IOError(f"response too large: more than {limit} bytes")
+    body = bytes(buf)
+    # Дальше ответ ведёт себя как обычный (не потоковый): .content/.text/.json() берут этот буфер
+    resp._content = body  # type: ignore[attr-defined]
+    resp._content_consumed = True  # type: ignore[attr-defined]
+    return body
+
+def _ddg_html_links(html_text: str, limit: int) -> List[Tuple[str, str]]:
+    """(title, href) для ссылок `.result__a` HTML-выдачи DDG: lxml, иначе BeautifulSoup."""
+    if lxml_html is not None:
+        doc = lxml_html.fromstring(html_text)
+        anchors = doc.xpath("//a[contains(concat(' ', normalize-space(@class), ' '), ' result__a ')]")
+        return [(a.text_content().strip(), a.get('href', '')) for a in anchors[:limit]]
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_text, 'html.parser')
+    return [(a.get_text(strip=True), a.get('href', '')) for a in soup.select('.result__a')[:limit]]
+
+
+def _rss_items(raw: bytes, limit: int) -> List[Tuple[str, str, str, str]]:
+    """(title, link, description, pubDate) из RSS: потоково через lxml.etree.iterparse, иначе BeautifulSoup."""
+    if lxml_etree is not None:
+        out: List[Tuple[str, str, str, str]] = []
+        if limit <= 0:
+            return out
+        # Один проход: каждый <item> разбираем по событию 'end', сразу освобождаем
+        # и прекращаем разбор после `limit` элементов
+        for _, item in lxml_etree.iterparse(io.BytesIO(raw), tag='item', resolve_entities=False, no_network=True):
+            out.append((item.findtext('title') or '', item.findtext('link') or '',
+                        item.findtext('description') or '', item.findtext('pubDate') or ''))
+            item.clear()
+            if len(out) >= limit:
+                break
+        return out
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(raw, 'xml')
+    out = []
+    for item in soup.find_all('item')[:limit]:
+        fields = [item.find(tag) for tag in ('title', 'link', 'description', 'pubDate')]
+        out.append(tuple(f.text if f else '' for f in fields))
+    return out  # type: ignore[return-value]
+
 class RateLimiter:
-    def __init__(self, min_interval: float = 0.5):
+    """Token bucket на ключ (хост): до `capacity` запросов сразу, дальше — по `refill_rate` в секунду.
+
+    `min_interval` сохранён для совместимости: refill_rate = 1 / min_interval.
+    Потокобезопасен — execute() зовёт бэкенды из ThreadPoolExecutor.
+    """
+
+    def __init__(self, min_interval: float = 0.5, capacity: float = 1.0, refill_rate: Optional[float] = None):
         self.min_interval = float(min_interval)
-        self._last: Dict[str, float] = {}
+        self.capacity = max(1.0, float(capacity))
+        if refill_rate is None:
+            refill_rate = 1.0 / self.min_interval if self.min_interval > 0 else float("inf")
+        self.refill_rate = float(refill_rate)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
 
     def wait(self, key: str) -> None:
-        now = time.time()
-        last = self._last.get(key, 0.0)
-        delta = now - last
-        if delta < self.min_interval:
-            time.sleep(self.min_interval - delta)
-        self._last[key] = time.time()
+        if self.refill_rate == float("inf"):
+            return
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.refill_rate)
+            # Токен резервируем сразу (баланс может уйти в минус), спим уже без блокировки:
+            # конкурирующие потоки встают в очередь за следующими токенами, а не за одним
+            tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+        if tokens < 0:
+            time.sleep(-tokens / self.refill_rate)
+
+class CircuitBreaker:
+    """CLOSED → OPEN → HALF_OPEN для одного бэкенда: при падении провайдера отказываем сразу,
+    а не ждём timeout * (retries + 1) на каждом вызове.
+
+    - CLOSED: запросы идут; `failure_threshold` неудач подряд → OPEN.
+    - OPEN: can_execute() == False, пока не пройдёт `timeout_duration` секунд → HALF_OPEN.
+    - HALF_OPEN: пробные запросы; `success_threshold` успехов → CLOSED, любая неудача → OPEN.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, timeout_duration: float = 30.0, success_threshold: int = 2):
+        self.failure_threshold = int(failure_threshold)
+        self.timeout_duration = float(timeout_duration)
+        self.success_threshold = int(success_threshold)
+        self.state = self.CLOSED
+        self._failures = 0
+        self._successes = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def can_execute(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.timeout_duration:
+                    return False
+                self.state = self.HALF_OPEN
+                self._successes = 0
+            return True
+
+    def record_outcome(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._failures = 0
+                if self.state == self.HALF_OPEN:
+                    self._successes += 1
+                    if self._successes >= self.success_threshold:
+                        self.state = self.CLOSED
+                return
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._successes = 0
+
+class JitteredRetry(Retry):
+    """Retry с "full jitter": пауза ~ U(0, backoff_factor * 2**n) вместо детерминированной.
+
+    Агенты, одновременно получившие 429, не повторяют запрос синхронно («thundering herd»).
+    Retry.new() создаёт копии через type(self), так что jitter сохраняется между попытками.
+    """
+
+    def get_backoff_time(self) -> float:
+        return random.uniform(0, super().get_backoff_time())
+
+# Один Session на процесс для данной конфигурации retry: пул TCP/TLS keep-alive переживает
+# пересоздание агента (шаги pipeline и планировщик создают WorkingWebAgent на каждый запуск).
+_SESSIONS: Dict[Tuple[int, float], requests.Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+def _shared_session(retries: int, backoff: float) -> requests.Session:
+    key = (int(retries), float(backoff))
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Connection': 'keep-alive',
+            })
+            # Minimal retry/backoff (with full jitter)
+            retry_cfg = JitteredRetry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET", "HEAD"],
+                raise_on_status=False,
+            )
+            # Пул под параллельный fan-out: иначе urllib3 (10 по умолчанию) выбрасывает
+            # соединения ("Connection pool is full") и keep-alive теряется
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry_cfg, pool_block=False)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSIONS[key] = session
+        return session
+
+def _cached_search(backend: str) -> Callable:
+    """Кэш результатов search_* в памяти агента: TTL LRU по ключу (backend, нормализованный запрос).
+
+    Кэшируются только непустые ответы без ошибок — сбой или открытый circuit breaker не «залипает».
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(self: "WorkingWebAgent", query: str, *args: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+            key = (backend, query.lower().strip())
+            now = time.monotonic()
+            with self._cache_lock:
+                hit = self._cache.get(key)
+                if hit is not None:
+                    if now - hit[0] < self.cache_ttl:
+                        self._cache.move_to_end(key)
+                        logger.debug("%s cache hit: %s", backend, query)
+                        return list(hit[1])
+                    del self._cache[key]
+            results = fn(self, query, *args, **kwargs)
+            if results and not any('error' in r for r in results):
+                with self._cache_lock:
+                    self._cache[key] = (time.monotonic(), list(results))
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.cache_maxsize:
+                        self._cache.popitem(last=False)
+            return results
+        return wrapper
+    return decorator
+
+def _bulkhead(backend: str) -> Callable:
+    """Bulkhead: не больше BULKHEAD_SIZE одновременных вызовов бэкенда на агента.
+
+    Если слот не освободился за BULKHEAD_WAIT секунд (хост завис), сразу отдаём [] —
+    потоки пула остаются свободными для остальных бэкендов.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(self: "WorkingWebAgent", query: str, *args: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+            sem = self._bulkheads[backend]
+            if not sem.acquire(timeout=self.BULKHEAD_WAIT):
+                logger.warning("%s bulkhead full, skipping", backend)
+                return []
+            try:
+                return fn(self, query, *args, **kwargs)
+            finally:
+                sem.release()
+        return wrapper
+    return decorator
 
 class WorkingWebAgent:
-    def __init__(self, timeout: float = 10.0, max_results: int = 5, retries: int = 2, backoff: float = 0.5, verbose: bool = False):
+    REDDIT_PUBLIC_BASE = "https://www.reddit.com"
+    REDDIT_OAUTH_BASE = "https://oauth.reddit.com"
+    BULKHEAD_SIZE = 4
+    BULKHEAD_WAIT = 0.5
+    MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+
+    def __init__(self, timeout: float = 10.0, max_results: int = 5, retries: int = 2, backoff: float = 0.5, verbose: bool = False, deadline: Optional[float] = None):
         self.timeout = timeout
         self.max_results = max_results
+        # Общий дедлайн execute(): не успевший бэкенд отбрасывается, отдаём частичный результат
+        self.deadline = float(deadline if deadline is not None else os.environ.get("AI_STACK_EXECUTE_DEADLINE", "6"))
 
         level = logging.DEBUG if verbose else logging.INFO
         if os.environ.get("AI_STACK_JSON_LOGS", "0") == "1":
@@ -61,46 +302,121 @@ class WorkingWebAgent:
         if requests_cache is not None and os.environ.get("AI_STACK_HTTP_CACHE", "0") == "1":
             requests_cache.install_cache("web_cache", expire_after=int(os.environ.get("AI_STACK_HTTP_CACHE_TTL", "300")))
 
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-
-        # Minimal retry/backoff
-        retry_cfg = Retry(
-            total=retries,
-            backoff_factor=backoff,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET", "HEAD"],
-            raise_on_status=False,
-        )
-        adapter = HTTPAdapter(max_retries=retry_cfg)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        self.session = _shared_session(retries, backoff)
+        # Заголовки Reddit без авторизации собираем один раз; Authorization добавляется копией
+        self._reddit_base_headers: Dict[str, str] = {"User-Agent": self.session.headers.get("User-Agent", "")}
         logger.debug("Session initialized with retries=%s backoff=%s timeout=%s", retries, backoff, timeout)
 
-        # Simple rate limiter
-        self.ratelimiter = RateLimiter(min_interval=float(os.environ.get("AI_STACK_RATE_INTERVAL", "0.5")))
+        # Token-bucket rate limiter (per host)
+        self.ratelimiter = RateLimiter(
+            min_interval=float(os.environ.get("AI_STACK_RATE_INTERVAL", "0.5")),
+            capacity=float(os.environ.get("AI_STACK_RATE_BURST", "3")),
+        )
+
+        # Circuit breaker на каждый бэкенд: упавший провайдер не тормозит остальные в execute()
+        self._cb: Dict[str, CircuitBreaker] = {
+            "ddg": CircuitBreaker(),
+            "reddit": CircuitBreaker(),
+            "news": CircuitBreaker(),
+        }
+
+        # Bulkhead на каждый бэкенд: медленный хост не занимает все потоки
+        self._bulkheads: Dict[str, threading.BoundedSemaphore] = {
+            name: threading.BoundedSemaphore(self.BULKHEAD_SIZE) for name in ("ddg", "reddit", "news")
+        }
+
+        # In-process TTL LRU результатов (повторный execute с тем же task не идёт в сеть)
+        self.cache_maxsize = 256
+        self.cache_ttl = 300.0
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # vqd-токен DDG не привязан к запросу и живёт минуты: (vqd, ts) позволяет пропустить preflight-GET
+        self.vqd_ttl = 120.0
+        self._vqd_cache: Optional[Tuple[str, float]] = None
 
         # Optional API keys
         self.serpapi_key = os.environ.get("SERPAPI_KEY")
         self.tavily_key = os.environ.get("TAVILY_API_KEY")
         self.reddit_client_id = os.environ.get("REDDIT_CLIENT_ID")
         self.reddit_client_secret = os.environ.get("REDDIT_CLIENT_SECRET")
+        # OAuth-токен Reddit живёт ~3600с: храним (token, expires_at) и не выпускаем новый на каждый поиск
+        self._reddit_token: Optional[Tuple[str, float]] = None
+        self._reddit_token_lock = threading.Lock()
     
-    def search_duckduckgo(self, query: str) -> List[Dict[str, Any]]:
-        """Поиск: при наличии SERPAPI_KEY используем SerpAPI; иначе DDG с fallback."""
+    def _get(self, backend: str, url: str, **kwargs: Any) -> requests.Response:
+        """session.get с учётом исхода в circuit breaker бэкенда (сеть, 429 и 5xx — неудача).
+
+        Тело читается потоково и не больше MAX_RESPONSE_BYTES (иначе IOError), поэтому
+        .content/.text/.json() ответа дальше работают с уже ограниченным буфером.
+        """
+        try:
+            resp = self.session.get(url, stream=True, **kwargs)
+            _read_capped(resp, self.MAX_RESPONSE_BYTES)
+        except requests.RequestException:
+            self._cb[backend].record_outcome(False)
+            raise
+        self._cb[backend].record_outcome(resp.status_code != 429 and resp.status_code < 500)
+        return resp
+
+    def _ddg_djs(self, query: str, vqd: str) -> Tuple[Optional[List[Dict[str, Any]]], int]:
+        """Запрос d.js с данным vqd: (результаты, статус); None — ответ не в ожидаемом формате."""
+        search_url = "https://links.duckduckgo.com/d.js"
+        params = {
+            'q': query,
+            'vqd': vqd,
+            'l': 'us-en',
+            'p': '',
+            's': '0',
+            'df': '',
+            'ex': '-1'
+        }
+        self.ratelimiter.wait("links.duckduckgo.com")
+        response = self._get("ddg", search_url, params=params, timeout=self.timeout)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("DDG d.js status=%s len=%s", response.status_code, len(response.content))
+
+        if response.status_code == 200:
+            # Разбираем bytes напрямую: без декодирования тела в str и без копии-среза строки
+            raw = response.content
+            if raw.startswith(_DDG_PREFIX):
+                payload = memoryview(raw)[len(_DDG_PREFIX):-_DDG_SUFFIX_LEN]
+                data = orjson.loads(payload) if orjson is not None else json.loads(bytes(payload))
+                items = data.get('results', [])[: self.max_results]
+                results = []
+                for result in items:
+                    results.append(_normalize_result(
+                        title=result.get('t', 'Без названия'),
+                        url=result.get('u', ''),
+                        snippet=result.get('a', ''),
+                        source="DuckDuckGo"
+                    ))
+                logger.info("DDG results=%d", len(results))
+                return results, response.status_code
+        return None, response.status_code
+
+    @_cached_search("ddg")
+    @_bulkhead("ddg")
+    def search_duckduckgo(self, query: str, encoded: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Поиск: при наличии SERPAPI_KEY используем SerpAPI; иначе DDG с fallback.
+
+        `encoded` — уже готовый quote_plus(query) (execute() считает его один раз на все бэкенды).
+        """
+        if not self._cb["ddg"].can_execute():
+            logger.warning("DDG circuit open, skipping")
+            return []
         try:
             if self.serpapi_key:
                 logger.info("SerpAPI search: %s", query)
                 self.ratelimiter.wait("serpapi")
-                resp = self.session.get(
+                resp = self._get(
+                    "ddg",
                     "https://serpapi.com/search.json",
                     params={"engine": "duckduckgo", "q": query, "api_key": self.serpapi_key},
                     timeout=self.timeout,
                 )
                 if resp.status_code == 200:
-                    data = resp.json()
+                    data = _parse_json(resp)
                     organic = data.get("organic_results") or []
                     out: List[Dict[str, Any]] = []
                     for r in organic[: self.max_results]:
@@ -108,69 +424,49 @@ class WorkingWebAgent:
                     return out
                 logger.warning("SerpAPI HTTP %s", resp.status_code)
             logger.info("DDG search: %s", query)
+            # 0) vqd из недавнего запроса ещё действителен — сразу в d.js, без preflight-GET
+            cached = self._vqd_cache
+            if cached and time.time() - cached[1] < self.vqd_ttl:
+                results, status = self._ddg_djs(query, cached[0])
+                if results is not None:
+                    return results
+                logger.debug("DDG cached vqd rejected (status=%s), refreshing", status)
+                self._vqd_cache = None
+
             # 1) Получаем токен/страницу
             self.ratelimiter.wait("duckduckgo.com")
             url = "https://duckduckgo.com/"
-            response = self.session.get(url, timeout=self.timeout)
+            response = self._get("ddg", url, timeout=self.timeout)
             logger.debug("DDG home status=%s", response.status_code)
 
             # 2) Ищем vqd токен
-            vqd_match = re.search(r'vqd=([0-9-]+)', response.text) or re.search(r'"vqd":"([^"]+)"', response.text)
+            vqd_match = _VQD_RE.search(response.text)
             if not vqd_match:
                 logger.warning("DDG vqd token not found, fallback to html SERP")
                 # Fallback: парс HTML выдачи
                 self.ratelimiter.wait("duckduckgo.com/html")
-                serp = self.session.get(f"https://duckduckgo.com/html/?q={quote_plus(query)}", timeout=self.timeout)
+                serp = self._get("ddg", f"https://duckduckgo.com/html/?q={encoded or quote_plus(query)}", timeout=self.timeout)
                 if serp.status_code != 200:
                     return [{'error': f'DDG HTML fallback HTTP {serp.status_code}'}]
-                soup = BeautifulSoup(serp.text, 'html.parser')
                 results = []
-                for a in soup.select('.result__a')[: self.max_results]:
-                    title = a.get_text(strip=True)
-                    href = a.get('href', '')
+                for title, href in _ddg_html_links(serp.text, self.max_results):
                     # filter out internal duckduckgo redirects/ads
                     if href and href.startswith('http') and 'duckduckgo.com' not in href:
                         results.append(_normalize_result(title=title, url=href, source="DuckDuckGo"))
                 logger.info("DDG HTML fallback results=%d", len(results))
                 return results
 
-            vqd = vqd_match.group(1)
+            vqd = vqd_match.group(1) or vqd_match.group(2)
             logger.debug("DDG vqd=%s", vqd)
 
             # 3) Выполняем поиск через d.js
-            search_url = "https://links.duckduckgo.com/d.js"
-            params = {
-                'q': query,
-                'vqd': vqd,
-                'l': 'us-en',
-                'p': '',
-                's': '0',
-                'df': '',
-                'ex': '-1'
-            }
-            self.ratelimiter.wait("links.duckduckgo.com")
-            response = self.session.get(search_url, params=params, timeout=self.timeout)
-            logger.debug("DDG d.js status=%s len=%s", response.status_code, len(response.text or ""))
-
-            if response.status_code == 200:
-                text = response.text
-                if text.startswith('DDG.pageLayout.load('):
-                    json_str = text[len('DDG.pageLayout.load('):-2]
-                    data = json.loads(json_str)
-                    items = data.get('results', [])[: self.max_results]
-                    results = []
-                    for result in items:
-                        results.append(_normalize_result(
-                            title=result.get('t', 'Без названия'),
-                            url=result.get('u', ''),
-                            snippet=result.get('a', ''),
-                            source="DuckDuckGo"
-                        ))
-                    logger.info("DDG results=%d", len(results))
-                    return results
+            results, status = self._ddg_djs(query, vqd)
+            if results is not None:
+                self._vqd_cache = (vqd, time.time())
+                return results
 
-            logger.error("DDG d.js unexpected status=%s", response.status_code)
-            return [{'error': f'DuckDuckGo HTTP {response.status_code}'}]
+            logger.error("DDG d.js unexpected status=%s", status)
+            return [{'error': f'DuckDuckGo HTTP {status}'}]
         except Exception as e:
             logger.exception("DDG search error: %s", e)
             return [{'error': f'Ошибка поиска DuckDuckGo: {str(e)}'}]
@@ -178,65 +474,77 @@ class WorkingWebAgent:
     def _reddit_bearer(self) -> Optional[str]:
         if not (self.reddit_client_id and self.reddit_client_secret):
             return None
+        with self._reddit_token_lock:
+            cached = self._reddit_token
+            if cached and cached[1] > time.time() + 30:
+                return cached[0]
+            try:
+                auth = requests.auth.HTTPBasicAuth(self.reddit_client_id, self.reddit_client_secret)  # type: ignore
+                self.ratelimiter.wait("reddit_token")
+                resp = self.session.post("https://www.reddit.com/api/v1/access_token", data={"grant_type": "client_credentials"}, auth=auth, timeout=self.timeout)
+                if resp.status_code == 200:
+                    data = _parse_json(resp)
+                    token = data.get("access_token")
+                    if token:
+                        self._reddit_token = (token, time.time() + float(data.get("expires_in") or 3600))
+                    return token
+            except Exception:
+                return None
+            return None
+
+    def _reddit_query(self, url: str, search_query: str, headers: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Запрос к Reddit search.json; при ошибке — пустой список."""
+        params = {
+            'q': search_query,
+            'limit': self.max_results,
+            'sort': 'new',
+            't': 'all'
+        }
+        results: List[Dict[str, Any]] = []
         try:
-            auth = requests.auth.HTTPBasicAuth(self.reddit_client_id, self.reddit_client_secret)  # type: ignore
-            self.ratelimiter.wait("reddit_token")
-            resp = self.session.post("https://www.reddit.com/api/v1/access_token", data={"grant_type": "client_credentials"}, auth=auth, timeout=self.timeout)
+            self.ratelimiter.wait("reddit")
+            resp = self._get("reddit", url, params=params, headers=headers, timeout=self.timeout)
+            logger.debug("Reddit status=%s for q='%s'", resp.status_code, search_query)
             if resp.status_code == 200:
-                return resp.json().get("access_token")
-        except Exception:
-            return None
-        return None
+                data = _parse_json(resp)
+                posts = data.get('data', {}).get('children', [])
+                logger.debug("Reddit posts=%d", len(posts))
+                for post in posts[: self.max_results]:
+                    pd = post.get('data', {})
+                    results.append(_normalize_result(
+                        title=pd.get('title', ''),
+                        url=f"https://reddit.com{pd.get('permalink', '')}",
+                        snippet=(pd.get('selftext', '') or '')[:300],
+                        source="Reddit",
+                        metadata={
+                            "subreddit": pd.get('subreddit', ''),
+                            "score": pd.get('score', 0),
+                            "author": pd.get('author', '')
+                        }
+                    ))
+            elif resp.status_code in (429, 403):
+                logger.warning("Reddit rate/forbidden status=%s", resp.status_code)
+        except Exception as e:
+            logger.debug("Reddit attempt failed for q='%s': %s", search_query, e)
+        return results
 
+    @_cached_search("reddit")
+    @_bulkhead("reddit")
     def search_reddit_simple(self, query: str) -> List[Dict[str, Any]]:
         """Поиск Reddit: используем OAuth при наличии кредов, иначе публичный JSON."""
+        if not self._cb["reddit"].can_execute():
+            logger.warning("Reddit circuit open, skipping")
+            return []
         try:
             logger.info("Reddit search: %s", query)
             bearer = self._reddit_bearer()
-            headers = {"User-Agent": self.session.headers.get("User-Agent", "")}
             if bearer:
-                headers["Authorization"] = f"Bearer {bearer}"
-                base = "https://oauth.reddit.com"
+                headers = {**self._reddit_base_headers, "Authorization": f"Bearer {bearer}"}
+                base = self.REDDIT_OAUTH_BASE
             else:
-                base = "https://www.reddit.com"
-            queries_to_try = [query]
-            all_results: List[Dict[str, Any]] = []
-
-            for search_query in queries_to_try:
-                url = f"{base}/search.json"
-                params = {
-                    'q': search_query,
-                    'limit': self.max_results,
-                    'sort': 'new',
-                    't': 'all'
-                }
-                try:
-                    self.ratelimiter.wait("reddit")
-                    resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
-                    logger.debug("Reddit status=%s for q='%s'", resp.status_code, search_query)
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        posts = data.get('data', {}).get('children', [])
-                        logger.debug("Reddit posts=%d", len(posts))
-                        for post in posts[: self.max_results]:
-                            pd = post.get('data', {})
-                            all_results.append(_normalize_result(
-                                title=pd.get('title', ''),
-                                url=f"https://reddit.com{pd.get('permalink', '')}",
-                                snippet=(pd.get('selftext', '') or '')[:300],
-                                source="Reddit",
-                                metadata={
-                                    "subreddit": pd.get('subreddit', ''),
-                                    "score": pd.get('score', 0),
-                                    "author": pd.get('author', '')
-                                }
-                            ))
-                    elif resp.status_code in (429, 403):
-                        logger.warning("Reddit rate/forbidden status=%s", resp.status_code)
-                        continue
-                except Exception as e:
-                    logger.debug("Reddit attempt failed for q='%s': %s", search_query, e)
-                    continue
+                headers = self._reddit_base_headers
+                base = self.REDDIT_PUBLIC_BASE
+            all_results = self._reddit_query(f"{base}/search.json", query, headers)
 
             logger.info("Reddit results=%d", len(all_results))
             return all_results[: self.max_results]
@@ -244,26 +552,25 @@ class WorkingWebAgent:
             logger.exception("Reddit search error: %s", e)
             return [{'error': f'Ошибка поиска Reddit: {str(e)}'}]
     
-    def search_news_sites(self, query: str) -> List[Dict[str, Any]]:
-        """Поиск по новостным сайтам"""
+    @_cached_search("news")
+    @_bulkhead("news")
+    def search_news_sites(self, query: str, encoded: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Поиск по новостным сайтам (`encoded` — готовый quote_plus(query), см. search_duckduckgo)"""
+        if not self._cb["news"].can_execute():
+            logger.warning("News circuit open, skipping")
+            return []
         try:
             logger.info("News search: %s", query)
-            search_query = quote_plus(query)
+            search_query = encoded or quote_plus(query)
             url = f"https://news.google.com/rss/search?q={search_query}&hl=en-US&gl=US&ceid=US:en"
             self.ratelimiter.wait("news.google.com")
-            resp = self.session.get(url, timeout=self.timeout)
+            resp = self._get("news", url, timeout=self.timeout)
             logger.debug("News RSS status=%s", resp.status_code)
             if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, 'xml')
-                items = soup.find_all('item')[: self.max_results]
                 results: List[Dict[str, Any]] = []
-                for item in items:
-                    title = item.find('title').text if item.find('title') else 'Без названия'
-                    link = item.find('link').text if item.find('link') else ''
-                    description = item.find('description').text if item.find('description') else ''
-                    pub_date = item.find('pubDate').text if item.find('pubDate') else ''
+                for title, link, description, pub_date in _rss_items(resp.content, self.max_results):
                     results.append(_normalize_result(
-                        title=title,
+                        title=title or 'Без названия',
                         url=link,
                         snippet=description,
                         source="Google News",
@@ -277,22 +584,53 @@ class WorkingWebAgent:
             logger.exception("News search error: %s", e)
             return []
     
-    def execute(self, task: str) -> Dict[str, Any]:
-        """Выполнить комплексный поиск"""
+    def execute(self, task: str, sources: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+        """Выполнить комплексный поиск
+
+        sources — подмножество бэкендов ("ddg", "reddit", "news"); по умолчанию все.
+        Ненужные источники не запрашиваются вовсе (например, search:news берёт только "news").
+        """
         logger.info("Execute task: %s", task)
         all_results: List[Dict[str, Any]] = []
 
-        # 1) DuckDuckGo / SerpAPI
-        ddg = self.search_duckduckgo(task)
-        all_results.extend([r for r in ddg if 'error' not in r])
-
-        # 2) Reddit
-        red = self.search_reddit_simple(task)
-        all_results.extend([r for r in red if 'error' not in r])
-
-        # 3) News
-        news = self.search_news_sites(task)
-        all_results.extend([r for r in news if 'error' not in r])
+        # DuckDuckGo / SerpAPI, Reddit и News независимы (I/O-bound) — запускаем параллельно,
+        # общее время ≈ самый медленный источник. Порядок результатов сохраняем прежним.
+        # URL-кодированный запрос нужен DDG (HTML fallback) и News — считаем один раз
+        encoded_task = quote_plus(task)
+        backends = [
+            ("ddg", self.search_duckduckgo, {"encoded": encoded_task}),
+            ("reddit", self.search_reddit_simple, {}),
+            ("news", self.search_news_sites, {"encoded": encoded_task}),
+        ]
+        if sources is not None:
+            backends = [b for b in backends if b[0] in sources]
+        if not backends:
+            return {'agent': 'Working Web Research Agent', 'task': task, 'results': [], 'count': 0,
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        by_backend: Dict[str, List[Dict[str, Any]]] = {}
+        ex = ThreadPoolExecutor(max_workers=len(backends))
+        try:
+            futures = {ex.submit(fn, task, **kw): name for name, fn, kw in backends}
+            done, pending = futures_wait(futures, timeout=self.deadline)
+            for fut in done:
+                by_backend[futures[fut]] = fut.result() or []
+            for fut in pending:
+                logger.warning("Backend %s missed the %.1fs deadline, skipping", futures[fut], self.deadline)
+        finally:
+            # Не ждём зависшие запросы: поток завершится сам по self.timeout
+            ex.shutdown(wait=False, cancel_futures=True)
+        # Один и тот же URL часто приходит и из DDG, и из News: оставляем первое вхождение
+        # (порядок источников сохраняется) и ограничиваем объём max_results * 3
+        cap = self.max_results * 3
+        seen: set = set()
+        for r in itertools.chain.from_iterable(by_backend.get(name, []) for name, _, _ in backends):
+            u = r.get('url')
+            if 'error' in r or not u or u in seen:
+                continue
+            seen.add(u)
+            all_results.append(r)
+            if len(all_results) >= cap:
+                break
 
         logger.info("Total results=%d", len(all_results))
         return {
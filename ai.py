@@ -17,13 +17,14 @@ This is a thin wrapper around existing scripts (chat.py, cli.py, orchestrator, d
 """
 from __future__ import annotations
 import argparse
-import json
+import copy
+import functools
 import os
+import re
 import sys
-import subprocess
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Optional, Any, Dict
-import glob as _glob
+from typing import Callable, List, Optional, Any, Dict, Tuple
 
 def _detect_repo_root() -> Path:
     # Prefer current working directory if it looks like the project root
@@ -33,26 +34,64 @@ def _detect_repo_root() -> Path:
     return Path(__file__).resolve().parent
 
 REPO_ROOT = _detect_repo_root()
+CHAT_PY = str(REPO_ROOT / "chat.py")
+CLI_PY = str(REPO_ROOT / "cli.py")
+COMPOSE_YML = str(REPO_ROOT / "docker-compose.yml")
+_REPO_STR = str(REPO_ROOT)
 
-# Local imports for config operations
-try:
-    import yaml  # type: ignore
-except Exception:
-    yaml = None  # config init will fail gracefully if yaml is missing
-
-try:
-    from config import load_config, AppConfig, DEFAULT_CONFIG_PATH  # type: ignore
-except Exception:
-    # allow running docker subcommands etc. even if local imports fail
-    load_config = None  # type: ignore
-    AppConfig = None  # type: ignore
-    DEFAULT_CONFIG_PATH = os.environ.get(
-        "AI_STACK_CONFIG",
-        "/Users/onopriychukpavel/Library/Mobile Documents/iCloud~md~obsidian/Documents/Version1/ai_agents_stack.config.yaml",
+# Heavy imports (PyYAML, config, subprocess, json) are deferred to the branches
+# that need them, so `ai.py --help`, `docker ...` etc. start without paying for them.
+_yaml: Any = None
+
+
+def _import_yaml() -> Any:
+    """Import PyYAML on first use; None if it is not installed."""
+    global _yaml
+    if _yaml is None:
+        try:
+            import yaml  # type: ignore
+        except Exception:
+            return None  # agents/config commands fail gracefully if yaml is missing
+        _yaml = yaml
+    return _yaml
+
+
+def _yaml_io(yaml: Any) -> Tuple[Any, Any]:
+    """(Loader, Dumper): libyaml's C implementations when PyYAML was built with them."""
+    return (getattr(yaml, "CSafeLoader", yaml.SafeLoader), getattr(yaml, "CSafeDumper", yaml.SafeDumper))
+
+
+def _default_config_path() -> str:
+    """AI_STACK_CONFIG, else the config in the default iCloud Obsidian vault (resolved at call time)."""
+    return os.environ.get("AI_STACK_CONFIG") or os.path.expanduser(
+        "~/Library/Mobile Documents/iCloud~md~obsidian/Documents/Version1/ai_agents_stack.config.yaml"
     )
 
 
+def _import_config() -> Tuple[Any, str]:
+    """Return (load_config, effective config path), importing config.py on first use."""
+    try:
+        from config import load_config, DEFAULT_CONFIG_PATH  # type: ignore
+        # config.py already applies the AI_STACK_CONFIG override
+        return load_config, DEFAULT_CONFIG_PATH
+    except Exception:
+        # allow running config show/init even if local imports fail
+        return None, _default_config_path()
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_load_config() -> Any:
+    """load_config() result, read once per process.
+
+    Fine for the one-shot CLI; a long-running caller (REPL, SIGHUP reload) should call
+    _cached_load_config.cache_clear() to pick up YAML edits.
+    """
+    load_config, _ = _import_config()
+    return load_config() if load_config is not None else None
+
+
 def _run(cmd: List[str]) -> int:
+    import subprocess
     try:
         r = subprocess.run(cmd, check=False)
         return r.returncode
@@ -61,6 +100,133 @@ def _run(cmd: List[str]) -> int:
         return 127
 
 
+def _exec(cmd: List[str]) -> int:
+    """Replace this process with `cmd` (no fork + wait); returns only if the exec fails."""
+    if os.name == "nt":
+        # os.exec* on Windows spawns a child and exits immediately — keep the blocking run
+        return _run(cmd)
+    sys.stdout.flush()
+    try:
+        os.execvp(cmd[0], cmd)
+    except FileNotFoundError as e:
+        print(f"Command not found: {cmd[0]} ({e})")
+        return 127
+    return 0  # unreachable: execvp does not return on success
+
+
+# docker compose arguments per `ai.py docker <sub>`
+_DOCKER_COMPOSE_ARGS: Dict[str, List[str]] = {
+    "up": ["--profile", "qdrant", "up", "-d"],
+    "up-all": ["--profile", "all", "up", "-d", "--build"],
+    "down": ["down"],
+    "logs": ["logs", "-f", "app"],
+    "health": ["run", "--rm", "app", "python3", "chat.py", "--health"],
+}
+
+
+def _docker_cmd(sub_cmd: str) -> List[str]:
+    return ["docker", "compose", "-f", COMPOSE_YML, *_DOCKER_COMPOSE_ARGS[sub_cmd]]
+
+
+def _fast_path(argv: List[str]) -> Optional[List[str]]:
+    """Command line for `health` / `docker <sub>` invocations, which need no argparse at all."""
+    if argv == ["health"]:
+        return [sys.executable, CHAT_PY, "--health"]
+    if len(argv) == 2 and argv[0] == "docker" and argv[1] in _DOCKER_COMPOSE_ARGS:
+        return _docker_cmd(argv[1])
+    return None
+
+
+def _abs_path(p: str) -> str:
+    return p if os.path.isabs(p) else os.path.join(_REPO_STR, p)
+
+
+# Parsed agent YAMLs: abspath -> (mtime_ns, size, data); LRU, entries revalidated by stat
+_YAML_CACHE: "OrderedDict[str, Tuple[int, int, Any]]" = OrderedDict()
+_YAML_CACHE_MAX = 100
+
+
+def _yaml_sidecar_path(path: str) -> str:
+    """JSON cache file for `path`, kept in a user cache dir (never next to the YAML itself).
+
+    Keyed by the resolved path; the location is AI_STACK_CACHE_DIR or $XDG_CACHE_HOME/vesna
+    (~/.cache/vesna by default).
+    """
+    import hashlib
+    base = os.environ.get("AI_STACK_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "vesna"
+    )
+    digest = hashlib.sha1(os.path.realpath(path).encode("utf-8", "surrogateescape")).hexdigest()
+    return os.path.join(base, "agents-yaml", digest + ".json")
+
+
+def _read_yaml_sidecar(path: str, st: os.stat_result) -> Optional[List[Dict[str, Any]]]:
+    """Parsed data from the JSON cache if it was written for this exact mtime/size."""
+    import json
+    try:
+        with open(_yaml_sidecar_path(path), "rb") as f:
+            cached = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("mtime_ns") != st.st_mtime_ns or cached.get("size") != st.st_size:
+        return None
+    return cached.get("data")
+
+
+def _write_yaml_sidecar(path: str, st: os.stat_result, data: Any) -> None:
+    """Store parsed YAML as JSON in the cache dir, so warm runs skip PyYAML entirely."""
+    import json
+    side = _yaml_sidecar_path(path)
+    tmp = side + ".tmp"
+    try:
+        payload = json.dumps({"mtime_ns": st.st_mtime_ns, "size": st.st_size, "data": data}, ensure_ascii=False)
+        if json.loads(payload)["data"] != data:
+            return  # e.g. non-string mapping keys: JSON would not round-trip them
+        os.makedirs(os.path.dirname(side), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, side)
+    except (OSError, TypeError, ValueError):
+        # unwritable cache dir, or YAML values JSON can't represent (dates etc.) — just skip the cache
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _load_yaml_list(path: str) -> List[Dict[str, Any]]:
+    key = _abs_path(path)
+    st = os.stat(key)
+    hit = _YAML_CACHE.get(key)
+    if hit is not None and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        _YAML_CACHE.move_to_end(key)
+        return copy.deepcopy(hit[2])
+    data = _read_yaml_sidecar(key, st)
+    if data is None:
+        yaml = _import_yaml()
+        loader, _ = _yaml_io(yaml)
+        with open(key, "rb") as f:
+            data = yaml.load(f.read(), Loader=loader) or []
+        if isinstance(data, dict):
+            data = [data]
+        _write_yaml_sidecar(key, st, data)
+    _YAML_CACHE[key] = (st.st_mtime_ns, st.st_size, data)
+    _YAML_CACHE.move_to_end(key)
+    if len(_YAML_CACHE) > _YAML_CACHE_MAX:
+        _YAML_CACHE.popitem(last=False)
+    # callers mutate the items (enable/disable), so never hand out the cached object
+    return copy.deepcopy(data)
+
+
+def _write_yaml_list(path: str, items: List[Dict[str, Any]]) -> None:
+    yaml = _import_yaml()
+    p = _abs_path(path)
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    _, dumper = _yaml_io(yaml)
+    with open(p, "w", encoding="utf-8") as f:
+        yaml.dump(items if len(items) != 1 else items[0], f, Dumper=dumper, allow_unicode=True, sort_keys=False)
+
+
 def _append_filters(cmd: List[str], ns: argparse.Namespace) -> None:
     if getattr(ns, "filter_source", None):
         cmd += ["--filter-source", ns.filter_source]
@@ -70,16 +236,27 @@ def _append_filters(cmd: List[str], ns: argparse.Namespace) -> None:
         cmd += ["--filter-date", ns.filter_date]
 
 
-def build_parser() -> argparse.ArgumentParser:
+_FILTER_SOURCES = ("DuckDuckGo", "Reddit", "Google News", "test", "obsidian_md")
+
+
+def _add_filter_args(sp: argparse.ArgumentParser) -> None:
+    sp.add_argument("--filter-source", choices=_FILTER_SOURCES)
+    sp.add_argument("--filter-domain")
+    sp.add_argument("--filter-date")
+
+
+def _build_root() -> Tuple[argparse.ArgumentParser, Any]:
     p = argparse.ArgumentParser(description="AI unified CLI")
     p.add_argument("-v", "--verbose", action="store_true")
-
     sub = p.add_subparsers(dest="cmd")
+    return p, sub
+
 
-    # health
-    sp_h = sub.add_parser("health", help="Run local health-check")
+def _build_health(sub: Any) -> None:
+    sub.add_parser("health", help="Run local health-check")
 
-    # agents management
+
+def _build_agents(sub: Any) -> None:
     sp_agents = sub.add_parser("agents", help="Manage agents (list, enable/disable, new, validate)")
     sp_agents_sub = sp_agents.add_subparsers(dest="agents_cmd")
 
@@ -107,39 +284,37 @@ def build_parser() -> argparse.ArgumentParser:
     sp_av = sp_agents_sub.add_parser("validate", help="Validate that steps used in YAML exist in Registry")
     sp_av.add_argument("--file", required=True)
 
-    # steps list
+
+def _build_steps(sub: Any) -> None:
     sp_steps = sub.add_parser("steps", help="Steps related commands")
     sp_steps_sub = sp_steps.add_subparsers(dest="steps_cmd")
-    sp_steps_list = sp_steps_sub.add_parser("list", help="List registered steps")
+    sp_steps_sub.add_parser("list", help="List registered steps")
 
-    # search group
+
+def _build_search(sub: Any) -> None:
     sp_search = sub.add_parser("search", help="Search commands")
     sp_search_sub = sp_search.add_subparsers(dest="search_cmd")
 
     sp_sw = sp_search_sub.add_parser("web", help="Web search via chat.py")
     sp_sw.add_argument("query", nargs="+", help="query text")
     sp_sw.add_argument("--save", action="store_true")
-    for sp in [sp_sw]:
-        sp.add_argument("--filter-source", choices=["DuckDuckGo", "Reddit", "Google News", "test", "obsidian_md"])
-        sp.add_argument("--filter-domain")
-        sp.add_argument("--filter-date")
+    _add_filter_args(sp_sw)
 
     sp_sn = sp_search_sub.add_parser("news", help="News search (Google News)")
     sp_sn.add_argument("query", nargs="+", help="query text")
     sp_sn.add_argument("--save", action="store_true")
-    for sp in [sp_sn]:
-        sp.add_argument("--filter-source", choices=["DuckDuckGo", "Reddit", "Google News", "test", "obsidian_md"])
-        sp.add_argument("--filter-domain")
-        sp.add_argument("--filter-date")
+    _add_filter_args(sp_sn)
+
 
-    # index results
+def _build_index(sub: Any) -> None:
     sp_index = sub.add_parser("index", help="Index operations")
     sp_index_sub = sp_index.add_subparsers(dest="index_cmd")
     sp_ir = sp_index_sub.add_parser("results", help="Save JSON results to Obsidian Index")
     sp_ir.add_argument("json_file")
     sp_ir.add_argument("--name")
 
-    # summarize group
+
+def _build_summarize(sub: Any) -> None:
     sp_sum = sub.add_parser("summarize", help="Summarization")
     sp_sum_sub = sp_sum.add_subparsers(dest="sum_cmd")
 
@@ -151,307 +326,430 @@ def build_parser() -> argparse.ArgumentParser:
     sp_st.add_argument("query", nargs="+")
     sp_st.add_argument("--k", type=int, default=10)
     sp_st.add_argument("--title")
-    for sp in [sp_st]:
-        sp.add_argument("--filter-source", choices=["DuckDuckGo", "Reddit", "Google News", "test", "obsidian_md"])
-        sp.add_argument("--filter-domain")
-        sp.add_argument("--filter-date")
+    _add_filter_args(sp_st)
 
-    # agent
+
+def _build_agent(sub: Any) -> None:
     sp_agent = sub.add_parser("agent", help="Agent operations")
     sp_agent_sub = sp_agent.add_subparsers(dest="agent_cmd")
     sp_ar = sp_agent_sub.add_parser("run", help="Run agent by YAML config")
     sp_ar.add_argument("--config", required=True)
     sp_ar.add_argument("--id")
 
-    # schedule
+
+def _build_schedule(sub: Any) -> None:
     sp_sched = sub.add_parser("schedule", help="Scheduler operations")
     sp_sched_sub = sp_sched.add_subparsers(dest="sched_cmd")
     sp_ss = sp_sched_sub.add_parser("start", help="Start scheduler for agents list")
     sp_ss.add_argument("--agents", default="configs/agents/core.yaml")
     sp_ss.add_argument("--timezone")
 
-    # docker
+
+def _build_docker(sub: Any) -> None:
     sp_d = sub.add_parser("docker", help="Docker compose helpers")
     sp_d_sub = sp_d.add_subparsers(dest="docker_cmd")
-    sp_du = sp_d_sub.add_parser("up", help="Start qdrant only")
-    sp_dua = sp_d_sub.add_parser("up-all", help="Start full stack app+qdrant")
-    sp_dd = sp_d_sub.add_parser("down", help="Stop all containers")
-    sp_dl = sp_d_sub.add_parser("logs", help="Follow app logs")
-    sp_dh = sp_d_sub.add_parser("health", help="Run health inside app container")
+    sp_d_sub.add_parser("up", help="Start qdrant only")
+    sp_d_sub.add_parser("up-all", help="Start full stack app+qdrant")
+    sp_d_sub.add_parser("down", help="Stop all containers")
+    sp_d_sub.add_parser("logs", help="Follow app logs")
+    sp_d_sub.add_parser("health", help="Run health inside app container")
+
 
-    # config
+def _build_config(sub: Any) -> None:
     sp_cfg = sub.add_parser("config", help="Configuration")
     sp_cfg_sub = sp_cfg.add_subparsers(dest="cfg_cmd")
-    sp_cfg_show = sp_cfg_sub.add_parser("show", help="Show effective config")
+    sp_cfg_sub.add_parser("show", help="Show effective config")
     sp_cfg_init = sp_cfg_sub.add_parser("init", help="Initialize config YAML")
     sp_cfg_init.add_argument("--vault", required=True, help="Path to Obsidian Vault")
     sp_cfg_init.add_argument("--file", default=None, help="Path to config YAML (defaults to AI_STACK_CONFIG or project default)")
 
-    return p
 
+# Subcommand -> builder; the order is the order shown in --help
+_BUILDERS = {
+    "health": _build_health,
+    "agents": _build_agents,
+    "steps": _build_steps,
+    "search": _build_search,
+    "index": _build_index,
+    "summarize": _build_summarize,
+    "agent": _build_agent,
+    "schedule": _build_schedule,
+    "docker": _build_docker,
+    "config": _build_config,
+}
+
+
+def _sniff_subcommand(argv: List[str]) -> Optional[str]:
+    """First non-flag token of argv if it is a known subcommand (root options take no values)."""
+    for tok in argv:
+        if tok.startswith("-"):
+            continue
+        return tok if tok in _BUILDERS else None
+    return None
+
+
+@functools.cache
+def build_parser(only: Optional[str] = None) -> argparse.ArgumentParser:
+    """Full parser, or just the root plus the `only` subcommand branch.
+
+    Memoized per `only`: the returned parser is shared, callers must not add arguments to it.
+    """
+    p, sub = _build_root()
+    if only is not None:
+        _BUILDERS[only](sub)
+    else:
+        for build in _BUILDERS.values():
+            build(sub)
+    return p
 
-def main() -> int:
-    parser = build_parser()
-    args = parser.parse_args()
-
-    if args.cmd == "health":
-        cmd = [sys.executable, str(REPO_ROOT / "chat.py"), "--health"]
-        if args.verbose:
-            cmd.insert(2, "-v")
-        return _run(cmd)
 
-    # agents management commands
-    if args.cmd == "agents":
-        if yaml is None:
-            print("PyYAML is required for agents management. Please install it.")
+def _require_yaml(purpose: str) -> Any:
+    yaml = _import_yaml()
+    if yaml is None:
+        print(f"PyYAML is required for {purpose}. Please install it.")
+    return yaml
+
+
+def _cmd_health(args: argparse.Namespace) -> int:
+    cmd = [sys.executable, CHAT_PY, "--health"]
+    if args.verbose:
+        cmd.insert(2, "-v")
+    return _exec(cmd)
+
+
+def _cmd_agents_list(args: argparse.Namespace) -> int:
+    if _require_yaml("agents management") is None:
+        return 1
+    files: List[str] = []
+    if args.file:
+        files = [args.file]
+    elif args.glob:
+        # pathlib's scandir-based glob; relative patterns resolve against REPO_ROOT like --file
+        pattern = args.glob
+        if os.path.isabs(pattern):
+            anchor = Path(pattern).anchor
+            base, pattern = Path(anchor), os.path.relpath(pattern, anchor)
+        else:
+            base = REPO_ROOT
+        files = sorted(str(p) for p in base.glob(pattern))
+    else:
+        default = str(REPO_ROOT / "configs/agents/core.yaml")
+        if Path(default).exists():
+            files = [default]
+        else:
+            print("No --file provided and default configs/agents/core.yaml not found.")
             return 1
-        def _abs_path(p: str) -> Path:
-            pp = Path(p)
-            return pp if pp.is_absolute() else (REPO_ROOT / pp)
-        def _load_yaml_list(path: str) -> List[Dict[str, Any]]:
-            pth = _abs_path(path)
-            with open(pth, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f) or []
-            if isinstance(data, dict):
-                data = [data]
-            return data
-        def _write_yaml_list(path: str, items: List[Dict[str, Any]]) -> None:
-            p = _abs_path(path)
-            p.parent.mkdir(parents=True, exist_ok=True)
-            with open(p, "w", encoding="utf-8") as f:
-                yaml.safe_dump(items if len(items) != 1 else items[0], f, allow_unicode=True, sort_keys=False)
-        if args.agents_cmd == "list":
-            files: List[str] = []
-            if args.file:
-                files = [args.file]
-            elif args.glob:
-                files = sorted(_glob.glob(args.glob))
-            else:
-                default = str(REPO_ROOT / "configs/agents/core.yaml")
-                if Path(default).exists():
-                    files = [default]
-                else:
-                    print("No --file provided and default configs/agents/core.yaml not found.")
-                    return 1
-            # optional next run computation
+    # optional next run computation
+    tz = None
+    tzname = getattr(args, "timezone", None)
+    if tzname:
+        try:
+            from zoneinfo import ZoneInfo
+            tz = ZoneInfo(tzname)
+        except Exception:
             tz = None
-            tzname = getattr(args, "timezone", None)
-            if tzname:
-                try:
-                    import pytz as _pytz
-                    tz = _pytz.timezone(tzname)
-                except Exception:
-                    tz = None
-            try:
-                from croniter import croniter  # type: ignore
-                has_cron = True
-            except Exception:
-                has_cron = False
-            count = 0
-            for fp in files:
-                items = _load_yaml_list(fp)
-                for it in items:
-                    count += 1
-                    aid = it.get("id") or "<no-id>"
-                    sched = it.get("schedule") or ""
-                    enabled = it.get("enabled")
-                    enabled_s = "true" if enabled is not False else "false"
-                    line = f"{aid} | enabled={enabled_s}"
-                    if sched:
-                        line += f" | cron='{sched}'"
-                        if args.__dict__.get("next") and has_cron:
-                            try:
-                                from datetime import datetime as _dt
-                                base = _dt.now(tz) if tz else _dt.now()
-                                import croniter as _cr
-                                itrn = _cr.croniter(sched, base)
-                                nx = itrn.get_next(_dt)
-                                line += f" | next={nx.isoformat()}"
-                            except Exception:
-                                line += " | next=?"
-                        elif args.__dict__.get("next") and not has_cron:
-                            line += " | next=(install croniter)"
-                    desc = it.get("description")
-                    if desc:
-                        line += f" | {desc}"
-                    print(line)
-            if count == 0:
-                print("No agents found.")
-            return 0
-        if args.agents_cmd in ("enable", "disable"):
-            items = _load_yaml_list(args.file)
-            target = next((x for x in items if x.get("id") == args.id), None)
-            if not target:
-                print(f"Agent id not found: {args.id}")
-                return 1
-            target["enabled"] = True if args.agents_cmd == "enable" else False
-            _write_yaml_list(args.file, items)
-            print(f"Updated {args.id}: enabled={target['enabled']}")
-            return 0
-        if args.agents_cmd == "new":
-            if Path(args.file).exists():
-                print(f"Overwriting existing file: {args.file}")
-            skel: Dict[str, Any] = {
-                "id": args.id,
-                "enabled": True,
-                "retries": 2,
-                "backoff": 0.5,
-                "pipeline": [
-                    {"step": "search_web", "with": {"query": "replace me"}},
-                    {"step": "save_sources_markdown", "with": {"title": "Agent Sources: replace me"}},
-                ],
-            }
-            if args.schedule:
-                skel["schedule"] = args.schedule
-            if args.description:
-                skel["description"] = args.description
-            _write_yaml_list(args.file, [skel])
-            print(f"Wrote new agent skeleton to {args.file}")
-            return 0
-        if args.agents_cmd == "validate":
-            # ensure steps exist in Registry without executing
-            try:
-                from orchestrator.registry import Registry
-            except Exception as e:
-                print(f"Cannot import Registry: {e}")
-                return 1
-            try:
-                items = _load_yaml_list(args.file)
-            except Exception as e:
-                print(f"Failed to load YAML: {e}")
-                return 1
-            ok = True
-            for it in items:
-                aid = it.get("id") or "<no-id>"
-                for step in it.get("pipeline") or []:
-                    name = step.get("step")
-                    if name not in Registry:
-                        print(f"{aid}: Unknown step: {name}")
-                        ok = False
-            if ok:
-                print("OK")
-                return 0
-            return 2
-
-    if args.cmd == "steps" and args.steps_cmd == "list":
-        return _run([sys.executable, str(REPO_ROOT / "chat.py"), "list-steps"]) 
-
-    if args.cmd == "search":
-        if args.search_cmd == "web":
-            cmd = [sys.executable, str(REPO_ROOT / "chat.py")]
-            if args.verbose:
-                cmd.append("-v")
-            cmd += ["search:web", *args.query]
-            if args.save:
-                cmd.append("--save")
-            _append_filters(cmd, args)
-            return _run(cmd)
-        if args.search_cmd == "news":
-            cmd = [sys.executable, str(REPO_ROOT / "chat.py")]
-            if args.verbose:
-                cmd.append("-v")
-            cmd += ["search:news", *args.query]
-            if args.save:
-                cmd.append("--save")
-            _append_filters(cmd, args)
-            return _run(cmd)
-
-    if args.cmd == "index" and args.index_cmd == "results":
-        cmd = [sys.executable, str(REPO_ROOT / "chat.py"), "index:results", args.json_file]
-        if args.name:
-            cmd += ["--name", args.name]
-        return _run(cmd)
-
-    if args.cmd == "summarize":
-        if args.sum_cmd == "file":
-            cmd = [sys.executable, str(REPO_ROOT / "chat.py"), "summarize:file", args.json_file]
-            if args.title:
-                cmd += ["--title", args.title]
-            return _run(cmd)
-        if args.sum_cmd == "topk":
-            cmd = [sys.executable, str(REPO_ROOT / "chat.py"), "summarize:topk", *args.query]
-            cmd += ["--k", str(getattr(args, "k", 10))]
-            if args.title:
-                cmd += ["--title", args.title]
-            _append_filters(cmd, args)
-            return _run(cmd)
-
-    if args.cmd == "agent" and args.agent_cmd == "run":
-        cmd = [sys.executable, str(REPO_ROOT / "cli.py"), "run-agent", args.config]
-        if args.id:
-            cmd += ["--id", args.id]
-        return _run(cmd)
+    try:
+        from croniter import croniter as _croniter  # type: ignore
+        from datetime import datetime as _dt
+        has_cron = True
+    except Exception:
+        has_cron = False
+    want_next = getattr(args, "next", False)
+    count = 0
+    out: List[str] = []
+    for fp in files:
+        items = _load_yaml_list(fp)
+        for it in items:
+            count += 1
+            aid = it.get("id") or "<no-id>"
+            sched = it.get("schedule") or ""
+            enabled = it.get("enabled")
+            enabled_s = "true" if enabled is not False else "false"
+            line = f"{aid} | enabled={enabled_s}"
+            if sched:
+                line += f" | cron='{sched}'"
+                if want_next and has_cron:
+                    try:
+                        base = _dt.now(tz) if tz else _dt.now()
+                        itrn = _croniter(sched, base)
+                        nx = itrn.get_next(_dt)
+                        line += f" | next={nx.isoformat()}"
+                    except Exception:
+                        line += " | next=?"
+                elif want_next:
+                    line += " | next=(install croniter)"
+            desc = it.get("description")
+            if desc:
+                line += f" | {desc}"
+            out.append(line)
+    if count == 0:
+        print("No agents found.")
+        return 0
+    # one write for the whole listing instead of a print() per agent
+    sys.stdout.write("\n".join(out))
+    sys.stdout.write("\n")
+    return 0
+
+
+def _cmd_agents_toggle(args: argparse.Namespace) -> int:
+    if _require_yaml("agents management") is None:
+        return 1
+    items = _load_yaml_list(args.file)
+    target = next((x for x in items if x.get("id") == args.id), None)
+    if not target:
+        print(f"Agent id not found: {args.id}")
+        return 1
+    target["enabled"] = True if args.agents_cmd == "enable" else False
+    _write_yaml_list(args.file, items)
+    print(f"Updated {args.id}: enabled={target['enabled']}")
+    return 0
+
+
+# Body of `agents new` (after "id"); never mutated, only the top level is extended per agent
+_AGENT_SKELETON_TEMPLATE: Dict[str, Any] = {
+    "enabled": True,
+    "retries": 2,
+    "backoff": 0.5,
+    "pipeline": [
+        {"step": "search_web", "with": {"query": "replace me"}},
+        {"step": "save_sources_markdown", "with": {"title": "Agent Sources: replace me"}},
+    ],
+}
+# yaml.dump output of the skeleton above, for ids that YAML emits as plain scalars
+_AGENT_SKELETON_YAML_FMT = """id: {id}
+enabled: true
+retries: 2
+backoff: 0.5
+pipeline:
+- step: search_web
+  with:
+    query: replace me
+- step: save_sources_markdown
+  with:
+    title: 'Agent Sources: replace me'
+"""
+_PLAIN_ID_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_.-]*")
+_YAML_RESERVED_SCALARS = frozenset({"y", "n", "yes", "no", "on", "off", "true", "false", "null"})
+
+
+def _cmd_agents_new(args: argparse.Namespace) -> int:
+    if _require_yaml("agents management") is None:
+        return 1
+    if Path(args.file).exists():
+        print(f"Overwriting existing file: {args.file}")
+    if not args.schedule and not args.description and _PLAIN_ID_RE.fullmatch(args.id) \
+            and args.id.lower() not in _YAML_RESERVED_SCALARS:
+        # common case: the template is exactly what yaml.dump would emit, skip the emitter
+        p = _abs_path(args.file)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        with open(p, "w", encoding="utf-8") as f:
+            f.write(_AGENT_SKELETON_YAML_FMT.format(id=args.id))
+        print(f"Wrote new agent skeleton to {args.file}")
+        return 0
+    skel: Dict[str, Any] = {"id": args.id, **_AGENT_SKELETON_TEMPLATE}
+    if args.schedule:
+        skel["schedule"] = args.schedule
+    if args.description:
+        skel["description"] = args.description
+    _write_yaml_list(args.file, [skel])
+    print(f"Wrote new agent skeleton to {args.file}")
+    return 0
+
+
+def _cmd_agents_validate(args: argparse.Namespace) -> int:
+    if _require_yaml("agents management") is None:
+        return 1
+    # ensure steps exist in Registry without executing
+    try:
+        from orchestrator.registry import Registry
+    except Exception as e:
+        print(f"Cannot import Registry: {e}")
+        return 1
+    try:
+        items = _load_yaml_list(args.file)
+    except Exception as e:
+        print(f"Failed to load YAML: {e}")
+        return 1
+    # Snapshot the registry once, collect (agent, step) pairs in YAML order without
+    # duplicates and report every unknown step in a single pass
+    known = frozenset(Registry.keys() if hasattr(Registry, "keys") else Registry)
+    used = dict.fromkeys(
+        (it.get("id") or "<no-id>", step.get("step"))
+        for it in items
+        for step in it.get("pipeline") or []
+    )
+    bad = [(aid, name) for aid, name in used if name not in known]
+    for aid, name in bad:
+        print(f"{aid}: Unknown step: {name}")
+    ok = not bad
+    if ok:
+        print("OK")
+        return 0
+    return 2
 
-    if args.cmd == "schedule" and args.sched_cmd == "start":
-        cmd = [sys.executable, str(REPO_ROOT / "cli.py"), "run-schedule", "--agents", args.agents]
-        if args.timezone:
-            cmd += ["--timezone", args.timezone]
-        return _run(cmd)
 
-    if args.cmd == "docker":
-        if args.docker_cmd == "up":
-            return _run(["docker", "compose", "-f", str(REPO_ROOT / "docker-compose.yml"), "--profile", "qdrant", "up", "-d"])
-        if args.docker_cmd == "up-all":
-            return _run(["docker", "compose", "-f", str(REPO_ROOT / "docker-compose.yml"), "--profile", "all", "up", "-d", "--build"])
-        if args.docker_cmd == "down":
-            return _run(["docker", "compose", "-f", str(REPO_ROOT / "docker-compose.yml"), "down"])
-        if args.docker_cmd == "logs":
-            return _run(["docker", "compose", "-f", str(REPO_ROOT / "docker-compose.yml"), "logs", "-f", "app"])
-        if args.docker_cmd == "health":
-            return _run(["docker", "compose", "-f", str(REPO_ROOT / "docker-compose.yml"), "run", "--rm", "app", "python3", "chat.py", "--health"])
-
-    if args.cmd == "config":
-        cfg_path = os.environ.get("AI_STACK_CONFIG", DEFAULT_CONFIG_PATH)
-        if args.cfg_cmd == "show":
-            if load_config is None:
-                print("Config module not available.")
-                return 1
-            cfg = load_config()
-            data = {
-                "config_path": cfg_path,
-                "vault_path": getattr(cfg, "vault_path", None),
-                "folders": getattr(cfg, "folders", None).__dict__ if getattr(cfg, "folders", None) else None,
-            }
-            print(json.dumps(data, ensure_ascii=False, indent=2))
-            return 0
-        if args.cfg_cmd == "init":
-            if yaml is None:
-                print("PyYAML is required for config init. Please install it.")
-                return 1
-            target = args.file or cfg_path
-            target_p = Path(target)
-            target_p.parent.mkdir(parents=True, exist_ok=True)
-            # derive default folders from current defaults
+def _cmd_steps_list(args: argparse.Namespace) -> int:
+    return _exec([sys.executable, CHAT_PY, "list-steps"])
+
+
+def _cmd_search(args: argparse.Namespace) -> int:
+    cmd = [sys.executable, CHAT_PY]
+    if args.verbose:
+        cmd.append("-v")
+    cmd += [f"search:{args.search_cmd}", *args.query]
+    if args.save:
+        cmd.append("--save")
+    _append_filters(cmd, args)
+    return _exec(cmd)
+
+
+def _cmd_index_results(args: argparse.Namespace) -> int:
+    cmd = [sys.executable, CHAT_PY, "index:results", args.json_file]
+    if args.name:
+        cmd += ["--name", args.name]
+    return _exec(cmd)
+
+
+def _cmd_summarize_file(args: argparse.Namespace) -> int:
+    cmd = [sys.executable, CHAT_PY, "summarize:file", args.json_file]
+    if args.title:
+        cmd += ["--title", args.title]
+    return _exec(cmd)
+
+
+def _cmd_summarize_topk(args: argparse.Namespace) -> int:
+    cmd = [sys.executable, CHAT_PY, "summarize:topk", *args.query]
+    cmd += ["--k", str(getattr(args, "k", 10))]
+    if args.title:
+        cmd += ["--title", args.title]
+    _append_filters(cmd, args)
+    return _exec(cmd)
+
+
+def _cmd_agent_run(args: argparse.Namespace) -> int:
+    cmd = [sys.executable, CLI_PY, "run-agent", args.config]
+    if args.id:
+        cmd += ["--id", args.id]
+    return _exec(cmd)
+
+
+def _cmd_schedule_start(args: argparse.Namespace) -> int:
+    cmd = [sys.executable, CLI_PY, "run-schedule", "--agents", args.agents]
+    if args.timezone:
+        cmd += ["--timezone", args.timezone]
+    return _exec(cmd)
+
+
+def _cmd_docker(args: argparse.Namespace) -> int:
+    return _exec(_docker_cmd(args.docker_cmd))
+
+
+def _cmd_config_show(args: argparse.Namespace) -> int:
+    load_config, cfg_path = _import_config()
+    if load_config is None:
+        print("Config module not available.")
+        return 1
+    import json
+    cfg = _cached_load_config()
+    data = {
+        "config_path": cfg_path,
+        "vault_path": getattr(cfg, "vault_path", None),
+        "folders": getattr(cfg, "folders", None).__dict__ if getattr(cfg, "folders", None) else None,
+    }
+    print(json.dumps(data, ensure_ascii=False, indent=2))
+    return 0
+
+
+def _cmd_config_init(args: argparse.Namespace) -> int:
+    load_config, cfg_path = _import_config()
+    yaml = _require_yaml("config init")
+    if yaml is None:
+        return 1
+    target = args.file or cfg_path
+    target_p = Path(target)
+    target_p.parent.mkdir(parents=True, exist_ok=True)
+    # derive default folders from current defaults
+    folders = {
+        "sources": "Sources",
+        "summaries": "Summaries",
+        "entities": "Entities",
+        "index": "Index",
+        "logs": "Logs",
+    }
+    try:
+        if load_config is not None:
+            # get default folder names if customized in code
+            c = _cached_load_config()
             folders = {
-                "sources": "Sources",
-                "summaries": "Summaries",
-                "entities": "Entities",
-                "index": "Index",
-                "logs": "Logs",
+                "sources": c.folders.sources,
+                "summaries": c.folders.summaries,
+                "entities": c.folders.entities,
+                "index": c.folders.index,
+                "logs": c.folders.logs,
             }
-            try:
-                if load_config is not None:
-                    # get default folder names if customized in code
-                    c = load_config()
-                    folders = {
-                        "sources": c.folders.sources,
-                        "summaries": c.folders.summaries,
-                        "entities": c.folders.entities,
-                        "index": c.folders.index,
-                        "logs": c.folders.logs,
-                    }
-            except Exception:
-                pass
-            content = {"vault_path": str(Path(args.vault).expanduser()), "folders": folders}
-            with open(target_p, "w", encoding="utf-8") as f:
-                yaml.safe_dump(content, f, allow_unicode=True, sort_keys=False)
-            print(f"Wrote config: {target_p}")
-            return 0
-
-    parser.print_help()
+    except Exception:
+        pass
+    content = {"vault_path": str(Path(args.vault).expanduser()), "folders": folders}
+    _, dumper = _yaml_io(yaml)
+    with open(target_p, "w", encoding="utf-8") as f:
+        yaml.dump(content, f, Dumper=dumper, allow_unicode=True, sort_keys=False)
+    print(f"Wrote config: {target_p}")
+    return 0
+
+
+# argparse dest holding each command's subcommand
+_SUBCMD_DEST = {
+    "agents": "agents_cmd",
+    "steps": "steps_cmd",
+    "search": "search_cmd",
+    "index": "index_cmd",
+    "summarize": "sum_cmd",
+    "agent": "agent_cmd",
+    "schedule": "sched_cmd",
+    "docker": "docker_cmd",
+    "config": "cfg_cmd",
+}
+
+# (command, subcommand) -> handler; each handler does its own lazy imports
+_DISPATCH: Dict[Tuple[str, Optional[str]], Callable[[argparse.Namespace], int]] = {
+    ("health", None): _cmd_health,
+    ("agents", "list"): _cmd_agents_list,
+    ("agents", "enable"): _cmd_agents_toggle,
+    ("agents", "disable"): _cmd_agents_toggle,
+    ("agents", "new"): _cmd_agents_new,
+    ("agents", "validate"): _cmd_agents_validate,
+    ("steps", "list"): _cmd_steps_list,
+    ("search", "web"): _cmd_search,
+    ("search", "news"): _cmd_search,
+    ("index", "results"): _cmd_index_results,
+    ("summarize", "file"): _cmd_summarize_file,
+    ("summarize", "topk"): _cmd_summarize_topk,
+    ("agent", "run"): _cmd_agent_run,
+    ("schedule", "start"): _cmd_schedule_start,
+    **{("docker", sub_cmd): _cmd_docker for sub_cmd in _DOCKER_COMPOSE_ARGS},
+    ("config", "show"): _cmd_config_show,
+    ("config", "init"): _cmd_config_init,
+}
+
+
+def main() -> int:
+    fast = _fast_path(sys.argv[1:])
+    if fast is not None:
+        return _exec(fast)
+
+    # Build only the branch being invoked; root --help / unknown commands get the full parser
+    parser = build_parser(_sniff_subcommand(sys.argv[1:]))
+    args = parser.parse_args()
+
+    dest = _SUBCMD_DEST.get(args.cmd)
+    handler = _DISPATCH.get((args.cmd, getattr(args, dest, None) if dest else None))
+    if handler is not None:
+        return handler(args)
+
+    # No (or unknown) subcommand: show the full help, not just the sniffed branch
+    build_parser().print_help()
     return 2
 
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
@@ -8,7 +8,12 @@ import os
 import argparse
 import logging
 import json
-from datetime import datetime
+import re
+import time
+import hashlib
+import functools
+import mmap
+import shutil
 from pathlib import Path
 
 # Добавляем текущую папку в путь Python
@@ -22,27 +27,177 @@ except Exception:
     pass
 
 try:
-    # теперь экспортируется из пакета
-    from agents.web_research import WorkingWebAgent
-    web_agent = None  # инициализируем позже с параметрами CLI
+    import orjson  # type: ignore
+except Exception:  # optional: быстрый C-кодек JSON, иначе stdlib json
+    orjson = None  # type: ignore
+
+try:
+    import redis  # type: ignore
+except Exception:  # optional: кеш результатов поиска между запусками
+    redis = None  # type: ignore
+
+# Конфиг нужен почти каждой команде — импортируем один раз на уровне модуля
+from config import load_config
+
+# WorkingWebAgent (requests/lxml/requests_cache — основная часть времени старта) импортируется
+# лениво в _import_web_agent(): он нужен только поиску и health-check
+web_agent = None  # инициализируем позже с параметрами CLI
+AGENT_IMPORT_OK = None  # None — импорт ещё не выполнялся
+
+# Команды, которым нужен веб-агент (None — интерактивный режим)
+_AGENT_COMMANDS = frozenset({None, "search:web", "search:news"})
+
+
+def _import_web_agent():
+    """Импортировать WorkingWebAgent; None, если импорт не удался"""
+    global AGENT_IMPORT_OK
+    try:
+        # теперь экспортируется из пакета
+        from agents.web_research import WorkingWebAgent
+    except ImportError as e:
+        print(f"❌ Ошибка импорта Working Web Research Agent: {e}")
+        AGENT_IMPORT_OK = False
+        return None
     AGENT_IMPORT_OK = True
-except ImportError as e:
-    print(f"❌ Ошибка импорта Working Web Research Agent: {e}")
-    web_agent = None
-    AGENT_IMPORT_OK = False
+    return WorkingWebAgent
+
+
+def _ts() -> str:
+    """Метка времени для имён файлов (time.strftime в C, без промежуточного datetime)"""
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+# --filter-source -> бэкенд WorkingWebAgent.execute(sources=...): фильтр «проталкивается»
+# в агент, и лишние источники не запрашиваются вовсе
+_SOURCE_BACKENDS = {"DuckDuckGo": "ddg", "Reddit": "reddit", "Google News": "news"}
+
+
+def _backends_for(filter_source):
+    """Бэкенды для веб-поиска с учётом --filter-source (None — все; () — ни одного)"""
+    if not filter_source:
+        return None
+    backend = _SOURCE_BACKENDS.get(filter_source)
+    return (backend,) if backend else ()
+
+
+# TTL кеша результатов по типу поиска: новости устаревают быстрее
+RESULT_CACHE_TTL = {"web": 300, "news": 60, "topk": 300}
+
+
+class ResultCache:
+    """Кеш нормализованных результатов execute() в Redis (AI_STACK_REDIS_URL).
+
+    Повторный одинаковый запрос отдаётся из кеша без похода в DDG/Reddit/RSS.
+    Если redis не установлен, URL не задан или сервер недоступен — кеш молча выключается.
+    """
+
+    def __init__(self, url=None):
+        self._r = None
+        url = url or os.environ.get("AI_STACK_REDIS_URL")
+        if redis is None or not url:
+            return
+        try:
+            self._r = redis.Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=0.5)
+        except Exception:
+            self._r = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._r is not None
+
+    @staticmethod
+    def make_key(kind: str, query: str, *parts) -> str:
+        # parts — всё, что влияет на результат (фильтры, лимиты)
+        raw = "|".join([query.strip().lower(), *map(str, parts)])
+        return f"vesna:{kind}:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        if self._r is None:
+            return None
+        try:
+            raw = self._r.get(key)
+        except Exception:
+            self._r = None  # сервер недоступен — до конца запуска больше не пытаемся
+            return None
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except Exception:
+            return None
+
+    def setex(self, key: str, ttl: int, obj: dict) -> None:
+        if self._r is None:
+            return
+        try:
+            self._r.setex(key, ttl, json.dumps(obj, ensure_ascii=False))
+        except Exception:
+            self._r = None
+
+
+def execute_cached(agent, cache: ResultCache, kind: str, query: str, filter_source=None, max_results=None, **execute_kw) -> dict:
+    """web_agent.execute(query, **execute_kw) через ResultCache; печатает HIT/MISS, если кеш включён"""
+    key = cache.make_key(kind, query, filter_source, max_results)
+    cached = cache.get(key)
+    if cached is not None:
+        print("🗄️ cache: HIT")
+        return cached
+    if cache.enabled:
+        print("🗄️ cache: MISS")
+    result = agent.execute(query, **execute_kw)
+    if not any("error" in r for r in (result.get("results") or [])):
+        cache.setex(key, RESULT_CACHE_TTL.get(kind, 300), result)
+    return result
+
+
+# netloc из URL одним C-уровневым match вместо urlparse на каждую запись
+_NETLOC_RE = re.compile(r"^(?:[A-Za-z][A-Za-z0-9+.-]*:)?//([^/?#]*)")
+
+
+def filter_by_domain(items: list, dom: str) -> list:
+    """Оставить записи, чей домен оканчивается на dom (можно несколько через запятую)"""
+    suffixes = tuple(d.strip().lower() for d in dom.split(",") if d.strip())
+    if not suffixes:
+        return items
+    out = []
+    for r in items:
+        m = _NETLOC_RE.match(r.get("url") or "")
+        if m and m.group(1).lower().endswith(suffixes):
+            out.append(r)
+    return out
+
+
+def apply_filters(obj: dict, src=None, dom=None, fdate=None) -> dict:
+    """--filter-source / --filter-domain / --filter-date поверх результатов execute()"""
+    if not (src or dom or fdate):
+        return obj  # фильтров нет — ничего не перебираем
+    items = obj.get("results") or []
+    if src:
+        items = [r for r in items if r.get("source") == src]
+    if dom:
+        items = filter_by_domain(items, dom)
+    if fdate:
+        # Оставим только записи, где metadata.date >= YYYY-MM-DD (префиксное сравнение)
+        items = [r for r in items if (r.get("metadata") or {}).get("date", "")[:10] >= fdate]
+    obj["results"] = items
+    obj["count"] = len(items)
+    return obj
+
 
 def print_results(result):
     """Красиво показать результаты (нормализованная схема)"""
-    print(f"\n🤖 Агент: {result.get('agent','Web Agent')}")
-    print(f"📊 Найдено результатов: {result.get('count',0)}")
-    print(f"⏰ Время: {result.get('timestamp','')}")
-    
+    # Собираем весь вывод и пишем одним write вместо пачки print() на каждый результат
+    out = [
+        f"\n🤖 Агент: {result.get('agent','Web Agent')}",
+        f"📊 Найдено результатов: {result.get('count',0)}",
+        f"⏰ Время: {result.get('timestamp','')}",
+    ]
     items = result.get('results') or []
     if items:
-        print("\n📋 Результаты:")
+        out.append("\n📋 Результаты:")
         for i, item in enumerate(items, 1):
             if 'error' in item:
-                print(f"{i}. ❌ {item['error']}")
+                out.append(f"{i}. ❌ {item['error']}")
                 continue
 
             title = item.get('title', 'Без названия')
@@ -51,19 +206,22 @@ def print_results(result):
             snippet = (item.get('snippet') or '')[:200]
             meta = item.get('metadata') or {}
 
-            print(f"\n{i}. [{source}] 📝 {title}")
+            out.append(f"\n{i}. [{source}] 📝 {title}")
             if snippet:
-                print(f"   📝 {snippet}...")
+                out.append(f"   📝 {snippet}...")
             # Специализированные метаданные по источникам
             if source == 'Reddit':
-                print(f"   📍 r/{meta.get('subreddit','unknown')} | 👤 u/{meta.get('author','unknown')}")
-                print(f"   ⬆️ {meta.get('score',0)} очков")
+                out.append(f"   📍 r/{meta.get('subreddit','unknown')} | 👤 u/{meta.get('author','unknown')}")
+                out.append(f"   ⬆️ {meta.get('score',0)} очков")
             if source == 'Google News' and meta.get('date'):
-                print(f"   📅 {meta.get('date')}")
+                out.append(f"   📅 {meta.get('date')}")
             if url:
-                print(f"   🔗 {url}")
+                out.append(f"   🔗 {url}")
     else:
-        print("❌ Результатов не найдено")
+        out.append("❌ Результатов не найдено")
+    out.append("")
+    sys.stdout.write("\n".join(out))
+    sys.stdout.flush()
 
 def build_parser():
     p = argparse.ArgumentParser(description="AI Agents Chat (Web Research)")
@@ -113,8 +271,9 @@ def build_parser():
 
     return p
 
+@functools.lru_cache(maxsize=1)
 def load_vault_config():
-    from config import load_config
+    # Конфиг за время жизни процесса не меняется: health-check и сабкоманды читают его один раз
     cfg = load_config()
     return {"vault_path": cfg.vault_path, "folders": {
         "sources": cfg.folders.sources,
@@ -124,35 +283,127 @@ def load_vault_config():
         "logs": cfg.folders.logs,
     }}
 
+# Каталоги, уже созданные/проверенные в этом процессе: повторные записи обходятся без mkdir/stat
+_ENSURED_DIRS: set = set()
+
+def _ensure_dir(target_dir: Path) -> None:
+    key = os.fspath(target_dir)
+    if key not in _ENSURED_DIRS:
+        target_dir.mkdir(parents=True, exist_ok=True)
+        _ENSURED_DIRS.add(key)
+
 def save_note(base_dir: Path, folder: str, name: str, content: str):
     target_dir = base_dir / folder
-    target_dir.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(target_dir)
     path = target_dir / f"{name}.md"
     path.write_text(content, encoding="utf-8")
     print(f"📝 Saved: {path}")
 
+def save_note_stream(base_dir: Path, folder: str, name: str, lines):
+    """Как save_note, но пишет строки по мере генерации — без сборки всей заметки в одну строку"""
+    target_dir = base_dir / folder
+    _ensure_dir(target_dir)
+    path = target_dir / f"{name}.md"
+    with path.open("w", encoding="utf-8") as f:
+        f.writelines(line + "\n" for line in lines)
+    print(f"📝 Saved: {path}")
+
 def save_json(base_dir: Path, folder: str, name: str, obj: dict):
     target_dir = base_dir / folder
-    target_dir.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(target_dir)
     path = target_dir / f"{name}.json"
-    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    if orjson is not None:
+        # orjson сразу отдаёт UTF-8 bytes (как ensure_ascii=False)
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
     print(f"🗂️ Saved JSON: {path}")
 
-def make_results_markdown(result: dict, title: str) -> str:
-    lines = [f"# {title}", "", f"- Agent: {result.get('agent')}", f"- Time: {result.get('timestamp')}",""]
+def copy_json(base_dir: Path, folder: str, name: str, src: Path):
+    """Скопировать готовый JSON без разбора/сериализации (copyfile → sendfile на Linux)"""
+    target_dir = base_dir / folder
+    _ensure_dir(target_dir)
+    path = target_dir / f"{name}.json"
+    shutil.copyfile(src, path)
+    print(f"🗂️ Saved JSON: {path}")
+
+def load_json_file(path: Path):
+    """Прочитать JSON-файл: orjson прямо из mmap (страницы файла, без копии в куче), иначе stdlib json"""
+    if orjson is not None:
+        with open(path, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # пустой файл не отображается — пусть orjson сообщит об ошибке
+                return orjson.loads(b"")
+            with mm, memoryview(mm) as view:
+                return orjson.loads(view)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def iter_results_markdown(result: dict, title: str):
+    """Построчный Markdown по результатам execute() (генератор, для save_note_stream)"""
+    yield f"# {title}"
+    yield ""
+    yield f"- Agent: {result.get('agent')}"
+    yield f"- Time: {result.get('timestamp')}"
+    yield ""
     for i, item in enumerate(result.get('results') or [], 1):
         if 'error' in item:
-            lines.append(f"{i}. ❌ {item['error']}")
+            yield f"{i}. ❌ {item['error']}"
             continue
-        lines.append(f"{i}. [{item.get('source','Unknown')}] {item.get('title','Без названия')}")
+        yield f"{i}. [{item.get('source','Unknown')}] {item.get('title','Без названия')}"
         if item.get('url'):
-            lines.append(f"   - URL: {item['url']}")
+            yield f"   - URL: {item['url']}"
         if item.get('snippet'):
-            lines.append(f"   - Snippet: {item['snippet'][:300]}...")
+            yield f"   - Snippet: {item['snippet'][:300]}..."
         meta = item.get('metadata') or {}
         if meta:
-            lines.append(f"   - Meta: {json.dumps(meta, ensure_ascii=False)}")
-    return "\n".join(lines)
+            yield f"   - Meta: {json.dumps(meta, ensure_ascii=False)}"
+
+def _point_fields(p):
+    """(payload, score) точки Qdrant или dict (мок / запись из кеша)"""
+    if isinstance(p, dict):
+        return p.get("payload") or {}, p.get("score", 0.0)
+    return getattr(p, "payload", None) or {}, getattr(p, "score", 0.0)
+
+def search_topk_cached(cache: ResultCache, query: str, k: int, src=None, dom=None, fdate=None) -> list:
+    """Векторный поиск summarize:topk через ResultCache.
+
+    При попадании VectorStore не создаётся вовсе (ни модели эмбеддингов, ни запроса в Qdrant);
+    точки из кеша — dict {"score", "payload"}.
+    """
+    key = cache.make_key("topk", query, k, src, dom, fdate)
+    cached = cache.get(key)
+    if cached is not None:
+        print("🗄️ cache: HIT")
+        return cached.get("points") or []
+    if cache.enabled:
+        print("🗄️ cache: MISS")
+    from vector_store import VectorStore
+    points = VectorStore().search(query, limit=k, source=src, domain=dom, date_from=fdate)
+    if cache.enabled:
+        rows = []
+        for p in points:
+            payload, score = _point_fields(p)
+            rows.append({"score": float(score), "payload": payload})
+        cache.setex(key, RESULT_CACHE_TTL["topk"], {"points": rows})
+    return points
+
+def iter_topk_markdown(points, heading: str):
+    """Построчный Markdown для summarize:topk (точки Qdrant или dict-моки)"""
+    yield f"# {heading}"
+    yield ""
+    for i, p in enumerate(points, 1):
+        payload, score = _point_fields(p)
+        title = payload.get("title") or payload.get("file") or "Без названия"
+        url = payload.get("url") or ""
+        src = payload.get("source") or ""
+        yield f"{i}. [{src}] {title} — score: {round(float(score), 4)}"
+        if url:
+            yield f"   - URL: {url}"
+
+def make_results_markdown(result: dict, title: str) -> str:
+    return "\n".join(iter_results_markdown(result, title))
 
 def run_interactive(args):
     print("🤖 AI Agents Chat")
@@ -207,9 +458,10 @@ def main():
     logging.getLogger("urllib3").setLevel(logging.WARNING)
 
     global web_agent
-    if AGENT_IMPORT_OK:
+    agent_cls = _import_web_agent() if (args.health or args.command in _AGENT_COMMANDS) else None
+    if agent_cls is not None:
         try:
-            web_agent = WorkingWebAgent(
+            web_agent = agent_cls(
                 timeout=args.timeout,
                 max_results=args.max_results,
                 retries=args.retries,
@@ -219,7 +471,7 @@ def main():
         except Exception as e:
             print(f"❌ Не удалось инициализировать агент: {e}")
             web_agent = None
-    else:
+    elif AGENT_IMPORT_OK is False:
         print("❌ Web Research Agent недоступен (импорт не удался)")
 
     # health-check режим: проверить доступность ключевых сервисов
@@ -268,63 +520,41 @@ def main():
     folders = cfg["folders"]
 
     # обработка сабкоманд
-    def _apply_filters(obj: dict) -> dict:
-        items = obj.get("results") or []
-        src = getattr(args, "filter_source", None)
-        dom = getattr(args, "filter_domain", None)
-        fdate = getattr(args, "filter_date", None)
-        if src:
-            items = [r for r in items if r.get("source") == src]
-        if dom:
-            def _match_domain(u: str) -> bool:
-                try:
-                    from urllib.parse import urlparse
-                    net = urlparse(u or "").netloc
-                    return net.endswith(dom)
-                except Exception:
-                    return False
-            items = [r for r in items if _match_domain(r.get("url", ""))]
-        if fdate:
-            # Оставим только записи, где metadata.date >= YYYY-MM-DD (префиксное сравнение)
-            items = [r for r in items if (r.get("metadata") or {}).get("date","")[:10] >= fdate]
-        obj["results"] = items
-        obj["count"] = len(items)
-        return obj
+    filters = (args.filter_source, args.filter_domain, args.filter_date)
 
     if args.command == "search:web":
         query = " ".join(args.query)
-        result = web_agent.execute(query) if web_agent else {"results": [], "agent":"n/a","timestamp":datetime.now().isoformat(),"count":0}
-        result = _apply_filters(result)
+        result = execute_cached(web_agent, ResultCache(), "web", query, args.filter_source, args.max_results, sources=_backends_for(args.filter_source)) if web_agent else {"results": [], "agent":"n/a","timestamp":time.strftime("%Y-%m-%dT%H:%M:%S"),"count":0}
+        result = apply_filters(result, *filters)
         print_results(result)
         if getattr(args, "save", False):
-            ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+            ts = _ts()
             name = f"search-web-{ts}"
             save_json(base, folders["index"], name, result)
-            md = make_results_markdown(result, f"Search Web: {query}")
-            save_note(base, folders["sources"], name, md)
+            save_note_stream(base, folders["sources"], name, iter_results_markdown(result, f"Search Web: {query}"))
 
     elif args.command == "search:news":
         query = " ".join(args.query)
-        result = web_agent.execute(query) if web_agent else {"results": [], "agent":"n/a","timestamp":datetime.now().isoformat(),"count":0}
-        result["results"] = [r for r in (result.get("results") or []) if r.get("source") == "Google News"]
-        result = _apply_filters(result)
+        result = execute_cached(web_agent, ResultCache(), "news", query, args.filter_source, args.max_results, sources=("news",)) if web_agent else {"results": [], "agent":"n/a","timestamp":time.strftime("%Y-%m-%dT%H:%M:%S"),"count":0}
+        result = apply_filters(result, *filters)
         print_results(result)
         if getattr(args, "save", False):
-            ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+            ts = _ts()
             name = f"search-news-{ts}"
             save_json(base, folders["index"], name, result)
-            md = make_results_markdown(result, f"Search News: {query}")
-            save_note(base, folders["sources"], name, md)
+            save_note_stream(base, folders["sources"], name, iter_results_markdown(result, f"Search News: {query}"))
 
     elif args.command == "index:results":
         jf = Path(args.json_file)
         if not jf.exists():
             print(f"❌ Файл не найден: {jf}")
             return
-        with open(jf, "r", encoding="utf-8") as f:
-            obj = json.load(f)
         name = args.name or jf.stem
-        save_json(base, folders["index"], name, obj)
+        if any(filters):
+            save_json(base, folders["index"], name, apply_filters(load_json_file(jf), *filters))
+        else:
+            # Без фильтров индексация — это копия файла: не разбираем и не сериализуем заново
+            copy_json(base, folders["index"], name, jf)
         print("✅ Индексация завершена")
  
     elif args.command == "summarize:file":
@@ -332,13 +562,11 @@ def main():
         if not jf.exists():
             print(f"❌ Файл не найден: {jf}")
             return
-        with open(jf, "r", encoding="utf-8") as f:
-            obj = json.load(f)
-        title = args.title or f"Summary {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        md = make_results_markdown(obj, title)
-        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+        obj = load_json_file(jf)
+        title = args.title or f"Summary {time.strftime('%Y-%m-%d %H:%M')}"
+        ts = _ts()
         name = f"summary-{ts}"
-        save_note(base, folders["summaries"], name, md)
+        save_note_stream(base, folders["summaries"], name, iter_results_markdown(obj, title))
         print("✅ Сводка сохранена")
  
     elif args.command == "list-steps":
@@ -349,33 +577,13 @@ def main():
 
     elif args.command == "summarize:topk":
         # Векторный поиск в Qdrant с server-side фильтрами и записью в Summaries
-        from vector_store import VectorStore
         query = " ".join(args.query)
-        vs = VectorStore()
-        # Собираем фильтры
-        src = getattr(args, "filter_source", None)
-        dom = getattr(args, "filter_domain", None)
-        fdate = getattr(args, "filter_date", None)
         k = getattr(args, "k", 10)
-        points = vs.search(query, limit=k, source=src, domain=dom, date_from=fdate)
-        # Рендер Markdown
-        lines = [f"# Top-{k} Vector Search: {query}", ""]
-        for i, p in enumerate(points, 1):
-            payload = p.payload if isinstance(p, dict) else getattr(p, "payload", {})  # подстрахуемся под мок
-            score = p.get("score") if isinstance(p, dict) else getattr(p, "score", 0.0)
-            title = payload.get("title") or payload.get("file") or "Без названия"
-            url = payload.get("url") or ""
-            src2 = payload.get("source") or ""
-            lines.append(f"{i}. [{src2}] {title} — score: {round(float(score), 4)}")
-            if url:
-                lines.append(f"   - URL: {url}")
-        md = "\n".join(lines)
-        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+        points = search_topk_cached(ResultCache(), query, k, *filters)
+        ts = _ts()
         name = f"vector-topk-{ts}"
-        title_opt = getattr(args, "title", None)
-        if title_opt:
-            md = "# " + title_opt + "\n\n" + "\n".join(lines[1:])
-        save_note(base, folders["summaries"], name, md)
+        heading = getattr(args, "title", None) or f"Top-{k} Vector Search: {query}"
+        save_note_stream(base, folders["summaries"], name, iter_topk_markdown(points, heading))
         print("✅ Top-K сохранены в Summaries")
  
 
@@ -15,6 +15,7 @@ def main():
     sp2 = sub.add_parser("run-schedule", help="Run scheduler for agents list")
     sp2.add_argument("--agents", default="configs/agents/core.yaml")
     sp2.add_argument("--timezone", default=None)
+    sp2.add_argument("--isolate", action="store_true", help="Run scheduler.py in a separate Python process")
 
     args = ap.parse_args()
 
@@ -33,13 +34,17 @@ def main():
         return 0
 
     if args.cmd == "run-schedule":
-        import subprocess, sys
-        from pathlib import Path
-        base = Path(__file__).resolve().parent
-        cmd = [sys.executable, str(base / "scheduler.py"), "--agents", args.agents]
+        sched_args = ["--agents", args.agents]
         if args.timezone:
-            cmd += ["--timezone", args.timezone]
-        subprocess.run(cmd, check=True)
+            sched_args += ["--timezone", args.timezone]
+        if args.isolate:
+            import subprocess, sys
+            base = Path(__file__).resolve().parent
+            subprocess.run([sys.executable, str(base / "scheduler.py"), *sched_args], check=True)
+            return 0
+        # In-process by default: no second interpreter start-up and module re-import
+        from scheduler import main as sched_main
+        sched_main(sched_args)
         return 0
 
     ap.print_help()
@@ -1,252 +1,435 @@
 import sys
 import os
+import copy
+import functools
 import json
 import shlex
 import re
-from typing import Any, Dict, List
-from datetime import datetime
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson  # type: ignore
+except Exception:  # optional: быстрый C-кодек JSON для печати шагов
+    orjson = None  # type: ignore
 
 from orchestrator.registry import Registry
 from config import load_config
 from agents.obsidian.manager import ObsidianManager
 
-from pipelines import steps  # noqa: F401 - ensure step functions are registered via decorators
-from pipelines import finance_health_steps  # noqa: F401 - register finance/health steps
 # Простой rule-based планировщик
 # На вход: текст, на выход: список шагов {name, params}
 
+# Регулярки plan(): компилируются один раз при импорте
+_RE_SEG_SPLIT = re.compile(r"[;，,]+")
+_RE_READ_MD = re.compile(r"(?:прочитай|read|покажи)\s+(.+\.md)$", re.IGNORECASE)
+_RE_MD_PATH = re.compile(r"([\w\-/ .]+\.md)$")
+_RE_FIND_QUERY = re.compile(r"(?:найди|find|search)\s+(.+)$", re.IGNORECASE)
+_RE_BACKUP = re.compile(r"\b(backup|бэкап)\b")
+_RE_URL_ZIP = re.compile(r"https?://\S+\.zip", re.IGNORECASE)
+_RE_WS = re.compile(r"\s+")
+_RE_THEME = re.compile(r"(?:тему|theme)\s+(.+)$", re.IGNORECASE)
+_RE_SNIPPET_NAME = re.compile(r"(?:сниппет|snippet)\s+([\w\-. ]+)", re.IGNORECASE)
+_RE_SNIPPET_TAIL = re.compile(r"(?:сниппет|snippet)\s+([\w\-. ]+)$", re.IGNORECASE)
+_RE_SETTING_KV = re.compile(r"(?:настройк\w*|setting)\s+([\w\.]+)\s*(?:=|:)\s*(.+)$", re.IGNORECASE)
+_RE_CORE_PLUGIN = re.compile(r"(?:core\s+plugin|базов\w*\s+плагин|ядро\s+плагин|core)\s+([\w\-\.]+)$", re.IGNORECASE)
+_RE_PLUGIN_ID = re.compile(r"(?:плагин|plugin)\s+([\w\-\.]+)$", re.IGNORECASE)
+_RE_ENABLE_PREFIX = re.compile(r"^(включи\s+|enable\s+)", re.IGNORECASE)
+_RE_DISABLE_PREFIX = re.compile(r"^(выключи\s+|disable\s+)", re.IGNORECASE)
+_RE_AMOUNT = re.compile(r"(\d+[\.,]\d+|\d+)\s*(uah|грн|₴|usd|eur|€|\$)?", re.IGNORECASE)
+_RE_CATEGORY = re.compile(r"категор\w*\s+([\w\-_/]+)", re.IGNORECASE)
+_RE_HASHTAG = re.compile(r"#([\w\-_]+)")
+_RE_FINANCE_WORDS = re.compile(r"финанс\w*|finance|расход|доход|покуп\w*|income|expense", re.IGNORECASE)
+_RE_WEIGHT = re.compile(r"вес\s*(\d+(?:[\.,]\d+)?)", re.IGNORECASE)
+_RE_PULSE = re.compile(r"пульс\s*(\d+)", re.IGNORECASE)
+_RE_BLOOD_PRESSURE = re.compile(r"давлен\w*\s*(\d+)\s*[\/-]\s*(\d+)", re.IGNORECASE)
+_RE_SLEEP_HM = re.compile(r"(?:сон|sleep)\s*(\d+):(\d{2})", re.IGNORECASE)
+_RE_SLEEP_HOURS = re.compile(r"(?:сон|sleep|спал)\s*(\d+(?:[\.,]\d+)?)\s*час", re.IGNORECASE)
+_RE_STEPS = re.compile(r"шаг(?:ов|и)?\s*(\d+)", re.IGNORECASE)
+_RE_HEALTH_WORDS = re.compile(r"здоров\w*|health|вес\s*\d+[\.,]?\d*|пульс\s*\d+|давлен\w*\s*\d+[\/-]\d+|сон\s*\d+(?::\d{2})?|спал\s*\d+[\.,]?\d*\s*час\w*|шаг(?:ов|и)?\s*\d+", re.IGNORECASE)
+_RE_TASK = re.compile(r"задач\w*\s*:?\s*(.+)$", re.IGNORECASE)
+_RE_DUE = re.compile(r"до\s+([^,;]+)", re.IGNORECASE)
+_RE_PRIORITY = re.compile(r"приоритет\s+([^,;]+)", re.IGNORECASE)
+_RE_MARK_TASK = re.compile(r"(?:выполни\s+задач\w*|отметь\s+задач\w*|закрой\s+задач\w*|complete\s+task)\s*:?\s*(.+)$", re.IGNORECASE)
+
+# Ключевые слова веток plan(): собраны один раз при импорте, порядок внутри кортежа —
+# приоритет при поиске смещения содержимого
+_OBSIDIAN_KW = ("obsidian", "обсидиан")
+_DAILY_KW = ("создай заметку", "создать заметку", "заметка сегодня", "сегодняшн", "ежеднев", "daily", "дневник")
+_FINANCE_KW = ("финанс", "finance")
+_MONEY_KW = _FINANCE_KW + ("расход", "доход", "покуп", "income", "expense")
+_INCOME_KW = ("доход", "income")
+_HEALTH_KW = ("здоров", "health", "пульс", "сон", "давлен", "вес")
+_SEARCH_KW = ("поиск", "search", "гугл", "web")
+_INDEX_KW = ("индекс", "index", "вектор", "qdrant")
+_TOP_KW = ("топ", "top", "выдача")
+_APPEND_DAILY_KW = ("добавь к сегодняшней", "допиши к сегодняшней", "добавь в ежедневку", "допиши в ежедневку", "append daily")
+_WEEKLY_KW = ("недел", "weekly", "week note", "недельная заметка")
+_MARK_TASK_KW = ("выполни задачу", "отметь задачу", "закрой задачу", "complete task")
+
+
+# Теги намерений сегмента obsidian-команды: тег -> ключевые слова (подстроки seg.lower())
+_SEGMENT_TAG_KEYWORDS = {
+    "list_ru": ("список",),
+    "list_en": ("list",),
+    "notes_ru": ("замет",),
+    "notes_en": ("notes",),
+    "read": ("прочитай", "прочесть", "покажи", "read", "show"),
+    "note_ref": (".md", "notes/", "note"),
+    "write": ("создай", "создать", "запиши", "создай заметку", "write note", "create note"),
+    "append": ("допиши", "append"),
+    "find": ("найди", "поиск", "find", "search"),
+    "index": ("проиндексируй", "индексируй", "index", "ingest"),
+    "vault": ("вольт", "vault", "весь"),
+    "plugin_ru": ("плагин",),
+    "plugin_en": ("plugin",),
+    "install": ("установ", "install"),
+    "theme": ("тему", "theme"),
+    "theme_set": ("постав", "установ", "switch", "set"),
+    "snippet": ("сниппет", "snippet"),
+    "snippet_write": ("запиши", "создай", "write", "add"),
+    "enable": ("включ", "enable"),
+    "disable": ("выключ", "disable"),
+    "setting": ("настройк", "setting"),
+    "setting_set": ("установ", "постав", "set"),
+    "core": ("core", "базов", "ядро"),
+}
+
+
+def _invert_tags(tag_keywords: Dict[str, Tuple[str, ...]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    # keyword -> все его теги: каждое слово ищется в сегменте ровно один раз
+    out: Dict[str, List[str]] = {}
+    for tag, kws in tag_keywords.items():
+        for k in kws:
+            out.setdefault(k, []).append(tag)
+    return tuple((k, tuple(tags)) for k, tags in out.items())
+
+
+_SEGMENT_KW_TAGS = _invert_tags(_SEGMENT_TAG_KEYWORDS)
+
+
+def _segment_tags(seg_l: str) -> set:
+    """Все теги намерений сегмента за один проход по таблице ключевых слов"""
+    tags: set = set()
+    for k, kw_tags in _SEGMENT_KW_TAGS:
+        if k in seg_l:
+            tags.update(kw_tags)
+    return tags
+
+
+def _first_keyword(text: str, keywords: Tuple[str, ...]) -> Tuple[Optional[str], int]:
+    """Первое (по приоритету) ключевое слово из keywords в text и его смещение.
+
+    Один проход str.find на слово: и проверка «есть ли», и позиция для вырезания содержимого.
+    """
+    for k in keywords:
+        i = text.find(k)
+        if i >= 0:
+            return k, i
+    return None, -1
+
+
+def _has_any(text: str, keywords: Tuple[str, ...]) -> bool:
+    return any(k in text for k in keywords)
+
+
+def _segment_spans(s: str):
+    # Границы сегментов: «;», «,» и « и » (если в сегменте нет URL); пробелы по краям отбрасываются
+    start = 0
+    pieces = []
+    for m in _RE_SEG_SPLIT.finditer(s):
+        pieces.append((start, m.start()))
+        start = m.end()
+    pieces.append((start, len(s)))
+    for a, b in pieces:
+        p = s[a:b]
+        a += len(p) - len(p.lstrip())
+        b = a + len(p.strip())
+        if a >= b:
+            continue
+        p = s[a:b]
+        # further split on ' и ' if present and no URL
+        if " и " in p and ("http://" not in p and "https://" not in p):
+            pos = a
+            for x in p.split(" и "):
+                xa = pos + len(x) - len(x.lstrip())
+                xb = xa + len(x.strip())
+                if xb > xa:
+                    yield xa, xb
+                pos += len(x) + 3
+        else:
+            yield a, b
+
+
+def _split_segments(s: str, s_l: Optional[str] = None) -> List[Tuple[str, str]]:
+    # Сегменты obsidian-команды парами (seg, seg.lower()). Если уже есть s_l = s.lower()
+    # той же длины, нижний регистр сегмента — просто срез s_l, без повторного lower()
+    if s_l is None or len(s_l) != len(s):
+        return [(s[a:b], s[a:b].lower()) for a, b in _segment_spans(s)]
+    return [(s[a:b], s_l[a:b]) for a, b in _segment_spans(s)]
+
+
+def _parse_value(raw: str):
+    s = raw.strip().strip("\u00ab\u00bb\"'")
+    sl = s.lower()
+    if sl in ("true", "false", "yes", "no", "on", "off", "да", "нет", "вкл", "выкл"):
+        return sl in ("true", "yes", "on", "да", "вкл")
+    # int/float: «[+-]цифры» / «[+-]цифры.цифры» — строковыми методами, без regex
+    # (isdecimal, а не isdigit: «²» — digit, но int() его не примет)
+    body = s[1:] if s[:1] in ("+", "-") else s
+    if body.isdecimal():
+        return int(s)
+    whole, dot, frac = body.partition(".")
+    if dot and whole.isdecimal() and frac.isdecimal():
+        return float(s)
+    # JSON literal fallback
+    try:
+        return json.loads(s)
+    except Exception:
+        return s
+
+
+def _maybe_setting_key(name: str) -> bool:
+    # Heuristic: treat as setting if contains dot or CamelCase letter
+    return ("." in name) or any(ch.isupper() for ch in name)
+
+
+# Обработчики сегментов obsidian-команды. Каждый получает (seg, seg_l, tags, today)
+# и возвращает шаг или None — тогда сегмент пробует следующий обработчик.
+
+def _seg_list_notes(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    if {"list_ru", "notes_ru"} <= tags or {"list_en", "notes_en"} <= tags:
+        return {"name": "obsidian_list_notes", "params": {}}
+    return None
+
+
+def _seg_read_note(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    if "note_ref" not in tags:
+        return None
+    m = _RE_READ_MD.search(seg)
+    file = (m.group(1).strip() if m else seg.split()[-1])
+    return {"name": "obsidian_read_note", "params": {"file": file}}
+
+
+def _seg_write_note(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    # pattern: ... path.md: content
+    if ":" in seg:
+        left, right = seg.split(":", 1)
+        m = _RE_MD_PATH.search(left.strip())
+        file = (m.group(1).strip() if m else "Notes/New Note.md")
+        return {"name": "obsidian_write_note", "params": {"file": file, "content": right.strip()}}
+    # fallback: create empty note at path
+    m = _RE_MD_PATH.search(seg)
+    file = (m.group(1).strip() if m else "Notes/New Note.md")
+    return {"name": "obsidian_write_note", "params": {"file": file, "content": ""}}
+
+
+def _seg_append_note(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    if ":" not in seg:
+        return None
+    left, right = seg.split(":", 1)
+    m = _RE_MD_PATH.search(left.strip())
+    file = (m.group(1).strip() if m else "Notes/Journal/Daily/daily-" + today + ".md")
+    return {"name": "obsidian_append_note", "params": {"file": file, "content": right.strip()}}
+
+
+def _seg_find(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    q = seg
+    m = _RE_FIND_QUERY.search(seg)
+    if m:
+        q = m.group(1)
+    return {"name": "obsidian_find", "params": {"query": q.strip(), "limit": 50}}
+
+
+def _seg_ingest_vault(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    if "vault" in tags:
+        return {"name": "ingest_vault_all", "params": {}}
+    return None
+
+
+def _seg_backup(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    if _RE_BACKUP.search(seg_l):
+        return {"name": "obsidian_backup", "params": {}}
+    return None
+
+
+def _seg_list_plugins(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    if {"list_ru", "plugin_ru"} <= tags or {"list_en", "plugin_en"} <= tags:
+        return {"name": "obsidian_list_plugins", "params": {}}
+    return None
+
+
+def _seg_install_plugin(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    # install from URL
+    m = _RE_URL_ZIP.search(seg)
+    if m:
+        return {"name": "obsidian_install_plugin_url", "params": {"url": m.group(0)}}
+    # install from zip path
+    if ".zip" in seg:
+        # naive path extraction: last token ending with .zip
+        cand = None
+        for tok in _RE_WS.split(seg):
+            if tok.endswith(".zip"):
+                cand = tok
+        if cand:
+            return {"name": "obsidian_install_plugin_zip", "params": {"zip": cand}}
+    return None
+
+
+def _seg_set_theme(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    if "theme_set" not in tags:
+        return None
+    # take last word(s) after the keyword 'тему'|'theme'
+    m = _RE_THEME.search(seg)
+    theme = (m.group(1).strip() if m else seg).strip().strip('"\'')
+    return {"name": "obsidian_set_theme", "params": {"theme": theme}}
+
+
+def _seg_snippet(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    # write snippet: look for name: content
+    if "snippet_write" in tags and ":" in seg:
+        name_part, content_part = seg.split(":", 1)
+        # extract name after word 'сниппет'
+        m = _RE_SNIPPET_NAME.search(name_part)
+        name = (m.group(1).strip() if m else "snippet.css")
+        return {"name": "obsidian_write_snippet", "params": {"name": name, "content": content_part.strip()}}
+    for tag, step_name in (("enable", "obsidian_enable_snippet"), ("disable", "obsidian_disable_snippet")):
+        if tag in tags:
+            m = _RE_SNIPPET_TAIL.search(seg)
+            return {"name": step_name, "params": {"name": (m.group(1).strip() if m else seg)}}
+    return None
+
+
+def _seg_set_setting(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    if "setting_set" not in tags:
+        return None
+    # pattern: настройку key=value or key: value
+    m = _RE_SETTING_KV.search(seg)
+    if m:
+        key, val = m.group(1), m.group(2)
+        return {"name": "obsidian_set_setting", "params": {"file": "app.json", "path": key, "value": _parse_value(val)}}
+    return None
+
+
+def _seg_core_plugin(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    if "plugin_ru" not in tags and "plugin_en" not in tags:
+        return None
+    for tag, step_name in (("enable", "obsidian_enable_core_plugin"), ("disable", "obsidian_disable_core_plugin")):
+        if tag in tags:
+            m = _RE_CORE_PLUGIN.search(seg)
+            return {"name": step_name, "params": {"id": (m.group(1) if m else seg.split()[-1])}}
+    return None
+
+
+def _seg_toggle(seg: str, seg_l: str, tags: set, today: str) -> Optional[Dict[str, Any]]:
+    # generic enable/disable: prefer plugin unless heuristic says setting
+    enable = "enable" in tags
+    m = _RE_PLUGIN_ID.search(seg)
+    if m:
+        return {"name": "obsidian_enable_plugin" if enable else "obsidian_disable_plugin", "params": {"id": m.group(1)}}
+    # no explicit word — disambiguate
+    tail = (_RE_ENABLE_PREFIX if enable else _RE_DISABLE_PREFIX).sub("", seg).strip()
+    if _maybe_setting_key(tail):
+        return {"name": "obsidian_set_setting", "params": {"file": "app.json", "path": tail, "value": enable}}
+    return {"name": "obsidian_enable_plugin" if enable else "obsidian_disable_plugin", "params": {"id": tail}}
+
+
+# (теги-«ворота», обработчик) в порядке приоритета: обработчик вызывается, только если
+# у сегмента есть хотя бы один из его тегов (пустые ворота — вызывается всегда).
+_SEGMENT_HANDLERS = (
+    (frozenset({"list_ru", "list_en"}), _seg_list_notes),
+    (frozenset({"read"}), _seg_read_note),
+    (frozenset({"write"}), _seg_write_note),
+    (frozenset({"append"}), _seg_append_note),
+    (frozenset({"find"}), _seg_find),
+    (frozenset({"index"}), _seg_ingest_vault),
+    (frozenset(), _seg_backup),
+    (frozenset({"list_ru", "list_en"}), _seg_list_plugins),
+    (frozenset({"install"}), _seg_install_plugin),
+    (frozenset({"theme"}), _seg_set_theme),
+    (frozenset({"snippet"}), _seg_snippet),
+    (frozenset({"setting"}), _seg_set_setting),
+    (frozenset({"core"}), _seg_core_plugin),
+    (frozenset({"enable", "disable"}), _seg_toggle),
+)
+
+
 def plan(user_text: str) -> List[Dict[str, Any]]:
-    t = user_text.lower().strip()
+    # Повторный/одинаковый ввод в REPL берётся из кеша; дата — часть ключа,
+    # чтобы Daily-заголовки не «застревали» на вчерашнем дне.
+    # deepcopy: вызывающий код волен менять params, кеш при этом не портится
+    today = time.strftime('%Y-%m-%d')
+    return copy.deepcopy(list(_plan_cached(user_text, today)))
+
+
+@functools.lru_cache(maxsize=512)
+def _plan_cached(user_text: str, today: str) -> Tuple[Dict[str, Any], ...]:
+    return tuple(_plan(user_text, today))
+
+
+def _plan(user_text: str, today: str) -> List[Dict[str, Any]]:
+    lt = user_text.lower()
+    t = lt.strip()
     steps: List[Dict[str, Any]] = []
 
     if not t:
         return steps
 
     # Obsidian management commands
-    if ("obsidian" in t) or ("обсидиан" in t):
+    if _has_any(t, _OBSIDIAN_KW):
         # Extract command substring after prefix like "obsidian:" or the word itself
-        cmd_text = user_text
-        lt = user_text.lower()
-        for prefix in ["obsidian:", "обсидиан:"]:
+        cmd_text, cmd_l = user_text, lt
+        for prefix in ("obsidian:", "обсидиан:"):
             i = lt.find(prefix)
             if i >= 0:
                 cmd_text = user_text[i + len(prefix):].strip()
+                cmd_l = lt[i + len(prefix):].strip()
                 break
         else:
             # If starts with the word without colon, drop it
             tokens = user_text.split(maxsplit=1)
             if tokens and tokens[0].lower() in ("obsidian", "обсидиан"):
                 cmd_text = tokens[1] if len(tokens) > 1 else ""
+                cmd_l = None
 
-        def _split_segments(s: str) -> List[str]:
-            parts = re.split(r"[;，,]+", s)
-            out: List[str] = []
-            for p in parts:
-                p = p.strip()
-                if not p:
+        for seg, seg_l in _split_segments(cmd_text, cmd_l):
+            tags = _segment_tags(seg_l)
+            for gate, handler in _SEGMENT_HANDLERS:
+                if gate and gate.isdisjoint(tags):
                     continue
-                # further split on ' и ' if present and no URL
-                if " и " in p and ("http://" not in p and "https://" not in p):
-                    out.extend([x.strip() for x in p.split(" и ") if x.strip()])
-                else:
-                    out.append(p)
-            return out
-
-        def _parse_value(raw: str):
-            s = raw.strip().strip("\u00ab\u00bb\"'")
-            sl = s.lower()
-            if sl in ("true", "false", "yes", "no", "on", "off", "да", "нет", "вкл", "выкл"):
-                return sl in ("true", "yes", "on", "да", "вкл")
-            # int/float
-            try:
-                if re.fullmatch(r"[-+]?\d+", s):
-                    return int(s)
-                if re.fullmatch(r"[-+]?\d+\.\d+", s):
-                    return float(s)
-            except Exception:
-                pass
-            # JSON literal fallback
-            try:
-                return json.loads(s)
-            except Exception:
-                return s
-
-        def _maybe_setting_key(name: str) -> bool:
-            # Heuristic: treat as setting if contains dot or CamelCase letter
-            return ("." in name) or any(ch.isupper() for ch in name)
-
-        segments = _split_segments(cmd_text)
-        for seg in segments:
-            seg_l = seg.lower()
-            # list notes
-            if ("список" in seg_l and "замет" in seg_l) or ("list" in seg_l and "notes" in seg_l):
-                steps.append({"name": "obsidian_list_notes", "params": {}})
-                continue
-            # read note
-            if any(k in seg_l for k in ("прочитай", "прочесть", "покажи", "read", "show")) and (".md" in seg_l or "notes/" in seg_l or "note" in seg_l):
-                m = re.search(r"(?:прочитай|read|покажи)\s+(.+\.md)$", seg, flags=re.IGNORECASE)
-                file = (m.group(1).strip() if m else seg.split()[-1])
-                steps.append({"name": "obsidian_read_note", "params": {"file": file}})
-                continue
-            # write/create note
-            if any(k in seg_l for k in ("создай", "создать", "запиши", "создай заметку", "write note", "create note")):
-                # pattern: ... path.md: content
-                if ":" in seg:
-                    left, right = seg.split(":", 1)
-                    m = re.search(r"([\w\-/ .]+\.md)$", left.strip())
-                    file = (m.group(1).strip() if m else "Notes/New Note.md")
-                    steps.append({"name": "obsidian_write_note", "params": {"file": file, "content": right.strip()}})
-                else:
-                    # fallback: create empty note at path
-                    m = re.search(r"([\w\-/ .]+\.md)$", seg)
-                    file = (m.group(1).strip() if m else "Notes/New Note.md")
-                    steps.append({"name": "obsidian_write_note", "params": {"file": file, "content": ""}})
-                continue
-            # append note
-            if any(k in seg_l for k in ("допиши", "append")) and ":" in seg:
-                left, right = seg.split(":", 1)
-                m = re.search(r"([\w\-/ .]+\.md)$", left.strip())
-                file = (m.group(1).strip() if m else "Notes/Journal/Daily/daily-" + datetime.now().strftime('%Y-%m-%d') + ".md")
-                steps.append({"name": "obsidian_append_note", "params": {"file": file, "content": right.strip()}})
-                continue
-            # find in notes
-            if any(k in seg_l for k in ("найди", "поиск", "find", "search")):
-                q = seg
-                m = re.search(r"(?:найди|find|search)\s+(.+)$", seg, flags=re.IGNORECASE)
-                if m:
-                    q = m.group(1)
-                steps.append({"name": "obsidian_find", "params": {"query": q.strip(), "limit": 50}})
-                continue
-            # ingest entire vault
-            if any(k in seg_l for k in ("проиндексируй", "индексируй", "index", "ingest")) and any(k in seg_l for k in ("вольт", "vault", "весь")):
-                steps.append({"name": "ingest_vault_all", "params": {}})
-                continue
-            # backup
-            if re.search(r"\b(backup|бэкап)\b", seg_l):
-                steps.append({"name": "obsidian_backup", "params": {}})
-                continue
-            # list plugins
-            if ("список" in seg_l and "плагин" in seg_l) or ("list" in seg_l and "plugin" in seg_l):
-                steps.append({"name": "obsidian_list_plugins", "params": {}})
-                continue
-            # install from URL
-            m = re.search(r"https?://\S+\.zip", seg, flags=re.IGNORECASE)
-            if m and ("установ" in seg_l or "install" in seg_l):
-                steps.append({"name": "obsidian_install_plugin_url", "params": {"url": m.group(0)}})
-                continue
-            # install from zip path
-            if (".zip" in seg) and ("установ" in seg_l or "install" in seg_l):
-                # naive path extraction: last token ending with .zip
-                cand = None
-                for tok in re.split(r"\s+", seg):
-                    if tok.endswith(".zip"):
-                        cand = tok
-                if cand:
-                    steps.append({"name": "obsidian_install_plugin_zip", "params": {"zip": cand}})
-                    continue
-            # theme
-            if ("тему" in seg_l or "theme" in seg_l) and any(k in seg_l for k in ("постав", "установ", "switch", "set")):
-                # take last word(s) after the keyword 'тему'|'theme'
-                m2 = re.search(r"(?:тему|theme)\s+(.+)$", seg, flags=re.IGNORECASE)
-                theme = (m2.group(1).strip() if m2 else seg).strip().strip('"\'')
-                steps.append({"name": "obsidian_set_theme", "params": {"theme": theme}})
-                continue
-            # snippet enable/disable/write
-            if "сниппет" in seg_l or "snippet" in seg_l:
-                # write snippet: look for name: content
-                if any(k in seg_l for k in ("запиши", "создай", "write", "add")) and ":" in seg:
-                    name_part, content_part = seg.split(":", 1)
-                    # extract name after word 'сниппет'
-                    m3 = re.search(r"(?:сниппет|snippet)\s+([\w\-. ]+)", name_part, flags=re.IGNORECASE)
-                    name = (m3.group(1).strip() if m3 else "snippet.css")
-                    steps.append({"name": "obsidian_write_snippet", "params": {"name": name, "content": content_part.strip()}})
-                    continue
-                if any(k in seg_l for k in ("включ", "enable")):
-                    m4 = re.search(r"(?:сниппет|snippet)\s+([\w\-. ]+)$", seg, flags=re.IGNORECASE)
-                    name = (m4.group(1).strip() if m4 else seg)
-                    steps.append({"name": "obsidian_enable_snippet", "params": {"name": name}})
-                    continue
-                if any(k in seg_l for k in ("выключ", "disable")):
-                    m5 = re.search(r"(?:сниппет|snippet)\s+([\w\-. ]+)$", seg, flags=re.IGNORECASE)
-                    name = (m5.group(1).strip() if m5 else seg)
-                    steps.append({"name": "obsidian_disable_snippet", "params": {"name": name}})
-                    continue
-            # settings explicit
-            if ("настройк" in seg_l or "setting" in seg_l) and any(k in seg_l for k in ("установ", "постав", "set")):
-                # pattern: настройку key=value or key: value
-                m6 = re.search(r"(?:настройк\w*|setting)\s+([\w\.]+)\s*(?:=|:)\s*(.+)$", seg, flags=re.IGNORECASE)
-                if m6:
-                    key, val = m6.group(1), m6.group(2)
-                    steps.append({"name": "obsidian_set_setting", "params": {"file": "app.json", "path": key, "value": _parse_value(val)}})
-                    continue
-            # core plugin
-            if ("core" in seg_l or "базов" in seg_l or "ядро" in seg_l) and ("плагин" in seg_l or "plugin" in seg_l):
-                if any(k in seg_l for k in ("включ", "enable")):
-                    m7 = re.search(r"(?:core\s+plugin|базов\w*\s+плагин|ядро\s+плагин|core)\s+([\w\-\.]+)$", seg, flags=re.IGNORECASE)
-                    pid = (m7.group(1) if m7 else seg.split()[-1])
-                    steps.append({"name": "obsidian_enable_core_plugin", "params": {"id": pid}})
-                    continue
-                if any(k in seg_l for k in ("выключ", "disable")):
-                    m8 = re.search(r"(?:core\s+plugin|базов\w*\s+плагин|ядро\s+плагин|core)\s+([\w\-\.]+)$", seg, flags=re.IGNORECASE)
-                    pid = (m8.group(1) if m8 else seg.split()[-1])
-                    steps.append({"name": "obsidian_disable_core_plugin", "params": {"id": pid}})
-                    continue
-            # generic enable/disable: prefer plugin unless heuristic says setting
-            if any(k in seg_l for k in ("включ", "enable")):
-                m9 = re.search(r"(?:плагин|plugin)\s+([\w\-\.]+)$", seg, flags=re.IGNORECASE)
-                if m9:
-                    steps.append({"name": "obsidian_enable_plugin", "params": {"id": m9.group(1)}})
-                    continue
-                # no explicit word — disambiguate
-                tail = re.sub(r"^(включи\s+|enable\s+)", "", seg, flags=re.IGNORECASE).strip()
-                if _maybe_setting_key(tail):
-                    steps.append({"name": "obsidian_set_setting", "params": {"file": "app.json", "path": tail, "value": True}})
-                else:
-                    steps.append({"name": "obsidian_enable_plugin", "params": {"id": tail}})
-                continue
-            if any(k in seg_l for k in ("выключ", "disable")):
-                m10 = re.search(r"(?:плагин|plugin)\s+([\w\-\.]+)$", seg, flags=re.IGNORECASE)
-                if m10:
-                    steps.append({"name": "obsidian_disable_plugin", "params": {"id": m10.group(1)}})
-                    continue
-                tail = re.sub(r"^(выключи\s+|disable\s+)", "", seg, flags=re.IGNORECASE).strip()
-                if _maybe_setting_key(tail):
-                    steps.append({"name": "obsidian_set_setting", "params": {"file": "app.json", "path": tail, "value": False}})
-                else:
-                    steps.append({"name": "obsidian_disable_plugin", "params": {"id": tail}})
-                continue
+                step = handler(seg, seg_l, tags, today)
+                if step:
+                    steps.append(step)
+                    break
         return steps
 
     # Шаблоны: ежедневка и создание заметок
-    if any(k in t for k in ["ежеднев", "daily", "дневник", "создай заметку", "создать заметку", "заметка сегодня", "сегодняшн"]):
+    keyword, idx = _first_keyword(lt, _DAILY_KW)
+    if keyword:
         # Извлечём содержимое после ключевых слов
         content = user_text  # весь текст как содержимое (включая переносы)
-        # Найдём первое вхождение ключевого слова и возьмём весь текст после него (без принудительного обрезания по разделителям)
-        for keyword in ["создай заметку", "создать заметку", "заметка сегодня", "сегодняшн", "ежеднев", "daily", "дневник"]:
-            if keyword in t:
-                idx = user_text.lower().find(keyword)
-                if idx >= 0:
-                    after_keyword = user_text[idx + len(keyword):]
-                    # Уберём ведущие пробелы и одиночные разделители
-                    after_keyword = after_keyword.lstrip()
-                    if after_keyword[:1] in ".:!":
-                        after_keyword = after_keyword[1:].lstrip()
-                    # Доп. очистка для форм "сегодняшнюю заметку ...": уберём начальные слова "заметк*"
-                    ak = after_keyword.lstrip()
-                    if ak.lower().startswith("заметк"):
-                        # обрежем до запятой/двоеточия, если есть
-                        if "," in ak:
-                            ak = ak.split(",", 1)[1].lstrip()
-                        elif ":" in ak:
-                            ak = ak.split(":", 1)[1].lstrip()
-                        else:
-                            # просто уберём первое слово
-                            ak = " ".join(ak.split()[1:])
-                    if ak:
-                        content = ak
-                break
+        # Берём весь текст после первого (по приоритету) ключевого слова (без принудительного обрезания по разделителям)
+        after_keyword = user_text[idx + len(keyword):]
+        # Уберём ведущие пробелы и одиночные разделители
+        after_keyword = after_keyword.lstrip()
+        if after_keyword[:1] in ".:!":
+            after_keyword = after_keyword[1:].lstrip()
+        # Доп. очистка для форм "сегодняшнюю заметку ...": уберём начальные слова "заметк*"
+        ak = after_keyword.lstrip()
+        # (сравниваем только префикс — без lower() всего, возможно длинного, содержимого)
+        if ak[:6].lower() == "заметк":
+            # обрежем до запятой/двоеточия, если есть
+            if "," in ak:
+                ak = ak.split(",", 1)[1].lstrip()
+            elif ":" in ak:
+                ak = ak.split(":", 1)[1].lstrip()
+            else:
+                # просто уберём первое слово
+                ak = " ".join(ak.split()[1:])
+        if ak:
+            content = ak
         
-        title = f"Daily {datetime.now().strftime('%Y-%m-%d')}"
+        title = f"Daily {today}"
         steps.append({"name": "create_daily_note", "params": {
             "title": title,
             "content": f"# {title}\n\n{content}\n"
@@ -254,10 +437,10 @@ def plan(user_text: str) -> List[Dict[str, Any]]:
         return steps
 
     # Финансы: импорт CSV
-    if any(k in t for k in ["финанс", "finance"]) and ("csv" in t or "сvс" in t):
+    if _has_any(t, _FINANCE_KW) and ("csv" in t or "сvс" in t):
         # извлечь путь к csv: последнее слово, оканчивающееся на .csv
         path = None
-        for tok in re.split(r"\s+", user_text):
+        for tok in _RE_WS.split(user_text):
             if tok.lower().endswith(".csv"):
                 path = tok.strip().strip("'\"")
         if path:
@@ -265,12 +448,12 @@ def plan(user_text: str) -> List[Dict[str, Any]]:
             return steps
 
     # Финансы: запись расхода/дохода
-    if any(k in t for k in ["финанс", "finance", "расход", "доход", "покуп", "income", "expense"]):
+    if _has_any(t, _MONEY_KW):
         kind = "expense"
-        if any(k in t for k in ["доход", "income"]):
+        if _has_any(t, _INCOME_KW):
             kind = "income"
         # сумма и валюта
-        m_amt = re.search(r"(\d+[\.,]\d+|\d+)\s*(uah|грн|₴|usd|eur|€|\$)?", user_text, flags=re.IGNORECASE)
+        m_amt = _RE_AMOUNT.search(user_text)
         amount = None
         currency = None
         if m_amt:
@@ -280,21 +463,21 @@ def plan(user_text: str) -> List[Dict[str, Any]]:
             currency = cur_map.get(cur, None)
         # категория
         cat = None
-        m_cat = re.search(r"категор\w*\s+([\w\-_/]+)", user_text, flags=re.IGNORECASE)
+        m_cat = _RE_CATEGORY.search(user_text)
         if m_cat:
             cat = m_cat.group(1)
         if not cat:
-            m_hash = re.search(r"#([\w\-_]+)", user_text)
+            m_hash = _RE_HASHTAG.search(user_text)
             if m_hash:
                 cat = m_hash.group(1)
         note = user_text
         # очистим служебные маркеры
-        note = re.sub(r"финанс\w*|finance|расход|доход|покуп\w*|income|expense", "", note, flags=re.IGNORECASE)
+        note = _RE_FINANCE_WORDS.sub("", note)
         if amount:
             note = note.replace(m_amt.group(0), "")
         if cat:
-            note = re.sub(r"категор\w*\s+[\w\-_/]+", "", note, flags=re.IGNORECASE)
-            note = re.sub(r"#[\w\-_]+", "", note)
+            note = _RE_CATEGORY.sub("", note)
+            note = _RE_HASHTAG.sub("", note)
         note = note.strip(" .:")
         params = {"type": kind}
         if amount: params["amount"] = float(amount)
@@ -306,31 +489,31 @@ def plan(user_text: str) -> List[Dict[str, Any]]:
             return steps
 
     # Здоровье: лог метрик
-    if any(k in t for k in ["здоров", "health", "пульс", "сон", "давлен", "вес"]):
+    if _has_any(t, _HEALTH_KW):
         metrics = {}
-        m_w = re.search(r"вес\s*(\d+(?:[\.,]\d+)?)", user_text, flags=re.IGNORECASE)
+        m_w = _RE_WEIGHT.search(user_text)
         if m_w:
             metrics["weight_kg"] = float(m_w.group(1).replace(",", "."))
-        m_p = re.search(r"пульс\s*(\d+)", user_text, flags=re.IGNORECASE)
+        m_p = _RE_PULSE.search(user_text)
         if m_p:
             metrics["pulse_bpm"] = int(m_p.group(1))
-        m_bp = re.search(r"давлен\w*\s*(\d+)\s*[\/-]\s*(\d+)", user_text, flags=re.IGNORECASE)
+        m_bp = _RE_BLOOD_PRESSURE.search(user_text)
         if m_bp:
             metrics["bp_sys"] = int(m_bp.group(1)); metrics["bp_dia"] = int(m_bp.group(2))
         # сон: 'сон 7:30' или 'спал 7.5'
-        m_sleep_hm = re.search(r"(?:сон|sleep)\s*(\d+):(\d{2})", user_text, flags=re.IGNORECASE)
+        m_sleep_hm = _RE_SLEEP_HM.search(user_text)
         if m_sleep_hm:
             h, m = int(m_sleep_hm.group(1)), int(m_sleep_hm.group(2))
             metrics["sleep_min"] = h*60 + m
         else:
-            m_sleep_h = re.search(r"(?:сон|sleep|спал)\s*(\d+(?:[\.,]\d+)?)\s*час", user_text, flags=re.IGNORECASE)
+            m_sleep_h = _RE_SLEEP_HOURS.search(user_text)
             if m_sleep_h:
                 hours = float(m_sleep_h.group(1).replace(",", "."))
                 metrics["sleep_min"] = int(round(hours*60))
-        m_steps = re.search(r"шаг(?:ов|и)?\s*(\d+)", user_text, flags=re.IGNORECASE)
+        m_steps = _RE_STEPS.search(user_text)
         if m_steps:
             metrics["steps"] = int(m_steps.group(1))
-        note = re.sub(r"здоров\w*|health|вес\s*\d+[\.,]?\d*|пульс\s*\d+|давлен\w*\s*\d+[\/-]\d+|сон\s*\d+(?::\d{2})?|спал\s*\d+[\.,]?\d*\s*час\w*|шаг(?:ов|и)?\s*\d+", "", user_text, flags=re.IGNORECASE)
+        note = _RE_HEALTH_WORDS.sub("", user_text)
         note = note.strip(" .:")
         if note:
             metrics["note"] = note
@@ -339,7 +522,7 @@ def plan(user_text: str) -> List[Dict[str, Any]]:
             return steps
 
     # Поиск в вебе ➜ сохранить источники ➜ (опц.)индекс ➜ топK
-    if any(k in t for k in ["поиск", "search", "гугл", "web"]):
+    if _has_any(t, _SEARCH_KW):
         # Извлечём фразу после двоеточия, если есть
         query = t
         if ":" in t:
@@ -350,37 +533,33 @@ def plan(user_text: str) -> List[Dict[str, Any]]:
             # очень упрощённо
             steps.append({"name": "filter_results", "params": {"domain_regex": r"(.*)"}})
         steps.append({"name": "save_sources_markdown", "params": {"title": f"Agent Sources: {query[:40]}"}})
-        if any(k in t for k in ["индекс", "index", "вектор", "qdrant"]):
+        if _has_any(t, _INDEX_KW):
             steps.append({"name": "ingest_qdrant", "params": {}})
-        if any(k in t for k in ["топ", "top", "выдача"]):
+        if _has_any(t, _TOP_KW):
             steps.append({"name": "vector_topk", "params": {"query": query, "k": 10}})
         return steps
 
     # Добавление в сегодняшнюю заметку
-    if any(k in t for k in ["добавь к сегодняшней", "допиши к сегодняшней", "добавь в ежедневку", "допиши в ежедневку", "append daily"]):
+    keyword, idx = _first_keyword(lt, _APPEND_DAILY_KW)
+    if keyword:
         # извлечём содержимое после ключевых фраз
         content = user_text
-        for keyword in ["добавь к сегодняшней", "допиши к сегодняшней", "добавь в ежедневку", "допиши в ежедневку", "append daily"]:
-            if keyword in t:
-                idx = user_text.lower().find(keyword)
-                if idx >= 0:
-                    after = user_text[idx + len(keyword):].lstrip()
-                    if after[:1] in ":.!":
-                        after = after[1:].lstrip()
-                    if after:
-                        content = after
-                break
+        after = user_text[idx + len(keyword):].lstrip()
+        if after[:1] in ":.!":
+            after = after[1:].lstrip()
+        if after:
+            content = after
         header_format = "time" if ("время" in t or "короткий" in t) else "iso"
         steps.append({"name": "append_daily_note", "params": {"content": content, "header_format": header_format}})
         return steps
 
     # Недельная заметка
-    if any(k in t for k in ["недел", "weekly", "week note", "недельная заметка"]):
+    if _has_any(t, _WEEKLY_KW):
         steps.append({"name": "create_weekly_note", "params": {}})
         return steps
 
     # Топ-K по базе
-    if any(k in t for k in ["топ", "top", "выдача"]):
+    if _has_any(t, _TOP_KW):
         # Извлечём запрос
         query = t
         if ":" in t:
@@ -392,27 +571,27 @@ def plan(user_text: str) -> List[Dict[str, Any]]:
     if "задач" in t or t.startswith("задача"):
         # формат: "задача: текст ... до <дата/сегодня/завтра> приоритет <высокий/средний/низкий>"
         text = user_text
-        m = re.search(r"задач\w*\s*:?\s*(.+)$", user_text, flags=re.IGNORECASE)
+        m = _RE_TASK.search(user_text)
         if m:
             text = m.group(1).strip()
         due = None
         pr = None
-        md = re.search(r"до\s+([^,;]+)", text, flags=re.IGNORECASE)
+        md = _RE_DUE.search(text)
         if md:
             due = md.group(1).strip()
-        mp = re.search(r"приоритет\s+([^,;]+)", text, flags=re.IGNORECASE)
+        mp = _RE_PRIORITY.search(text)
         if mp:
             pr = mp.group(1).strip()
         # вырезать служебные куски из текста
-        text_clean = re.sub(r"до\s+[^,;]+", "", text, flags=re.IGNORECASE)
-        text_clean = re.sub(r"приоритет\s+[^,;]+", "", text_clean, flags=re.IGNORECASE).strip(" .:")
+        text_clean = _RE_DUE.sub("", text)
+        text_clean = _RE_PRIORITY.sub("", text_clean).strip(" .:")
         steps.append({"name": "obsidian_add_task", "params": {"text": text_clean, **({"due": due} if due else {}), **({"priority": pr} if pr else {})}})
         return steps
 
     # Задачи: отметить выполненной
-    if any(k in t for k in ["выполни задачу", "отметь задачу", "закрой задачу", "complete task"]):
+    if _has_any(t, _MARK_TASK_KW):
         # извлечь фразу после ключевых слов
-        m = re.search(r"(?:выполни\s+задач\w*|отметь\s+задач\w*|закрой\s+задач\w*|complete\s+task)\s*:?\s*(.+)$", user_text, flags=re.IGNORECASE)
+        m = _RE_MARK_TASK.search(user_text)
         match = (m.group(1).strip() if m else user_text)
         steps.append({"name": "obsidian_mark_task", "params": {"match": match}})
         return steps
@@ -427,13 +606,27 @@ def _is_risky_step(name: str) -> bool:
     risky_words = ["install", "disable", "delete", "clear", "set_setting"]
     return any(w in nl for w in risky_words)
 
+# Печать params/результатов шагов: длиннее — обрезаем (vector_topk может вернуть мегабайты)
+_LOG_JSON_LIMIT = 4096
+
+def _dumps_log(obj: Any) -> str:
+    """Компактный JSON для консоли: orjson, если установлен; непонятные типы — через str()"""
+    if orjson is not None:
+        s = orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    else:
+        s = json.dumps(obj, ensure_ascii=False, default=str)
+    if len(s) > _LOG_JSON_LIMIT:
+        s = s[:_LOG_JSON_LIMIT] + "…"
+    return s
+
 def confirm(plan_steps: List[Dict[str, Any]]) -> bool:
     auto = os.environ.get("AI_STACK_AUTO_EXECUTE", "0") == "1"
     allow_risk = os.environ.get("AI_STACK_ALLOW_RISK", "0") == "1"
     risky = any(_is_risky_step(s.get("name", "")) for s in plan_steps)
-    print("Предлагаемый план:")
-    for i, s in enumerate(plan_steps, 1):
-        print(f" {i}. {s['name']} {json.dumps(s.get('params', {}), ensure_ascii=False)}")
+    # Весь план — одной записью в stdout
+    sys.stdout.write("Предлагаемый план:\n" + "".join(
+        f" {i}. {s['name']} {_dumps_log(s.get('params', {}))}\n" for i, s in enumerate(plan_steps, 1)
+    ))
     if auto and (not risky or allow_risk):
         print("Авто-режим: выполняю без подтверждения.")
         return True
@@ -466,8 +659,7 @@ def _write_suggestions_to_vault(lines: List[str]) -> None:
         return
     cfg = load_config()
     mgr = ObsidianManager(cfg.vault_path)
-    from datetime import datetime as _dt
-    date = _dt.now().strftime('%Y-%m-%d')
+    date = time.strftime('%Y-%m-%d')
     rel = f"Notes/Suggestions/suggestions-{date}.md"
     content = "\n".join(f"- {l}" for l in lines) + "\n"
     try:
@@ -475,22 +667,50 @@ def _write_suggestions_to_vault(lines: List[str]) -> None:
     except Exception:
         pass
 
+def _step_key(name: str, params: Dict[str, Any]) -> Tuple[str, str]:
+    # params могут содержать списки/словари — ключ строим из канонического JSON
+    return name, json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+
+@functools.lru_cache(maxsize=None)
+def _ensure_registry() -> None:
+    # Шаги регистрируются декораторами при импорте модулей pipelines (тянут vector_store и т.п.);
+    # plan() они не нужны, поэтому подключаем их один раз — перед первым выполнением
+    from pipelines import steps  # noqa: F401 - ensure step functions are registered via decorators
+    from pipelines import finance_health_steps  # noqa: F401 - register finance/health steps
+
 def run(plan_steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    _ensure_registry()
     ctx: Dict[str, Any] = {}
-    for s in plan_steps:
-        name = s["name"]
-        params = dict(s.get("params") or {})
-        fn = Registry.get(name)
+    # Одинаковые шаги (имя + params) в пределах одного плана выполняются один раз,
+    # повтор берёт результат первого запуска
+    done: Dict[Tuple[str, str], Any] = {}
+    # Каждая строка лога — один вызов write (print пишет текст и "\n" отдельно);
+    # строки не копятся до конца плана, чтобы прогресс долгих шагов был виден сразу
+    write = sys.stdout.write
+    # Шаги разрешаются в функции один раз до выполнения; отсутствующие сообщаются сразу
+    get = Registry.get
+    resolved = [(get(s["name"]), s["name"], dict(s.get("params") or {})) for s in plan_steps]
+    for fn, name, _ in resolved:
+        if not fn:
+            write(f"⚠️ Шаг '{name}' не найден, пропускаю.\n")
+    for fn, name, params in resolved:
         if not fn:
-            print(f"⚠️ Шаг '{name}' не найден, пропускаю.")
+            continue
+        key = _step_key(name, params)
+        if key in done:
+            res = done[key]
+            if isinstance(res, dict):
+                ctx.update(res)
+            write(f"♻️ {name} reused\n")
             continue
         try:
             res = fn(params, ctx)
+            done[key] = res
             if isinstance(res, dict):
                 ctx.update(res)
-            print(f"✅ {name} -> {json.dumps(res, ensure_ascii=False)}")
+            write(f"✅ {name} -> {_dumps_log(res)}\n")
         except Exception as e:
-            print(f"❌ {name} ошибка: {e}")
+            write(f"❌ {name} ошибка: {e}\n")
             break
     # Suggestions
     if os.environ.get("AI_STACK_SUGGEST", "1") == "1":
@@ -521,8 +741,8 @@ def repl():
                 continue
             ctx = run(steps)
             # краткий итог
-            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"\nИтог ({ts}): {json.dumps({k: v for k, v in ctx.items() if isinstance(v, str)}, ensure_ascii=False)}")
+            ts = time.strftime("%Y-%m-%d %H:%M:%S")
+            print(f"\nИтог ({ts}): {_dumps_log({k: v for k, v in ctx.items() if isinstance(v, str)})}")
         except KeyboardInterrupt:
             print("\nВыход.")
             break
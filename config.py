@@ -1,3 +1,4 @@
+import functools
 import os
 from dataclasses import dataclass
 from typing import Dict, Any, Optional
@@ -7,6 +8,9 @@ try:
 except Exception:
     yaml = None  # type: ignore
 
+# libyaml-парсер (C) заметно быстрее чистого Python, если PyYAML собран с ним
+_YAML_LOADER = (getattr(yaml, "CSafeLoader", None) or yaml.SafeLoader) if yaml is not None else None
+
 # Путь к YAML-конфигу (может переопределяться env)
 DEFAULT_CONFIG_PATH = os.environ.get(
     "AI_STACK_CONFIG",
@@ -39,6 +43,26 @@ class AppConfig:
         )
 
 
+def _config_mtime(cfg_path: str) -> Optional[int]:
+    try:
+        return os.stat(cfg_path).st_mtime_ns
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=8)
+def _read_yaml_config(cfg_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parsed YAML config, memoized per (path, mtime): the file is re-read only when it changes."""
+    try:
+        # bytes: libyaml сам декодирует UTF-8, без промежуточного текстового слоя
+        with open(cfg_path, "rb") as f:
+            y = yaml.load(f, Loader=_YAML_LOADER) or {}
+    except (OSError, yaml.YAMLError):
+        # Файл исчез между stat и open или битый YAML — используем значения по умолчанию
+        return {}
+    return y if isinstance(y, dict) else {}
+
+
 def load_config(path: Optional[str] = None) -> AppConfig:
     cfg_path = path or DEFAULT_CONFIG_PATH
     # Defaults
@@ -52,19 +76,16 @@ def load_config(path: Optional[str] = None) -> AppConfig:
             "logs": "Logs",
         },
     }
-    try:
-        if yaml is not None:
-            with open(cfg_path, "r", encoding="utf-8") as f:
-                y = yaml.safe_load(f) or {}
-            # Merge shallow
-            if isinstance(y, dict):
-                if "vault_path" in y:
-                    data["vault_path"] = str(y["vault_path"])
-                if isinstance(y.get("folders"), dict):
-                    data["folders"].update({k: str(v) for k, v in y["folders"].items()})  # type: ignore
-    except Exception:
-        # Конфиг может отсутствовать — используем значения по умолчанию
-        pass
+    # Конфиг может отсутствовать — тогда сразу значения по умолчанию, без open()/исключений
+    mtime_ns = _config_mtime(cfg_path) if yaml is not None else None
+    if mtime_ns is not None:
+        # Кешируется только разбор файла: default_vault() читает env при каждом вызове,
+        # а AppConfig собирается заново, так что вызывающий код может его менять
+        y = _read_yaml_config(cfg_path, mtime_ns)
+        # Merge shallow
+        if "vault_path" in y:
+            data["vault_path"] = str(y["vault_path"])
+        if isinstance(y.get("folders"), dict):
+            data["folders"].update({k: str(v) for k, v in y["folders"].items()})  # type: ignore
     folders = AppFolders(**data["folders"])  # type: ignore[arg-type]
     return AppConfig(vault_path=data["vault_path"], folders=folders)
-
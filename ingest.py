@@ -12,6 +12,10 @@ Usage examples:
   python ingest.py --only-json
   python ingest.py --clear  # clears collection
 
+Point ids are derived from a stable record key (see point_id), so re-ingesting overwrites
+points in place. Collections built before point ids were keyed this way need one
+`--clear` re-ingest, or the old points stay next to the new ones.
+
 Environment overrides:
   AI_STACK_QDRANT_URL (default: http://localhost:6333)
   AI_STACK_QDRANT_COLLECTION (default: ai_research)
@@ -22,6 +26,8 @@ from __future__ import annotations
 import os
 import json
 import argparse
+import hashlib
+import uuid
 from pathlib import Path
 from typing import Dict, Any, List, Iterable, Tuple, Optional
 
@@ -31,6 +37,11 @@ try:
 except Exception:
     yaml = None  # will handle gracefully
 
+try:
+    import orjson  # type: ignore  # faster JSON (optional)
+except Exception:
+    orjson = None  # type: ignore
+
 from vector_store import VectorStore, VectorConfig
 from config import load_config
 
@@ -41,6 +52,25 @@ try:
 except Exception:
     pass
 
+# Records are buffered across files and embedded in batches of this size:
+# one encoder pass per batch instead of one (tiny) pass per file.
+UPSERT_BATCH = 256
+
+
+def _flush_pending(vs: VectorStore, texts: List[str], metas: List[Dict[str, Any]], verbose: bool = False) -> int:
+    """Upsert buffered records (if any) and clear the buffers in place."""
+    if not texts:
+        return 0
+    import time
+    t_up0 = time.time()
+    n = vs.upsert_texts(texts, metas)
+    if verbose:
+        print(f"  ⤴ upserted {len(texts)} records ({time.time() - t_up0:.3f}s)")
+    texts.clear()
+    metas.clear()
+    return n
+
+
 def load_config_from_vault(vault_path: str) -> Dict[str, Any]:
     """Return config dict using provided vault_path, keeping folder names from YAML/defaults."""
     cfg = load_config()
@@ -57,17 +87,75 @@ def load_config_from_vault(vault_path: str) -> Dict[str, Any]:
     }
 
 
-def iter_index_json(index_dir: Path, limit: Optional[int] = None) -> Iterable[Tuple[Path, Dict[str, Any]]]:
-    count = 0
-    for p in sorted(index_dir.glob("*.json")):
+def _loads_json(data: bytes) -> Any:
+    # orjson parses UTF-8 bytes directly; stdlib json needs them decoded first
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def _dumps_meta(meta: Dict[str, Any]) -> str:
+    if orjson is not None:
         try:
-            obj = json.loads(p.read_text(encoding="utf-8"))
-            yield p, obj
-            count += 1
-            if limit and count >= limit:
-                break
-        except Exception:
-            continue
+            return orjson.dumps(meta).decode("utf-8")
+        except TypeError:
+            pass  # e.g. ints beyond 64 bit — stdlib handles them
+    return json.dumps(meta, ensure_ascii=False)
+
+
+# netloc of "scheme://host..." / "//host..." — same as urlparse(url).netloc, without the full parse
+_NETLOC_RE = re.compile(r"^(?:[A-Za-z][A-Za-z0-9+.-]*:)?//([^/?#]*)")
+
+
+def point_id(key: str) -> str:
+    """Qdrant point id for a stable record key (result URL, note file + chunk index).
+
+    Set as payload["id"], so VectorStore.upsert_texts uses it instead of hashing text+payload:
+    re-ingesting the same record overwrites its point even if chunk_id or the text format change.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "vesna:" + key))
+
+
+def _read_index_file(p: Path) -> Optional[Dict[str, Any]]:
+    try:
+        obj = _loads_json(p.read_bytes())
+    except Exception:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def iter_index_json(index_dir: Path, limit: Optional[int] = None, workers: Optional[int] = None) -> Iterable[Tuple[Path, Dict[str, Any]]]:
+    """Yield (path, parsed result) for Index/*.json in name order, skipping unreadable files.
+
+    Reads/parses run ahead in a small thread pool, so the next files are being loaded
+    while the caller flattens and embeds the current one.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = workers or min(8, os.cpu_count() or 1)
+    ahead = workers * 4
+    paths = iter(sorted(index_dir.glob("*.json")))
+    pending: deque = deque()
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        def refill() -> None:
+            # never read more files than the limit can still use
+            while len(pending) < ahead and not (limit and count + len(pending) >= limit):
+                p = next(paths, None)
+                if p is None:
+                    return
+                pending.append((p, ex.submit(_read_index_file, p)))
+
+        refill()
+        while pending:
+            p, fut = pending.popleft()
+            obj = fut.result()
+            if obj is not None:
+                count += 1
+            refill()
+            if obj is not None:
+                yield p, obj
 
 
 def flatten_result_items(obj: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -83,24 +171,18 @@ def flatten_result_items(obj: Dict[str, Any]) -> List[Dict[str, Any]]:
         meta = it.get("metadata") or {}
 
         # derive domain and date if present
-        domain = ""
-        try:
-            from urllib.parse import urlparse
-            netloc = urlparse(url).netloc
-            domain = netloc.lower()
-        except Exception:
-            domain = ""
+        m = _NETLOC_RE.match(url)
+        domain = m.group(1).lower() if m else ""
         date = (meta.get("date") or "")[:10] if isinstance(meta.get("date"), str) else ""
 
-        text_parts = [p for p in [title, snippet, url, json.dumps(meta, ensure_ascii=False)] if p]
+        text_parts = [p for p in [title, snippet, url, _dumps_meta(meta)] if p]
         text = "\n".join(text_parts).strip()
 
         if not text:
             continue
 
         # chunk_id для единичных записей из результатов считаем как хэш текста
-        import hashlib
-        chunk_id = hashlib.md5(text.encode("utf-8")).hexdigest()
+        chunk_id = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
 
         record = {
             "text": text,
@@ -112,19 +194,28 @@ def flatten_result_items(obj: Dict[str, Any]) -> List[Dict[str, Any]]:
                 "domain": domain,
                 "date": date,
                 **meta,
+                "id": point_id("result|" + (url or text)),
             },
         }
         items.append(record)
     return items
 
 
-def iter_sources_markdown(src_dir: Path, limit: Optional[int] = None) -> Iterable[Tuple[Path, str]]:
+def iter_sources_markdown(src_dir: Path, limit: Optional[int] = None) -> Iterable[Tuple[Path, bytes]]:
+    """Yield (path, raw UTF-8 bytes) for non-blank Sources/*.md; decoding is left to _split_frontmatter."""
     count = 0
     for p in sorted(src_dir.glob("*.md")):
         try:
-            text = p.read_text(encoding="utf-8")
-            if text.strip():
-                yield p, text
+            # empty notes are skipped by size, without opening them
+            if p.stat().st_size == 0:
+                continue
+            # newlines are translated only when the note actually has \r
+            # (same result as universal-newline text reading)
+            raw = p.read_bytes()
+            if b"\r" in raw:
+                raw = raw.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            if raw.strip():
+                yield p, raw
                 count += 1
                 if limit and count >= limit:
                     break
@@ -132,21 +223,22 @@ def iter_sources_markdown(src_dir: Path, limit: Optional[int] = None) -> Iterabl
             continue
 
 
-def _split_frontmatter(text: str) -> Tuple[Dict[str, Any], str]:
+def _split_frontmatter(raw: bytes) -> Tuple[Dict[str, Any], str]:
     """Extract YAML frontmatter if present and return (fm_dict, body).
-    If pyyaml is unavailable, return empty dict and original text.
+    Works on the raw bytes: only the body is decoded, libyaml reads the frontmatter bytes itself.
+    If pyyaml is unavailable, return empty dict and the body text.
+    Raises UnicodeDecodeError if the body is not valid UTF-8.
     """
-    if not text.startswith("---\n"):
-        return {}, text
-    end = text.find("\n---\n", 4)
+    if not raw.startswith(b"---\n"):
+        return {}, raw.decode("utf-8")
+    end = raw.find(b"\n---\n", 4)
     if end == -1:
-        return {}, text
-    fm_text = text[4:end]
-    body = text[end + 5:]
+        return {}, raw.decode("utf-8")
+    body = raw[end + 5:].decode("utf-8")
     if yaml is None:
         return {}, body
     try:
-        data = yaml.safe_load(fm_text) or {}
+        data = yaml.load(raw[4:end], Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
         if not isinstance(data, dict):
             data = {}
     except Exception:
@@ -155,22 +247,30 @@ def _split_frontmatter(text: str) -> Tuple[Dict[str, Any], str]:
 
 
 def chunk_text(text: str, max_len: int = 800) -> List[str]:
-    """Naive chunking by paragraphs to keep MiniLM within reasonable size."""
+    """Naive chunking by lines to keep MiniLM within reasonable size.
+
+    Consecutive lines are packed greedily while a chunk stays within max_len (a single
+    longer line becomes its own chunk). Works on newline offsets and slices the original
+    text once per chunk, so lines are not materialized and re-joined one by one.
+    """
     parts: List[str] = []
-    buf: List[str] = []
-    cur = 0
-    for line in text.splitlines():
-        ln = line.strip()
-        if cur + len(ln) + 1 > max_len and buf:
-            parts.append("\n".join(buf))
-            buf = [ln]
-            cur = len(ln)
+    n = len(text)
+    start = 0
+    while start < n:
+        if n - start <= max_len:
+            end = n
         else:
-            buf.append(ln)
-            cur += len(ln) + 1
-    if buf:
-        parts.append("\n".join(buf))
-    return [p for p in parts if p]
+            # last line break that keeps the chunk within max_len (C-level rfind, no per-line loop)
+            end = text.rfind("\n", start, start + max_len + 1)
+            if end == -1:
+                end = text.find("\n", start)
+                if end == -1:
+                    end = n
+        chunk = text[start:end].strip()
+        if chunk:
+            parts.append(chunk)
+        start = end + 1
+    return parts
 
 
 def main():
@@ -203,6 +303,8 @@ def main():
     json_records = 0
     md_files = 0
     md_chunks = 0
+    pending_texts: List[str] = []
+    pending_metas: List[Dict[str, Any]] = []
 
     if not args.only_md:
         t_json0 = time.time()
@@ -214,13 +316,13 @@ def main():
             items = flatten_result_items(obj)
             json_records += len(items)
             if items:
-                texts = [r["text"] for r in items]
-                metas = [r["metadata"] for r in items]
-                t_up0 = time.time()
-                total_upserted += vs.upsert_texts(texts, metas)
-                t_up1 = time.time()
+                pending_texts.extend(r["text"] for r in items)
+                pending_metas.extend(r["metadata"] for r in items)
                 if args.verbose:
-                    print(f"  + {len(items)} from {p.name} (upsert {t_up1 - t_up0:.3f}s)")
+                    print(f"  + {len(items)} from {p.name}")
+                if len(pending_texts) >= UPSERT_BATCH:
+                    total_upserted += _flush_pending(vs, pending_texts, pending_metas, args.verbose)
+        total_upserted += _flush_pending(vs, pending_texts, pending_metas, args.verbose)
         t_json1 = time.time()
         print(f"JSON done: files={json_files}, records={json_records}, time={t_json1 - t_json0:.3f}s")
 
@@ -229,13 +331,15 @@ def main():
         src_dir = base / src_name
         src_dir.mkdir(parents=True, exist_ok=True)
         print(f"Scanning Markdown in: {src_dir}")
-        for p, text in iter_sources_markdown(src_dir, limit=args.limit):
+        for p, raw in iter_sources_markdown(src_dir, limit=args.limit):
+            try:
+                fm, body = _split_frontmatter(raw)
+            except UnicodeDecodeError:
+                continue
             md_files += 1
-            fm, body = _split_frontmatter(text)
             chunks = chunk_text(body)
             if chunks:
                 # Формируем расширенный payload для чанков
-                import hashlib
                 metas = []
                 # prepare keywords/tags/date
                 tags = []
@@ -257,8 +361,11 @@ def main():
                 if keywords:
                     prefix = "Keywords: " + ", ".join(keywords) + "\n\n"
                     chunks = [prefix + c for c in chunks]
+                name_b = p.name.encode("utf-8")
                 for idx, chunk in enumerate(chunks):
-                    chunk_hash = hashlib.md5(f"{p.name}|{idx}|{chunk}".encode("utf-8")).hexdigest()
+                    h = hashlib.blake2b(name_b + b"|%d|" % idx, digest_size=16)
+                    h.update(chunk.encode("utf-8"))
+                    chunk_hash = h.hexdigest()
                     metas.append({
                         "chunk_id": chunk_hash,
                         "source": "obsidian_md",
@@ -270,13 +377,16 @@ def main():
                         "date": date,
                         "tags": tags,
                         "keywords": keywords,
+                        "id": point_id(f"md|{base.name}|{src_name}/{p.name}|{idx}"),
                     })
                 md_chunks += len(chunks)
-                t_up0 = time.time()
-                total_upserted += vs.upsert_texts(chunks, metas)
-                t_up1 = time.time()
+                pending_texts.extend(chunks)
+                pending_metas.extend(metas)
                 if args.verbose:
-                    print(f"  + {len(chunks)} chunks from {p.name} (upsert {t_up1 - t_up0:.3f}s)")
+                    print(f"  + {len(chunks)} chunks from {p.name}")
+                if len(pending_texts) >= UPSERT_BATCH:
+                    total_upserted += _flush_pending(vs, pending_texts, pending_metas, args.verbose)
+        total_upserted += _flush_pending(vs, pending_texts, pending_metas, args.verbose)
         t_md1 = time.time()
         print(f"MD done: files={md_files}, chunks={md_chunks}, time={t_md1 - t_md0:.3f}s")
 
@@ -763,7 +763,7 @@ def step_ingest_vault_all(params: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[s
     Keywords are also injected into chunk text to improve relevance.
     """
     from vector_store import VectorStore
-    from ingest import chunk_text
+    from ingest import chunk_text, point_id
     from config import load_config
     try:
         import yaml  # type: ignore
@@ -840,8 +840,14 @@ def step_ingest_vault_all(params: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[s
             prefix = "Keywords: " + ", ".join(keywords) + "\n\n"
             chunks = [prefix + c for c in chunks]
         import hashlib
+        # тот же chunk_id, что и в ingest.py: blake2b(имя|idx|чанк);
+        # id точки — от пути заметки в vault и номера чанка (как в ingest.py), а не от текста
+        rel = p.relative_to(base).as_posix()
+        name_b = p.name.encode("utf-8")
         for idx, ch in enumerate(chunks):
-            chunk_hash = hashlib.md5(f"{p.name}|{idx}|{ch}".encode("utf-8")).hexdigest()
+            h = hashlib.blake2b(name_b + b"|%d|" % idx, digest_size=16)
+            h.update(ch.encode("utf-8"))
+            chunk_hash = h.hexdigest()
             texts.append(ch)
             metas.append({
                 "chunk_id": chunk_hash,
@@ -854,6 +860,7 @@ def step_ingest_vault_all(params: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[s
                 "date": date,
                 "tags": tags,
                 "keywords": keywords,
+                "id": point_id(f"md|{base.name}|{rel}|{idx}"),
             })
     upserted = 0
     if texts:
@@ -1057,11 +1064,19 @@ def step_obsidian_set_setting(params: Dict[str, Any], ctx: Dict[str, Any]) -> Di
     file = params.get("file") or params.get("settings_file") or "app.json"
     path = params.get("path") or params.get("json_path")
     value = params.get("value")
-    if not path:
+    # optional batch form: updates: {dot.path: value, ...} -> one read + one write
+    updates = params.get("updates")
+    if not path and not isinstance(updates, dict):
         raise ValueError("obsidian_set_setting: 'path' is required (dot-notation)")
     cfg = load_config()
     vault = params.get("vault") or cfg.vault_path
     mgr = ObsidianManager(vault)
+    if isinstance(updates, dict):
+        batch = {str(k): v for k, v in updates.items()}
+        if path:
+            batch[str(path)] = value
+        mgr.set_settings(str(file), batch)
+        return {"obsidian_setting_updated": {"file": file, "paths": list(batch)}}
     mgr.set_setting(str(file), str(path), value)
     return {"obsidian_setting_updated": {"file": file, "path": path}}
 
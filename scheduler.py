@@ -26,11 +26,11 @@ def load_agents(path: str):
     return data
 
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser(description="AI Agents Scheduler")
     ap.add_argument("--agents", default="configs/agents/core.yaml", help="Path to agents YAML (list)")
     ap.add_argument("--timezone", default=None, help="Timezone, e.g., Europe/Moscow; overrides AI_STACK_TZ env")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     agents = load_agents(args.agents)
 
@@ -11,8 +11,17 @@ from vector_store import VectorStore, VectorConfig
 class DummyResp:
     def __init__(self, status_code=200, text="", json_obj=None):
         self.status_code = status_code
-        self.text = text
         self._json = json_obj or {}
+        self.text = text or (json.dumps(self._json) if json_obj is not None else "")
+        self.content = self.text.encode("utf-8")
+        self.headers = {}
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
 
     def json(self):
         return self._json
@@ -79,3 +88,170 @@ def test_vector_store_batch(monkeypatch):
     assert n == 3
     assert calls["upsert"] == 2  # 2 batches: (a,b) and (c)
 
+
+def test_ratelimiter_token_bucket_burst(monkeypatch):
+    from agents.web_research import working_agent as wa
+    sleeps = []
+    monkeypatch.setattr(wa.time, "sleep", lambda s: sleeps.append(s))
+    rl = wa.RateLimiter(min_interval=1.0, capacity=3)
+    for _ in range(3):
+        rl.wait("host")
+    assert sleeps == []  # burst of `capacity` requests runs immediately
+    rl.wait("host")
+    assert len(sleeps) == 1 and 0.9 < sleeps[0] <= 1.0
+    rl.wait("other")  # separate bucket per key
+    assert len(sleeps) == 1
+
+
+@patch("requests.Session.get")
+def test_agent_circuit_breaker_short_circuits(mock_get):
+    mock_get.return_value = DummyResp(503, text="down")
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False)
+    ag.ratelimiter.refill_rate = float("inf")
+    for _ in range(ag._cb["news"].failure_threshold):
+        assert ag.search_news_sites("q") == []
+    calls = mock_get.call_count
+    assert ag.search_news_sites("q") == []  # OPEN: no HTTP request at all
+    assert mock_get.call_count == calls
+    assert ag.search_reddit_simple("q") == []  # other backends are unaffected
+    assert mock_get.call_count == calls + 1
+
+
+def test_jittered_retry_backoff(monkeypatch):
+    from agents.web_research import working_agent as wa
+    retry = wa.JitteredRetry(total=5, backoff_factor=1.0)
+    for _ in range(3):
+        retry = retry.increment(method="GET", url="/")
+    assert isinstance(retry, wa.JitteredRetry)
+    cap = wa.Retry.get_backoff_time(retry)
+    assert cap > 0
+    monkeypatch.setattr(wa.random, "uniform", lambda a, b: (a, b))
+    assert retry.get_backoff_time() == (0, cap)
+
+
+@patch("requests.Session.get")
+def test_agent_result_cache(mock_get):
+    data = {"data": {"children": [{"data": {"title": "A", "permalink": "/r/x/1"}}]}}
+    mock_get.return_value = DummyResp(200, json_obj=data)
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False)
+    first = ag.search_reddit_simple("Some Query")
+    second = ag.search_reddit_simple("  some query ")
+    assert first == second and mock_get.call_count == 1
+
+
+@patch("requests.Session.get")
+def test_agent_ddg_djs(mock_get):
+    payload = json.dumps({"results": [{"t": "Т", "u": "https://ex.com/1", "a": "snip"}]}, ensure_ascii=False)
+    mock_get.side_effect = [
+        DummyResp(200, text='<script>vqd="4-123"</script> vqd=4-123&'),
+        DummyResp(200, text=f"DDG.pageLayout.load({payload});"),
+    ]
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False)
+    out = ag.search_duckduckgo("test")
+    assert out == [{"title": "Т", "url": "https://ex.com/1", "snippet": "snip", "source": "DuckDuckGo", "metadata": {}}]
+
+
+@patch("requests.Session.get")
+@patch("requests.Session.post")
+def test_agent_reddit_token_cached(mock_post, mock_get, monkeypatch):
+    monkeypatch.setenv("REDDIT_CLIENT_ID", "id")
+    monkeypatch.setenv("REDDIT_CLIENT_SECRET", "secret")
+    mock_post.return_value = DummyResp(200, json_obj={"access_token": "tok", "expires_in": 3600})
+    mock_get.return_value = DummyResp(200, json_obj={"data": {"children": []}})
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False)
+    ag.search_reddit_simple("a")
+    ag.search_reddit_simple("b")
+    assert mock_post.call_count == 1
+    assert mock_get.call_args.kwargs["headers"]["Authorization"] == "Bearer tok"
+
+
+@patch("requests.Session.get")
+def test_agent_news_rss(mock_get):
+    items = "".join(
+        f"<item><title>T{i}</title><link>https://ex.com/{i}</link><description>d{i}</description>"
+        f"<pubDate>Mon, 0{i} Jan 2024</pubDate></item>"
+        for i in range(1, 4)
+    )
+    mock_get.return_value = DummyResp(200, text=f"<?xml version='1.0'?><rss><channel>{items}</channel></rss>")
+    ag = WorkingWebAgent(timeout=1.0, max_results=2, retries=0, backoff=0.0, verbose=False)
+    out = ag.search_news_sites("q")
+    assert [r["url"] for r in out] == ["https://ex.com/1", "https://ex.com/2"]
+    assert out[0]["snippet"] == "d1" and out[0]["metadata"] == {"date": "Mon, 01 Jan 2024"}
+
+
+@patch("requests.Session.get")
+def test_agent_ddg_reuses_vqd(mock_get):
+    djs = "DDG.pageLayout.load(" + json.dumps({"results": [{"t": "T", "u": "https://ex.com/1"}]}) + ");"
+    mock_get.side_effect = [
+        DummyResp(200, text="vqd=4-123&"),  # home
+        DummyResp(200, text=djs),
+        DummyResp(200, text=djs),  # second query: straight to d.js with the cached vqd
+        DummyResp(403, text=""),  # third query: cached vqd rejected ...
+        DummyResp(200, text="vqd=4-456&"),  # ... so refresh it
+        DummyResp(200, text=djs),
+    ]
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False)
+    ag.ratelimiter.refill_rate = float("inf")
+    for q in ("a", "b", "c"):
+        assert ag.search_duckduckgo(q)[0]["url"] == "https://ex.com/1"
+    urls = [c.args[0] for c in mock_get.call_args_list]
+    assert urls.count("https://duckduckgo.com/") == 2 and len(urls) == 6
+    assert mock_get.call_args.kwargs["params"]["vqd"] == "4-456"
+
+
+@patch("requests.Session.get")
+def test_agent_bulkhead_full(mock_get):
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False)
+    ag.BULKHEAD_WAIT = 0.01
+    sem = ag._bulkheads["news"]
+    for _ in range(ag.BULKHEAD_SIZE):
+        sem.acquire()
+    assert ag.search_news_sites("q") == []
+    assert mock_get.call_count == 0
+
+
+def test_agent_execute_dedups_by_url(monkeypatch):
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False)
+    r = lambda u, src: {"title": u, "url": u, "snippet": "", "source": src, "metadata": {}}
+    monkeypatch.setattr(ag, "search_duckduckgo", lambda q, **kw: [r("https://a", "DDG"), {"error": "x"}])
+    monkeypatch.setattr(ag, "search_reddit_simple", lambda q, **kw: [r("https://b", "Reddit"), r("https://a", "Reddit")])
+    monkeypatch.setattr(ag, "search_news_sites", lambda q, **kw: [r("", "News"), r("https://c", "News"), r("https://d", "News")])
+    out = ag.execute("q")
+    assert [(x["url"], x["source"]) for x in out["results"]] == [("https://a", "DDG"), ("https://b", "Reddit"), ("https://c", "News")]
+    assert out["count"] == 3
+
+
+@patch("requests.Session.get")
+def test_agent_rejects_oversized_response(mock_get):
+    mock_get.return_value = DummyResp(200, text="<rss>" + "x" * 4096 + "</rss>")
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False)
+    ag.MAX_RESPONSE_BYTES = 1024
+    assert ag.search_news_sites("q") == []
+    assert mock_get.call_args.kwargs["stream"] is True
+
+
+def test_agent_execute_deadline(monkeypatch):
+    import threading
+    release = threading.Event()
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False, deadline=0.2)
+    hit = {"title": "A", "url": "https://a", "snippet": "", "source": "DDG", "metadata": {}}
+    monkeypatch.setattr(ag, "search_duckduckgo", lambda q, **kw: [hit])
+    monkeypatch.setattr(ag, "search_reddit_simple", lambda q, **kw: release.wait(5) and [])
+    monkeypatch.setattr(ag, "search_news_sites", lambda q, **kw: [])
+    try:
+        out = ag.execute("q")
+    finally:
+        release.set()
+    assert out["results"] == [hit]
+
+
+def test_agent_execute_only_requested_sources(monkeypatch):
+    ag = WorkingWebAgent(timeout=1.0, max_results=1, retries=0, backoff=0.0, verbose=False)
+    called = []
+    hit = lambda src: [{"title": src, "url": f"https://{src}", "snippet": "", "source": src, "metadata": {}}]
+    monkeypatch.setattr(ag, "search_duckduckgo", lambda q, **kw: called.append("ddg") or hit("ddg"))
+    monkeypatch.setattr(ag, "search_reddit_simple", lambda q, **kw: called.append("reddit") or hit("reddit"))
+    monkeypatch.setattr(ag, "search_news_sites", lambda q, **kw: called.append("news") or hit("news"))
+    out = ag.execute("q", sources=("news",))
+    assert called == ["news"] and [r["source"] for r in out["results"]] == ["news"]
+    assert ag.execute("q", sources=())["count"] == 0
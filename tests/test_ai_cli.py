@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+import ai
+
+
+@pytest.fixture(autouse=True)
+def _yaml_cache_dir(tmp_path, monkeypatch):
+    # JSON caches of parsed agent YAMLs go to a per-test dir, not ~/.cache
+    monkeypatch.setenv("AI_STACK_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def test_sniff_subcommand():
+    assert ai._sniff_subcommand(["-v", "search", "web", "q"]) == "search"
+    assert ai._sniff_subcommand(["docker", "up"]) == "docker"
+    assert ai._sniff_subcommand(["--help"]) is None
+    assert ai._sniff_subcommand(["bogus", "health"]) is None
+
+
+def test_partial_parser_matches_full():
+    argv = ["search", "web", "hello", "world", "--save", "--filter-source", "Reddit"]
+    full = ai.build_parser().parse_args(argv)
+    part = ai.build_parser(ai._sniff_subcommand(argv)).parse_args(argv)
+    assert vars(full) == vars(part)
+
+
+def test_fast_path():
+    assert ai._fast_path(["health"])[-1] == "--health"
+    assert ai._fast_path(["docker", "down"])[:2] == ["docker", "compose"]
+    assert ai._fast_path(["docker", "down"])[-1] == "down"
+    assert ai._fast_path(["-v", "health"]) is None
+    assert ai._fast_path(["docker", "up", "--help"]) is None
+
+
+def test_load_yaml_list_cache(tmp_path, monkeypatch):
+    f = tmp_path / "agents.yaml"
+    f.write_text("id: a\nenabled: true\n", encoding="utf-8")
+    first = ai._load_yaml_list(str(f))
+    first[0]["enabled"] = False  # callers may mutate; the cache must not see it
+    assert ai._load_yaml_list(str(f)) == [{"id": "a", "enabled": True}]
+
+    ai._write_yaml_list(str(f), [{"id": "a", "enabled": False}, {"id": "b"}])
+    assert [x["id"] for x in ai._load_yaml_list(str(f))] == ["a", "b"]
+
+
+def test_load_yaml_list_json_sidecar(tmp_path, monkeypatch):
+    f = tmp_path / "agents.yaml"
+    f.write_text("- id: a\n- id: b\n", encoding="utf-8")
+    ai._YAML_CACHE.clear()
+    assert [x["id"] for x in ai._load_yaml_list(str(f))] == ["a", "b"]
+    assert os.path.exists(ai._yaml_sidecar_path(str(f)))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["agents.yaml", "cache"]
+
+    # warm run in a fresh process: no in-memory cache, YAML parser must not be touched
+    ai._YAML_CACHE.clear()
+    monkeypatch.setattr(ai, "_import_yaml", lambda: (_ for _ in ()).throw(AssertionError("yaml used")))
+    assert [x["id"] for x in ai._load_yaml_list(str(f))] == ["a", "b"]
+
+
+def test_agents_validate_reports_unknown_steps(tmp_path, monkeypatch, capsys):
+    from orchestrator import registry
+    monkeypatch.setattr(registry, "Registry", {"search_web": object()})
+    f = tmp_path / "a.yaml"
+    f.write_text("- id: x\n  pipeline:\n    - step: search_web\n    - step: nope\n    - step: nope\n", encoding="utf-8")
+    monkeypatch.setattr("sys.argv", ["ai.py", "agents", "validate", "--file", str(f)])
+    assert ai.main() == 2
+    assert capsys.readouterr().out.splitlines() == ["x: Unknown step: nope"]
+
+
+def test_agents_list_star_glob_after_cached_load(tmp_path, monkeypatch, capsys):
+    agents = tmp_path / "agents"
+    agents.mkdir()
+    (agents / "core.yaml").write_text("- id: a\n", encoding="utf-8")
+    monkeypatch.setattr("sys.argv", ["ai.py", "agents", "list", "--glob", str(agents / "*")])
+    for _ in range(3):
+        ai._YAML_CACHE.clear()
+        assert ai.main() == 0
+        assert capsys.readouterr().out.splitlines() == ["a | enabled=true"]
+    assert [p.name for p in agents.iterdir()] == ["core.yaml"]
+
+
+def test_agents_list_glob(tmp_path, monkeypatch, capsys):
+    (tmp_path / "b.yaml").write_text("id: b\nenabled: false\n", encoding="utf-8")
+    (tmp_path / "a.yaml").write_text("- id: a\n  description: first\n", encoding="utf-8")
+    monkeypatch.setattr("sys.argv", ["ai.py", "agents", "list", "--glob", str(tmp_path / "*.yaml")])
+    assert ai.main() == 0
+    assert capsys.readouterr().out.splitlines() == ["a | enabled=true | first", "b | enabled=false"]
+
+
+def test_build_parser_memoized():
+    assert ai.build_parser() is ai.build_parser()
+    assert ai.build_parser("docker") is ai.build_parser("docker")
+    assert ai.build_parser("docker") is not ai.build_parser()
+
+
+def test_agents_new_template_matches_yaml_dump(tmp_path, monkeypatch):
+    import yaml
+    for aid in ("research.daily", "my_agent-2", "yes", "a: b"):
+        f = tmp_path / "new.yaml"
+        monkeypatch.setattr("sys.argv", ["ai.py", "agents", "new", "--id", aid, "--file", str(f)])
+        assert ai.main() == 0
+        expected = yaml.safe_dump({"id": aid, **ai._AGENT_SKELETON_TEMPLATE}, allow_unicode=True, sort_keys=False)
+        assert f.read_text(encoding="utf-8") == expected
@@ -0,0 +1,109 @@
+from cli import assistant
+
+
+def test_plan_cached_returns_independent_copies():
+    assistant._plan_cached.cache_clear()
+    first = assistant.plan("поиск: LLM для продакшн")
+    first[0]["params"]["query"] = "mutated"
+    second = assistant.plan("поиск: LLM для продакшн")
+    assert second[0] == {"name": "search_web", "params": {"query": "llm для продакшн"}}
+    assert assistant._plan_cached.cache_info().hits == 1
+
+
+def test_plan_daily_uses_current_date(monkeypatch):
+    class FakeTime:
+        day = "2024-01-01"
+
+        @classmethod
+        def strftime(cls, fmt):
+            return cls.day
+
+    monkeypatch.setattr(assistant, "time", FakeTime)
+    assert assistant.plan("ежедневка: итоги")[0]["params"]["title"] == "Daily 2024-01-01"
+    FakeTime.day = "2024-01-02"
+    assert assistant.plan("ежедневка: итоги")[0]["params"]["title"] == "Daily 2024-01-02"
+
+
+def test_first_keyword_priority_and_offset():
+    kw, idx = assistant._first_keyword("ежедневка, создай заметку: x", assistant._DAILY_KW)
+    assert (kw, idx) == ("создай заметку", 11)
+    assert assistant._first_keyword("ничего", assistant._DAILY_KW) == (None, -1)
+    steps = assistant.plan("Создай заметку: купить хлеб")
+    assert steps[0]["params"]["content"].endswith("\n\nкупить хлеб\n")
+
+
+def test_dumps_log_caps_and_stringifies(monkeypatch):
+    from pathlib import Path
+    assert assistant._dumps_log({"p": Path("a")}).replace(" ", "") == '{"p":"a"}'
+    big = assistant._dumps_log({"x": "я" * 10000})
+    assert len(big) == assistant._LOG_JSON_LIMIT + 1 and big.endswith("…")
+    monkeypatch.setattr(assistant, "orjson", None)
+    assert assistant._dumps_log({"т": 1}) == '{"т": 1}'
+
+
+def test_run_reuses_identical_steps(monkeypatch, capsys):
+    calls = []
+
+    def step(params, ctx):
+        calls.append(params)
+        return {"n": len(calls)}
+
+    monkeypatch.setitem(assistant.Registry, "s", step)
+    monkeypatch.setenv("AI_STACK_SUGGEST", "0")
+    ctx = assistant.run([
+        {"name": "s", "params": {"q": "a", "tags": ["x"]}},
+        {"name": "s", "params": {"tags": ["x"], "q": "a"}},
+        {"name": "s", "params": {"q": "b"}},
+    ])
+    assert len(calls) == 2 and ctx == {"n": 2}
+    assert "♻️ s reused" in capsys.readouterr().out
+
+
+def test_segment_tags_and_obsidian_plan():
+    assert assistant._segment_tags("установи тему minimal") >= {"install", "theme", "theme_set", "setting_set"}
+    steps = assistant.plan("obsidian: список заметок; выключи базовый плагин graph, установи тему Minimal")
+    assert [s["name"] for s in steps] == ["obsidian_list_notes", "obsidian_disable_core_plugin", "obsidian_set_theme"]
+    assert steps[1]["params"] == {"id": "graph"} and steps[2]["params"] == {"theme": "Minimal"}
+
+
+def test_split_segments_pairs_reuse_lowered_text():
+    s = "Список Заметок;  прочитай A.md и  включи плагин X , http://a.com и b"
+    assert assistant._split_segments(s, s.lower()) == assistant._split_segments(s) == [
+        ("Список Заметок", "список заметок"),
+        ("прочитай A.md", "прочитай a.md"),
+        ("включи плагин X", "включи плагин x"),
+        ("http://a.com и b", "http://a.com и b"),
+    ]
+
+
+def test_segment_handlers_gated_by_tags(monkeypatch):
+    seen = []
+    handlers = tuple((gate, (lambda fn: lambda *a: seen.append(fn.__name__) or fn(*a))(fn))
+                     for gate, fn in assistant._SEGMENT_HANDLERS)
+    monkeypatch.setattr(assistant, "_SEGMENT_HANDLERS", handlers)
+    assistant._plan_cached.cache_clear()
+    assert assistant.plan("obsidian: выключи foo")[0]["name"] == "obsidian_disable_plugin"
+    assert seen == ["_seg_backup", "_seg_toggle"]
+
+
+def test_parse_value_numbers_without_regex():
+    pv = assistant._parse_value
+    assert [pv(x) for x in ("42", "+7", "-3", "1.5", "-0.25", "да", "off")] == [42, 7, -3, 1.5, -0.25, True, False]
+    assert [pv(x) for x in ("1.", ".5", "²", "1e3", "[1]", "abc")] == ["1.", ".5", "²", 1000.0, [1], "abc"]
+
+
+def test_run_reports_missing_steps_upfront(monkeypatch, capsys):
+    monkeypatch.setitem(assistant.Registry, "s", lambda params, ctx: {"ok": params["q"]})
+    monkeypatch.setenv("AI_STACK_SUGGEST", "0")
+    ctx = assistant.run([{"name": "s", "params": {"q": 1}}, {"name": "nope"}, {"name": "s", "params": {"q": 2}}])
+    out = capsys.readouterr().out
+    assert ctx == {"ok": 2}
+    assert out.index("'nope' не найден") < out.index("✅ s")
+
+
+def test_confirm_writes_plan_once(monkeypatch):
+    writes = []
+    monkeypatch.setattr(assistant.sys, "stdout", type("W", (), {"write": lambda self, s: writes.append(s), "flush": lambda self: None})())
+    monkeypatch.setenv("AI_STACK_AUTO_EXECUTE", "1")
+    assert assistant.confirm([{"name": "a", "params": {"q": "т"}}, {"name": "b"}])
+    assert writes[0] == f'Предлагаемый план:\n 1. a {assistant._dumps_log({"q": "т"})}\n 2. b {{}}\n'
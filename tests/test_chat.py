@@ -0,0 +1,175 @@
+import pytest
+
+import chat
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.ttl = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value.encode("utf-8")
+        self.ttl[key] = ttl
+
+
+class FakeAgent:
+    def __init__(self):
+        self.calls = 0
+
+    def execute(self, query, **kw):
+        self.calls += 1
+        return {"agent": "A", "results": [{"title": query, "url": "https://a"}], "count": 1}
+
+
+def _cache_with(monkeypatch, client):
+    class FakeModule:
+        class Redis:
+            @staticmethod
+            def from_url(url, **kw):
+                return client
+    monkeypatch.setattr(chat, "redis", FakeModule)
+    return chat.ResultCache("redis://localhost:6379/0")
+
+
+def test_result_cache_hit_skips_execute(monkeypatch, capsys):
+    client = FakeRedis()
+    cache = _cache_with(monkeypatch, client)
+    agent = FakeAgent()
+    first = chat.execute_cached(agent, cache, "news", "Query ", None, 5)
+    second = chat.execute_cached(agent, cache, "news", " query", None, 5)
+    assert first == second and agent.calls == 1
+    assert list(client.ttl.values()) == [60]
+    out = capsys.readouterr().out
+    assert "cache: MISS" in out and "cache: HIT" in out
+    chat.execute_cached(agent, cache, "news", "query", "Reddit", 5)  # другой фильтр — другой ключ
+    assert agent.calls == 2
+
+
+def test_result_cache_disabled_falls_back(monkeypatch, capsys):
+    class Down(FakeRedis):
+        def get(self, key):
+            raise ConnectionError("refused")
+    cache = _cache_with(monkeypatch, Down())
+    agent = FakeAgent()
+    assert chat.execute_cached(agent, cache, "web", "q")["count"] == 1
+    assert not cache.enabled
+    chat.execute_cached(agent, chat.ResultCache(""), "web", "q")
+    assert agent.calls == 2
+    assert "cache:" not in capsys.readouterr().out
+
+
+def test_save_json_roundtrip_and_stream_note(tmp_path):
+    obj = {"agent": "A", "timestamp": "t", "results": [
+        {"title": "Т", "url": "https://a", "snippet": "s", "source": "Reddit", "metadata": {"score": 1}},
+        {"error": "boom"},
+    ]}
+    chat.save_json(tmp_path, "Index", "r", obj)
+    path = tmp_path / "Index" / "r.json"
+    assert chat.load_json_file(path) == obj
+    assert "Т" in path.read_text(encoding="utf-8")  # без \u-экранирования
+    chat.save_note_stream(tmp_path, "Summaries", "s", chat.iter_results_markdown(obj, "T"))
+    text = (tmp_path / "Summaries" / "s.md").read_text(encoding="utf-8")
+    assert text == chat.make_results_markdown(obj, "T") + "\n"
+    assert "2. ❌ boom" in text
+
+
+def test_save_note_mkdir_once(tmp_path, monkeypatch):
+    calls = []
+    real_mkdir = chat.Path.mkdir
+    monkeypatch.setattr(chat.Path, "mkdir", lambda self, *a, **kw: calls.append(self) or real_mkdir(self, *a, **kw))
+    for i in range(3):
+        chat.save_note(tmp_path, "Summaries", f"n{i}", "x")
+    chat.save_json(tmp_path, "Summaries", "j", {})
+    assert calls == [tmp_path / "Summaries"]
+    assert sorted(p.name for p in (tmp_path / "Summaries").iterdir()) == ["j.json", "n0.md", "n1.md", "n2.md"]
+
+
+def test_iter_topk_markdown_dict_and_point():
+    class Point:
+        payload = {"file": "a.md", "source": "obsidian_md"}
+        score = 0.123456
+    points = [{"payload": {"title": "T", "url": "https://a", "source": "test"}, "score": 0.5}, Point()]
+    assert list(chat.iter_topk_markdown(points, "Мой заголовок")) == [
+        "# Мой заголовок",
+        "",
+        "1. [test] T — score: 0.5",
+        "   - URL: https://a",
+        "2. [obsidian_md] a.md — score: 0.1235",
+    ]
+
+
+def test_backends_for_filter_source():
+    assert chat._backends_for(None) is None
+    assert chat._backends_for("Reddit") == ("reddit",)
+    assert chat._backends_for("Google News") == ("news",)
+    assert chat._backends_for("obsidian_md") == ()  # не веб-источник: сеть не нужна вовсе
+
+
+def test_filter_by_domain_suffixes():
+    items = [{"url": u} for u in (
+        "https://news.Example.com/a", "http://example.org?q=1", "https://evil.com/example.com", "", None, "example.com/x",
+    )]
+    got = [r["url"] for r in chat.filter_by_domain(items, "example.com, example.org")]
+    assert got == ["https://news.Example.com/a", "http://example.org?q=1"]
+
+
+def test_copy_json_and_mmap_load(tmp_path):
+    src = tmp_path / "r.json"
+    src.write_text('{"results": [{"title": "Т"}]}', encoding="utf-8")
+    chat.copy_json(tmp_path, "Index", "copy", src)
+    assert (tmp_path / "Index" / "copy.json").read_bytes() == src.read_bytes()
+    assert chat.load_json_file(src) == {"results": [{"title": "Т"}]}
+    empty = tmp_path / "empty.json"
+    empty.write_bytes(b"")
+    with pytest.raises(ValueError):
+        chat.load_json_file(empty)
+
+
+def test_apply_filters():
+    obj = {"results": [
+        {"source": "Reddit", "url": "https://a.com/x", "metadata": {"date": "2024-02-01"}},
+        {"source": "Reddit", "url": "https://b.com/x", "metadata": {"date": "2024-03-01"}},
+        {"source": "DuckDuckGo", "url": "https://a.com/y"},
+    ], "count": 3}
+    assert chat.apply_filters(obj) is obj and obj["count"] == 3
+    out = chat.apply_filters(dict(obj), "Reddit", None, "2024-02-15")
+    assert [r["url"] for r in out["results"]] == ["https://b.com/x"] and out["count"] == 1
+    out = chat.apply_filters(dict(obj), None, "a.com", None)
+    assert out["count"] == 2
+
+
+def test_search_topk_cached_skips_vector_store(monkeypatch):
+    client = FakeRedis()
+    cache = _cache_with(monkeypatch, client)
+    created = []
+
+    class FakeVS:
+        def __init__(self):
+            created.append(self)
+
+        def search(self, query, limit=10, source=None, domain=None, date_from=None):
+            class P:
+                payload = {"title": "T", "url": "https://a"}
+                score = 0.9
+            return [P()]
+
+    monkeypatch.setattr("vector_store.VectorStore", FakeVS)
+    first = chat.search_topk_cached(cache, "Query", 5, "test")
+    second = chat.search_topk_cached(cache, " query ", 5, "test")
+    assert len(created) == 1 and list(client.ttl.values()) == [300]
+    assert second == [{"score": 0.9, "payload": {"title": "T", "url": "https://a"}}]
+    assert list(chat.iter_topk_markdown(first, "h")) == list(chat.iter_topk_markdown(second, "h"))
+
+
+def test_print_results_single_write(monkeypatch):
+    writes = []
+    monkeypatch.setattr(chat.sys, "stdout", type("W", (), {"write": lambda self, s: writes.append(s), "flush": lambda self: None})())
+    chat.print_results({"agent": "A", "count": 1, "timestamp": "t", "results": [
+        {"title": "T", "url": "https://a", "source": "Reddit", "metadata": {"subreddit": "x"}},
+    ]})
+    assert len(writes) == 1
+    assert "\n1. [Reddit] 📝 T\n   📍 r/x | 👤 u/unknown\n" in writes[0] and writes[0].endswith("🔗 https://a\n")
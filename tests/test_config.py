@@ -32,3 +32,34 @@ def test_env_config_path_can_be_missing(tmp_path, monkeypatch):
     assert cfg.vault_path
     assert cfg.folders.sources
 
+
+
+def test_config_file_parsed_once_until_changed(tmp_path, monkeypatch):
+    import config
+
+    p = tmp_path / "cfg.yaml"
+    p.write_text("vault_path: /tmp/v1\nfolders:\n  sources: Src\n", encoding="utf-8")
+    config._read_yaml_config.cache_clear()
+
+    first = config.load_config(str(p))
+    second = config.load_config(str(p))
+    assert (first.vault_path, first.folders.sources) == ("/tmp/v1", "Src")
+    assert first == second and first is not second
+    assert config._read_yaml_config.cache_info().misses == 1
+
+    p.write_text("vault_path: /tmp/v2\n", encoding="utf-8")
+    os.utime(p, ns=(0, 10**9))
+    assert config.load_config(str(p)).vault_path == "/tmp/v2"
+
+
+def test_missing_or_broken_config_falls_back(tmp_path, monkeypatch):
+    import config
+
+    monkeypatch.setenv("AI_STACK_DEFAULT_VAULT", "/tmp/default_vault")
+    config._read_yaml_config.cache_clear()
+    assert config.load_config(str(tmp_path / "missing.yaml")).vault_path == "/tmp/default_vault"
+    assert config._read_yaml_config.cache_info().currsize == 0  # файл не открывался
+
+    bad = tmp_path / "bad.yaml"
+    bad.write_bytes(b"vault_path: [unclosed\n")
+    assert config.load_config(str(bad)).folders.sources == "Sources"
@@ -29,3 +29,136 @@ def test_chunk_text_paragraphs():
     assert len(chunks) >= 2
 
 
+
+
+def test_main_batches_upserts_across_files(tmp_path, monkeypatch):
+    import ingest
+
+    (tmp_path / "Index").mkdir()
+    (tmp_path / "Sources").mkdir()
+    for i in range(3):
+        (tmp_path / "Index" / f"r{i}.json").write_text(
+            json.dumps({"results": [{"title": f"T{i}", "url": f"https://ex.com/{i}"}]}), encoding="utf-8")
+        (tmp_path / "Sources" / f"n{i}.md").write_text(f"note {i}\n", encoding="utf-8")
+
+    calls: List[int] = []
+
+    class FakeVS:
+        def __init__(self, cfg):
+            pass
+
+        def upsert_texts(self, texts, metas):
+            assert len(texts) == len(metas)
+            calls.append(len(texts))
+            return len(texts)
+
+    monkeypatch.setattr(ingest, "VectorStore", FakeVS)
+    monkeypatch.setattr(ingest, "UPSERT_BATCH", 2)
+    monkeypatch.setattr("sys.argv", ["ingest.py", "--vault", str(tmp_path), "--index", "Index", "--sources", "Sources"])
+    ingest.main()
+    # 3 JSON records: one full batch + the end-of-phase flush; same for Markdown
+    assert calls == [2, 1, 2, 1]
+
+
+def test_chunk_text_packs_lines_and_keeps_indent():
+    text = "# Title\n\n- item\n  - nested\n" + "\n".join("line %02d" % i for i in range(30)) + "\n"
+    chunks = chunk_text(text, max_len=100)
+    assert all(len(c) <= 100 for c in chunks)
+    assert chunks[0].startswith("# Title\n\n- item\n  - nested")
+    assert "\n".join(chunks).split() == text.split()
+    assert chunk_text("   \n\n  ") == []
+    assert chunk_text("x" * 50, max_len=10) == ["x" * 50]
+
+
+def test_chunk_id_is_blake2b_of_text():
+    import hashlib
+
+    text = "A\nhttps://ex.com/a\n{}"  # title, url, metadata
+    items = flatten_result_items({"results": [{"title": "A", "url": "https://ex.com/a"}]})
+    assert items[0]["metadata"]["chunk_id"] == hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def test_iter_index_json_with_and_without_orjson(tmp_path, monkeypatch):
+    import ingest
+
+    (tmp_path / "a.json").write_text(json.dumps({"results": [{"title": "Т"}]}, ensure_ascii=False), encoding="utf-8")
+    (tmp_path / "b.json").write_text("{broken", encoding="utf-8")
+    fast = [obj for _, obj in ingest.iter_index_json(tmp_path)]
+    assert ingest._dumps_meta({"n": 2 ** 70}) == '{"n": 1180591620717411303424}'
+    monkeypatch.setattr(ingest, "orjson", None)
+    assert [obj for _, obj in ingest.iter_index_json(tmp_path)] == fast == [{"results": [{"title": "Т"}]}]
+
+
+def test_iter_index_json_parallel_keeps_order_and_limit(tmp_path, monkeypatch):
+    import ingest
+
+    for i in range(30):
+        body = "{broken" if i % 7 == 0 else json.dumps({"results": [], "i": i})
+        (tmp_path / f"r{i:02d}.json").write_text(body, encoding="utf-8")
+    read: List[str] = []
+    real = ingest._read_index_file
+    monkeypatch.setattr(ingest, "_read_index_file", lambda p: read.append(p.name) or real(p))
+
+    got = [obj["i"] for _, obj in ingest.iter_index_json(tmp_path, workers=3)]
+    assert got == [i for i in range(30) if i % 7]
+
+    read.clear()
+    got = [obj["i"] for _, obj in ingest.iter_index_json(tmp_path, limit=5, workers=3)]
+    assert got == [1, 2, 3, 4, 5]
+    assert len(read) == 6  # r00 is broken; nothing beyond the limit is read
+
+
+def test_flatten_domain_matches_netloc():
+    obj = {"results": [{"title": "t", "url": u} for u in ("HTTPS://News.Ex.com:443/a?b", "//cdn.ex.org/x", "ex.com/no-scheme")]}
+    assert [r["metadata"]["domain"] for r in flatten_result_items(obj)] == ["news.ex.com:443", "cdn.ex.org", ""]
+
+
+def test_iter_sources_markdown_skips_empty_notes(tmp_path):
+    import ingest
+
+    (tmp_path / "a.md").write_text("# A\n", encoding="utf-8")
+    (tmp_path / "b.md").write_bytes(b"")
+    (tmp_path / "c.md").write_bytes(b" \n\t\n")
+    (tmp_path / "e.md").write_bytes(b"---\r\ntags: [x]\r\n---\r\nx\r")
+    assert [(p.name, t) for p, t in ingest.iter_sources_markdown(tmp_path)] == [
+        ("a.md", b"# A\n"), ("e.md", b"---\ntags: [x]\n---\nx\n"),
+    ]
+    assert [p.name for p, _ in ingest.iter_sources_markdown(tmp_path, limit=1)] == ["a.md"]
+
+
+def test_split_frontmatter_bytes():
+    import ingest
+
+    fm, body = ingest._split_frontmatter("---\ntags: [x]\ntitle: Т\n---\nТело\n".encode("utf-8"))
+    assert fm == {"tags": ["x"], "title": "Т"} and body == "Тело\n"
+    assert ingest._split_frontmatter(b"---\nno end\n") == ({}, "---\nno end\n")
+    assert ingest._split_frontmatter(b"plain") == ({}, "plain")
+    with pytest.raises(UnicodeDecodeError):
+        ingest._split_frontmatter(b"---\na: 1\n---\n\xff")
+
+
+def test_point_ids_are_stable_record_keys(tmp_path, monkeypatch):
+    import ingest
+
+    obj = {"results": [{"title": "A", "url": "https://ex.com/a", "snippet": "v1"}]}
+    first = flatten_result_items(obj)[0]["metadata"]
+    obj["results"][0]["snippet"] = "v2"
+    second = flatten_result_items(obj)[0]["metadata"]
+    assert first["chunk_id"] != second["chunk_id"] and first["id"] == second["id"]
+
+    (tmp_path / "Sources").mkdir()
+    (tmp_path / "Sources" / "n.md").write_text("note\n", encoding="utf-8")
+    metas: List[Dict[str, Any]] = []
+
+    class FakeVS:
+        def __init__(self, cfg):
+            pass
+
+        def upsert_texts(self, texts, m):
+            metas.extend(m)
+            return len(texts)
+
+    monkeypatch.setattr(ingest, "VectorStore", FakeVS)
+    monkeypatch.setattr("sys.argv", ["ingest.py", "--vault", str(tmp_path), "--only-md", "--sources", "Sources"])
+    ingest.main()
+    assert metas[0]["id"] == ingest.point_id(f"md|{tmp_path.name}|Sources/n.md|0")
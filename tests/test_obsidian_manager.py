@@ -0,0 +1,171 @@
+import json
+
+from agents.obsidian.manager import ObsidianManager
+
+
+def test_settings_json_roundtrip_keeps_unicode(tmp_path):
+    mgr = ObsidianManager(str(tmp_path))
+    mgr.enable_plugin("dataview")
+    mgr.set_setting("app.json", "editor.title", "Заметки")
+    app = json.loads((tmp_path / ".obsidian" / "app.json").read_text(encoding="utf-8"))
+    assert app == {"editor": {"title": "Заметки"}}
+    assert "Заметки" in (tmp_path / ".obsidian" / "app.json").read_text(encoding="utf-8")
+    assert mgr.list_plugins()["community"] == ["dataview"]
+
+
+def test_read_json_cache_sees_external_changes(tmp_path):
+    mgr = ObsidianManager(str(tmp_path))
+    mgr.enable_plugin("a")
+    first = mgr._read_json(mgr.paths.dot / "community-plugins.json", default=[])
+    first.append("mutated")  # callers get a private copy
+    assert mgr._read_json(mgr.paths.dot / "community-plugins.json", default=[]) == ["a"]
+    (mgr.paths.dot / "community-plugins.json").write_text('["a", "b", "c"]', encoding="utf-8")
+    assert mgr.list_plugins()["community"] == ["a", "b", "c"]
+
+
+def test_set_settings_batches_updates(tmp_path, monkeypatch):
+    mgr = ObsidianManager(str(tmp_path))
+    writes = []
+    orig = mgr._write_json
+    monkeypatch.setattr(mgr, "_write_json", lambda p, obj, **kw: (writes.append(p), orig(p, obj, **kw)))
+    mgr.set_settings("app.json", {"promptDelete": False, "editor.spellcheck": True, "editor.fontSize": 14})
+    assert len(writes) == 1
+    app = mgr._read_json(mgr.paths.dot / "app.json", default={})
+    assert app == {"promptDelete": False, "editor": {"spellcheck": True, "fontSize": 14}}
+
+
+def test_durable_write_fsyncs_file_and_dir(tmp_path, monkeypatch):
+    import os
+    mgr = ObsidianManager(str(tmp_path))
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+    mgr._write_json(mgr.paths.dot / "app.json", {"a": 1})
+    assert synced == []
+    mgr._write_json(mgr.paths.dot / "app.json", {"a": 2}, durable=True)
+    assert len(synced) == (2 if os.name != "nt" else 0)
+    assert mgr._read_json(mgr.paths.dot / "app.json", default={}) == {"a": 2}
+
+
+def test_backup_settings_mirrors_plugins_incrementally(tmp_path):
+    mgr = ObsidianManager(str(tmp_path / "vault"))
+    plug = mgr.paths.plugins / "dataview"
+    plug.mkdir(parents=True)
+    (plug / "main.js").write_text("v1", encoding="utf-8")
+    (plug / "old.js").write_text("x", encoding="utf-8")
+    out = mgr.backup_settings(str(tmp_path / "bk"))
+    assert (out / "plugins" / "dataview" / "main.js").read_text(encoding="utf-8") == "v1"
+
+    (plug / "old.js").unlink()
+    (plug / "main.js").write_text("version2", encoding="utf-8")
+    mgr.backup_settings(str(tmp_path / "bk"))
+    assert (out / "plugins" / "dataview" / "main.js").read_text(encoding="utf-8") == "version2"
+    assert not (out / "plugins" / "dataview" / "old.js").exists()
+
+
+def test_install_plugin_from_zip_extracts_all_members(tmp_path):
+    import zipfile
+    zp = tmp_path / "plugin.zip"
+    with zipfile.ZipFile(zp, "w") as zf:
+        zf.writestr("my-plugin/manifest.json", json.dumps({"id": "my-plugin"}))
+        zf.writestr("my-plugin/main.js", "console.log(1)")
+        for i in range(20):
+            zf.writestr(f"my-plugin/locales/{i}.json", "{}")
+        zf.writestr("my-plugin/empty.css", "")
+    mgr = ObsidianManager(str(tmp_path / "vault"))
+    mgr.install_plugin_from_zip(str(zp))
+    out = mgr.paths.plugins / "my-plugin"
+    assert (out / "my-plugin" / "main.js").read_text(encoding="utf-8") == "console.log(1)"
+    assert len(list((out / "my-plugin" / "locales").iterdir())) == 20
+    assert (out / "my-plugin" / "empty.css").stat().st_size == 0
+
+
+def test_install_plugin_from_url_streams_into_zip(tmp_path, monkeypatch):
+    import io
+    import zipfile
+    import requests
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("manifest.json", json.dumps({"id": "remote-plugin"}))
+    payload = buf.getvalue()
+
+    class Resp:
+        def __enter__(self):
+            return self
+        def __exit__(self, *a):
+            return False
+        def raise_for_status(self):
+            pass
+        def iter_content(self, chunk_size=1):
+            for i in range(0, len(payload), 7):
+                yield payload[i:i + 7]
+
+    monkeypatch.setattr(requests, "get", lambda url, **kw: Resp())
+    mgr = ObsidianManager(str(tmp_path))
+    assert mgr.install_plugin_from_url("https://example.com/dl/remote.zip") == "remote-plugin"
+    assert (mgr.paths.plugins / "remote" / "manifest.json").exists()
+
+
+def _big_plugin_zip(dest):
+    import zipfile
+    with zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("p/manifest.json", json.dumps({"id": "p"}))
+        for i in range(40):
+            zf.writestr(f"p/f{i}.js", f"// {i}\n" * 2000)
+
+
+def test_install_plugin_from_zip_path_uses_a_zipfile_per_worker(tmp_path, monkeypatch):
+    import zipfile
+    from agents.obsidian import manager
+
+    opens = {}
+
+    class SpyZipFile(zipfile.ZipFile):
+        def open(self, name, *a, **kw):
+            opens[id(self)] = opens.get(id(self), 0) + 1
+            return super().open(name, *a, **kw)
+
+    zp = tmp_path / "p.zip"
+    _big_plugin_zip(zp)
+    monkeypatch.setattr(manager.zipfile, "ZipFile", SpyZipFile)
+    monkeypatch.setattr(manager.os, "cpu_count", lambda: 4)
+    mgr = ObsidianManager(str(tmp_path / "vault"))
+    assert mgr.install_plugin_from_zip(str(zp)) == "p"
+    out = mgr.paths.plugins / "p" / "p"
+    assert all((out / f"f{i}.js").read_text(encoding="utf-8") == f"// {i}\n" * 2000 for i in range(40))
+    # member reads are spread over worker-owned archives, never more than 4 of them
+    assert sum(opens.values()) == 41 and 1 <= len(opens) <= 4
+
+
+def test_install_plugin_from_zip_file_object_in_parallel(tmp_path, monkeypatch):
+    import io
+    from agents.obsidian import manager
+
+    monkeypatch.setattr(manager.os, "cpu_count", lambda: 4)
+    zp = tmp_path / "p.zip"
+    _big_plugin_zip(zp)
+    mgr = ObsidianManager(str(tmp_path / "vault"))
+    assert mgr.install_plugin_from_zip(io.BytesIO(zp.read_bytes()), default_name="p") == "p"
+    out = mgr.paths.plugins / "p" / "p"
+    assert all((out / f"f{i}.js").read_text(encoding="utf-8") == f"// {i}\n" * 2000 for i in range(40))
+
+
+def test_durable_manager_fsyncs_writes(tmp_path, monkeypatch):
+    from agents.obsidian import manager
+
+    synced = []
+    real_fsync = manager.os.fsync
+    monkeypatch.setattr(manager.os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+
+    ObsidianManager(str(tmp_path)).set_setting("app.json", "a", 1)
+    assert synced == []
+
+    mgr = ObsidianManager(str(tmp_path), durable=True)
+    mgr.set_setting("app.json", "a", 2)
+    assert len(synced) == 2  # temp file + parent dir
+    mgr.write_note("Notes/x.md", "x")
+    assert len(synced) == 4
+
+    monkeypatch.setenv("AI_STACK_OBSIDIAN_DURABLE", "1")
+    assert ObsidianManager(str(tmp_path)).durable is True
@@ -10,3 +10,19 @@ def test_registry_list_steps_cli_help_runs():
     except Exception as e:
         pytest.skip(f"list-steps not available: {e}")
 
+
+
+def test_cli_run_schedule_in_process(monkeypatch):
+    import importlib.util, sys, types
+    from pathlib import Path
+    # cli.py соседствует с пакетом cli/ — грузим файл явно
+    spec = importlib.util.spec_from_file_location("cli_main", Path(__file__).resolve().parents[1] / "cli.py")
+    cli = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(cli)
+    got = []
+    fake = types.ModuleType("scheduler")
+    fake.main = lambda argv=None: got.append(argv)
+    monkeypatch.setitem(sys.modules, "scheduler", fake)
+    monkeypatch.setattr(sys, "argv", ["cli.py", "run-schedule", "--agents", "a.yaml", "--timezone", "UTC"])
+    assert cli.main() == 0
+    assert got == [["--agents", "a.yaml", "--timezone", "UTC"]]